@@ -35,6 +35,8 @@ if not mysql_microgrid.DB.exists() or mysql_microgrid.DB.num_tables() == 0:
         drop_create_db=True,
         load_data_dev=False,
     )
+else:
+    make_data.microgrid_database_migrate()
 
 if not mysql_weather.DB.exists() or mysql_weather.DB.num_tables() == 0:
     make_data.weather_database(drop_create_db=True)
@@ -1,9 +1,12 @@
-from flask import Blueprint
-from extensions import get_wrapper, run_analysis
+from flask import Blueprint, request
+from extensions import get_wrapper, run_analysis, SLURM_SIZING_SHARDS
 
 sizing_compute_blueprint = Blueprint('sizing', __name__)
 
 @sizing_compute_blueprint.route('/', methods=["POST"])
 @get_wrapper(pass_user_id=True)
 def sizing(user_id):
-    return run_analysis(user_id, "sizing", time_limit= "2-00:00:00", send_email=True)
+    time_budget = request.get_json().get('time_budget')
+    if time_budget is not None and time_budget <= 0: raise ValueError("Time budget must be positive")
+    return run_analysis(user_id, "sizing", time_limit= "2-00:00:00", send_email=True, shards=SLURM_SIZING_SHARDS,
+                        time_budget=time_budget)
@@ -12,7 +12,28 @@ def results_get(user_id):
 @sizing_results_blueprint.route('/get/', methods=["POST"])
 @get_using_post_wrapper(table_name="sizing", action="read")
 def grids_get(request_dict):
-    return database_sizing.grids_get(request_dict['id'], request_dict['display_all'], request_dict['deficit_max'])
+    grids = database_sizing.grids_get(
+        request_dict['id'], request_dict['display_all'], request_dict['deficit_max'],
+        sort_by=request_dict['sort_by'] if 'sort_by' in request_dict else None,
+        descending=request_dict['descending'] if 'descending' in request_dict else False,
+        page=request_dict['page'] if 'page' in request_dict else None,
+        page_size=request_dict['page_size'] if 'page_size' in request_dict else 100,
+    )
+    if 'page' not in request_dict or request_dict['page'] is None: return grids
+    return {
+        "grids": grids,
+        "total": database_sizing.grids_count(request_dict['id'], request_dict['display_all'], request_dict['deficit_max']),
+    }
+
+@sizing_results_blueprint.route('/progress/', methods=["POST"])
+@get_using_post_wrapper(table_name="sizing", action="read")
+def partial_front_get(request_dict):
+    return database_sizing.partial_front_get(request_dict['id'], request_dict['deficit_max'] if 'deficit_max' in request_dict else None)
+
+@sizing_results_blueprint.route('/time_budget/', methods=["POST"])
+@post_wrapper(table_name="sizing", action="update")
+def time_budget_set(request_dict):
+    return database_sizing.time_budget_set(request_dict['id'], request_dict['time_budget'])
 
 @sizing_results_blueprint.route('/remove/', methods=['POST'])
 @post_wrapper(table_name="sizing", action="remove")
@@ -27,6 +27,8 @@ SLURM_USERNAME = CONFIG_INI.get("SLURM","USERNAME",fallback=None)
 SLURM_WORKING_DIRECTORY = CONFIG_INI.get("SLURM","WORKING_DIRECTORY",fallback=".")
 SLURM_RUN_LOCAL = CONFIG_INI.getboolean("SLURM","BYPASS_SLURM_RUN_LOCAL",fallback=False)
 SLURM_FORCE_RECOMPUTE = CONFIG_INI.getboolean("SLURM","FORCE_RECOMPUTE",fallback=False)
+SLURM_CPUS_PER_TASK = CONFIG_INI.getint("SLURM","CPUS_PER_TASK",fallback=1)
+SLURM_SIZING_SHARDS = CONFIG_INI.getint("SLURM","SIZING_SHARDS",fallback=1)
 
 mail = Mail()
 
@@ -269,18 +271,26 @@ def ssh_to_slurm(command):
         ssh_client.close()
     return stdout.read().decode('ascii').strip("\n") if stdout else None
 
-def compute(user_id, table_name, compute_id, time_limit, script=None, send_email=False):
-    """Submits a job to the SLURM server to run the analysis or runs it locally."""
+def compute(user_id, table_name, compute_id, time_limit, script=None, send_email=False, shards=1):
+    """Submits a job to the SLURM server to run the analysis or runs it locally;
+    with multiple shards the analysis runs as a job array followed by a job merging its results."""
     if script is None: script = "run/compute.py"
     if not database_users.has_permissions(user_id, compute_id, table_name, "write"):
         raise ValueError("User does not have permission to access {0} result".format(table_name))
     try:
-        if SLURM_RUN_LOCAL:
+        if SLURM_RUN_LOCAL and shards > 1:
+            subprocess.Popen(["python", "run/compute_sharded.py", "--num_shards", str(shards), "-m", table_name, "-r", str(compute_id)])
+            job_response =  "Submitted batch job 0"
+        elif SLURM_RUN_LOCAL:
             subprocess.Popen(["python", script, "-m", table_name, "-r", str(compute_id)])
             job_response =  "Submitted batch job 0"
+        elif shards > 1:
+            job_response = ssh_to_slurm("run/compute_sbatch_array_wrapper.sh {0} {1} {2} {3} {4} {5}".format(
+                table_name, compute_id, time_limit, script, SLURM_CPUS_PER_TASK, shards
+            ))
         else:
-            job_response = ssh_to_slurm("run/compute_sbatch_wrapper.sh {0} {1} {2} {3}".format(
-                table_name, compute_id, time_limit, script
+            job_response = ssh_to_slurm("run/compute_sbatch_wrapper.sh {0} {1} {2} {3} {4}".format(
+                table_name, compute_id, time_limit, script, SLURM_CPUS_PER_TASK
             ))
     except Exception as error:
         raise RuntimeError("Error in {0} blueprint running analysis\n{1}".format(table_name, error))
@@ -299,12 +309,13 @@ def compute(user_id, table_name, compute_id, time_limit, script=None, send_email
         mail.send(email_info)
     return job_response
 
-def run_analysis(user_id, table_name, time_limit="2-00:00:00", script=None, send_email=False):
-    """Run an analysis."""
+def run_analysis(user_id, table_name, time_limit="2-00:00:00", script=None, send_email=False, shards=1, time_budget=None):
+    """Run an analysis; a sizing time budget (seconds) is stored with the result before its job is submitted"""
     try:
         exists_flag, id = result_add_to_database(user_id, table_name)
         if not exists_flag or SLURM_FORCE_RECOMPUTE:
-            compute_job_id = compute(user_id, table_name, id, time_limit, script, send_email)
+            if time_budget is not None: sizing.time_budget_set(id, time_budget)
+            compute_job_id = compute(user_id, table_name, id, time_limit, script, send_email, shards)
             DATABASES[table_name].MODEL_HELPERS.compute_job_info_add(id, compute_job_id)
         else:
             compute_job_id = None
@@ -0,0 +1,11 @@
+-- Tables added to schema-microgrid.sql since its first release, created in existing databases
+-- (columns and indexes added to existing tables are migrated by make_data.microgrid_database_migrate)
+
+-- Table `sizing_design_cache`
+CREATE TABLE IF NOT EXISTS `sizing_design_cache` (
+  `contextKey` CHAR(40) NOT NULL,
+  `design` VARCHAR(256) NOT NULL,
+  `metrics` MEDIUMTEXT NOT NULL,
+  `createdatetime` DATETIME NOT NULL,
+  PRIMARY KEY (`contextKey`, `design`)
+);
@@ -268,6 +268,9 @@ CREATE TABLE IF NOT EXISTS `sizing` (
   `runstartdatetime` DATETIME DEFAULT NULL,
   `runenddatetime` DATETIME DEFAULT NULL,
   `success` BOOLEAN DEFAULT NULL,
+  `timeBudget` FLOAT DEFAULT NULL,
+  `progress` VARCHAR(1024) DEFAULT NULL,
+  `partialFront` MEDIUMBLOB DEFAULT NULL,
   PRIMARY KEY (`id`),
   UNIQUE KEY `sizing_unique` (`gridId`,`energyManagementSystemId`,`powerloadId`,`locationId`,`startdatetime`,`enddatetime`),
   CONSTRAINT `fk_sizing_grid` 
@@ -294,6 +297,7 @@ CREATE TABLE IF NOT EXISTS `sizing_grid` (
   `parent` VARCHAR(256) NOT NULL,
   `metricsSummaryStats` VARCHAR(512) NOT NULL,
   PRIMARY KEY (`id`),
+  KEY `sizing_grid_deficit` (`sizingId`, `deficitPercentage`),
   CONSTRAINT `fk_sizing_id`
     FOREIGN KEY (`sizingId`)
     REFERENCES `sizing` (`id`)
@@ -332,6 +336,15 @@ CREATE TABLE IF NOT EXISTS `sizing_grid_component_spec_data` (
     REFERENCES `component_spec_meta` (`id`)
 );
 
+-- Table `sizing_design_cache`
+CREATE TABLE IF NOT EXISTS `sizing_design_cache` (
+  `contextKey` CHAR(40) NOT NULL,
+  `design` VARCHAR(256) NOT NULL,
+  `metrics` MEDIUMTEXT NOT NULL,
+  `createdatetime` DATETIME NOT NULL,
+  PRIMARY KEY (`contextKey`, `design`)
+);
+
 -- Table `sizing_user`
 CREATE TABLE IF NOT EXISTS `sizing_user` (
   `sizingId` INT NOT NULL,
@@ -40,6 +40,18 @@ def microgrid_database(drop_create_db=False, load_data_dev=False):
     except Exception as error:
         raise Exception("make_data microgrid_database error:\n"+str(error))
 
+def microgrid_database_migrate():
+    """adds the tables, columns and indexes of schema-microgrid.sql missing from an existing
+    microgrid app database created by an earlier version; does nothing to an up to date database"""
+    try:
+        mysql_microgrid.DB.execute_sql_file("data/mysql/migrate-microgrid.sql")
+        mysql_microgrid.DB.add_column("sizing", "timeBudget", "FLOAT DEFAULT NULL")
+        mysql_microgrid.DB.add_column("sizing", "progress", "VARCHAR(1024) DEFAULT NULL")
+        mysql_microgrid.DB.add_column("sizing", "partialFront", "MEDIUMBLOB DEFAULT NULL")
+        mysql_microgrid.DB.add_index("sizing_grid", "sizing_grid_deficit", ["sizingId", "deficitPercentage"])
+    except Exception as error:
+        raise Exception("make_data microgrid_database_migrate error:\n"+str(error))
+
 def weather_database(drop_create_db=False):
     """constructs main microgrid app database"""
     sql_files_to_execute = []
@@ -61,6 +73,7 @@ if __name__ == "__main__":
     PARSER.add_argument("--drop_create", dest="drop_create", action="store_true", help="drop and create MYSQL database")
     PARSER.add_argument("--authentication", dest="authentication", action="store_true", help="build authentication MYSQL database")
     PARSER.add_argument("--microgrid", dest="microgrid", action="store_true", help="build microgrid MYSQL database")
+    PARSER.add_argument("--migrate", dest="migrate", action="store_true", help="add missing tables and columns to existing microgrid MYSQL database")
     PARSER.add_argument("--weather", dest="weather", action="store_true", help="build weather MYSQL database")
     PARSER.add_argument("--data_dev", dest="data_dev", action="store_true", help="add dev test data")
     if PARSER.parse_args().authentication:
@@ -73,5 +86,7 @@ if __name__ == "__main__":
             drop_create_db = PARSER.parse_args().drop_create,
             load_data_dev = PARSER.parse_args().data_dev,
         )
+    if PARSER.parse_args().migrate:
+        microgrid_database_migrate()
     if PARSER.parse_args().weather:
         weather_database(PARSER.parse_args().drop_create)
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 
 import configargparse
+import json
+import signal
+import sys
 import run.helpers as run_helpers
 from datetime import datetime
 from src.data.mysql import simulate, sizing
@@ -26,10 +29,37 @@ try:
     PARSER.add_argument("--num_levels", type=int, default=11)
     PARSER.add_argument("--algorithm", type=str, default="heuristic")
     PARSER.add_argument("--debug", dest="debug", action="store_true")
+    PARSER.add_argument("--engine", type=str, choices=["object", "array"], default="object")
+    PARSER.add_argument("--chunk_size", type=int, default=None,
+                        help="timesteps simulated at a time, streaming the powerload in bounded memory (simulate only)")
+    PARSER.add_argument("--workers", type=int, default=1, help="processes simulating sizing designs")
+    PARSER.add_argument("--num_shards", type=int, default=1, help="sizing tasks sharing the search; see run/compute_sharded.py")
+    PARSER.add_argument("--shard_index", type=int, default=None, help="sizing shard to run; merges the shards if omitted")
+    PARSER.add_argument("--shard_dir", type=str, default=None, help="directory of sizing shard results")
+    PARSER.add_argument("--coarse_step", type=float, default=4.0, help="hours per timestep of the multifidelity sizing screen")
+    PARSER.add_argument("--coarse_load", type=str, choices=["mean", "peak"], default="peak", help="multifidelity sizing screen load aggregation")
+    PARSER.add_argument("--checkpoint_file", type=str, default=None, help="file sizing runs checkpoint their state to")
+    PARSER.add_argument("--checkpoint_interval", type=float, default=300.0, help="seconds between sizing checkpoints")
+    PARSER.add_argument("--resume", dest="resume", action="store_true", help="continue sizing from --checkpoint_file if it exists")
+    PARSER.add_argument("--publish_interval", type=int, default=None, help="simulated designs between sizing partial front publications")
+    PARSER.add_argument("--time_budget", type=float, default=None, help="seconds after which sizing stops with the best front so far")
+    PARSER.add_argument("--feasibility_only", dest="feasibility_only", action="store_true",
+                        help="stop simulating sizing designs at their first deficit timestep, leaving them out of the results")
+    PARSER.add_argument("--representative_periods", type=int, default=None, help="representative days simulating sizing designs")
+    PARSER.add_argument("--validate_design", type=str, default=None,
+                        help='JSON ratings by DER type of a design to compare over representative days and the full timeline')
     MODEL_TYPE = PARSER.parse_args().model_type
     RUN_ID = PARSER.parse_args().compute_id
+    NUM_SHARDS = PARSER.parse_args().num_shards
+    SHARD_INDEX = PARSER.parse_args().shard_index
+    SHARD_DIR = PARSER.parse_args().shard_dir
+    if PARSER.parse_args().chunk_size is not None and MODEL_TYPE != "simulate":
+        raise ValueError("--chunk_size only applies to simulate")
+    if NUM_SHARDS > 1 and (MODEL_TYPE != "sizing" or SHARD_DIR is None):
+        raise ValueError("--num_shards only applies to sizing and requires --shard_dir")
     if RUN_ID is not None:
-        DATABASES[MODEL_TYPE].MODEL_HELPERS.compute_job_starttime_add(RUN_ID)
+        if SHARD_INDEX is None or SHARD_INDEX == 0:
+            DATABASES[MODEL_TYPE].MODEL_HELPERS.compute_job_starttime_add(RUN_ID)
         RUN_INFO = DATABASES[MODEL_TYPE].MODEL_HELPERS.result_get(RUN_ID, objectFlag=True)
         GRID_ID = RUN_INFO["gridId"]
         LOCATION_ID = RUN_INFO["locationId"]
@@ -57,6 +87,22 @@ try:
     NUM_LEVELS = PARSER.parse_args().num_levels
     ALGORITHM = PARSER.parse_args().algorithm
     DEBUG = PARSER.parse_args().debug
+    ENGINE = PARSER.parse_args().engine
+    WORKERS = PARSER.parse_args().workers
+    COARSE_STEP = PARSER.parse_args().coarse_step
+    COARSE_LOAD = PARSER.parse_args().coarse_load
+    REPRESENTATIVE_PERIODS = PARSER.parse_args().representative_periods
+    CHECKPOINT_FILE = PARSER.parse_args().checkpoint_file
+    if CHECKPOINT_FILE is not None and MODEL_TYPE != "sizing":
+        raise ValueError("--checkpoint_file only applies to sizing")
+    if PARSER.parse_args().resume and CHECKPOINT_FILE is None:
+        raise ValueError("--resume requires --checkpoint_file")
+    if CHECKPOINT_FILE is not None:
+        # Slurm terminates jobs at their time limit; exit so the run writes a last checkpoint
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit("terminated, checkpoint written to "+CHECKPOINT_FILE))
+    VALIDATE_DESIGN = PARSER.parse_args().validate_design
+    if VALIDATE_DESIGN is not None and (MODEL_TYPE != "sizing" or REPRESENTATIVE_PERIODS is None):
+        raise ValueError("--validate_design only applies to sizing and requires --representative_periods")
 
     RUN_PARAMS = {
         run_helpers.LOAD_ID:POWERLOAD_ID,
@@ -66,8 +112,22 @@ try:
         run_helpers.STARTDATETIME:STARTDATETIME,
         run_helpers.ENDDATETIME:ENDDATETIME,
         run_helpers.WEATHER_SAMPLE_METHOD : "mean",
+        run_helpers.ENGINE:ENGINE,
+        run_helpers.CHUNK_SIZE:PARSER.parse_args().chunk_size, # only applies to simulate
         "num_levels":NUM_LEVELS, # only applies to sizing
         "algorithm":ALGORITHM, # only applies to sizing
+        "workers":WORKERS, # only applies to sizing
+        "num_shards":NUM_SHARDS, # only applies to sizing
+        "shard_dir":SHARD_DIR if NUM_SHARDS > 1 else None, # only applies to sizing
+        "coarse_step":COARSE_STEP, # only applies to sizing
+        "coarse_load":COARSE_LOAD, # only applies to sizing
+        "representative_periods":REPRESENTATIVE_PERIODS, # only applies to sizing
+        "checkpoint_file":CHECKPOINT_FILE, # only applies to sizing
+        "checkpoint_interval":PARSER.parse_args().checkpoint_interval, # only applies to sizing
+        "resume":PARSER.parse_args().resume, # only applies to sizing
+        "publish_interval":PARSER.parse_args().publish_interval, # only applies to sizing
+        "time_budget":PARSER.parse_args().time_budget, # only applies to sizing
+        "feasibility_only":PARSER.parse_args().feasibility_only, # only applies to sizing
         "debug":DEBUG,
     }
     send_email = True
@@ -78,7 +138,12 @@ try:
         results_relative_url="sizing/results/"
     else:
         raise ValueError("run unknown type = "+MODEL_TYPE)
-    run_helpers.run_analysis(table_name=MODEL_TYPE, id=RUN_ID, params=RUN_PARAMS, results_relative_url=results_relative_url, send_email=send_email)
+    if VALIDATE_DESIGN is not None:
+        run_helpers.validate_representative_periods(params=RUN_PARAMS, design=json.loads(VALIDATE_DESIGN))
+    elif SHARD_INDEX is not None:
+        run_helpers.run_sizing_shard(params=RUN_PARAMS, shard_index=SHARD_INDEX)
+    else:
+        run_helpers.run_analysis(table_name=MODEL_TYPE, id=RUN_ID, params=RUN_PARAMS, results_relative_url=results_relative_url, send_email=send_email)
 except Exception as error:
     admin_only = MODEL_TYPE == "simulate"
     DATABASES[MODEL_TYPE].MODEL_HELPERS.compute_job_status_add(RUN_ID, False)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+"""
+Script to run a sizing analysis as shards on this machine, in place of a Slurm job array
+
+Starts --num_shards processes of compute.py, each with its --shard_index, and after all succeed
+runs compute.py once more to merge the shards; other command-line options are passed to every process,
+e.g. python3 run/compute_sharded.py --num_shards 4 -m "sizing" -c run/sizing/compute.yml
+"""
+
+_COMPUTE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compute.py")
+
+def run_shards(num_shards, shard_dir, compute_args):
+    """Runs the shards in parallel and raises if any fails"""
+    processes = [
+        subprocess.Popen([sys.executable, _COMPUTE_SCRIPT] + compute_args + [
+            "--num_shards", str(num_shards), "--shard_index", str(shard_index), "--shard_dir", shard_dir,
+        ]) for shard_index in range(num_shards)
+    ]
+    failed = [shard_index for shard_index, process in enumerate(processes) if process.wait() != 0]
+    if len(failed) > 0:
+        raise RuntimeError("sizing shards failed: "+", ".join(str(shard_index) for shard_index in failed))
+
+def merge_shards(num_shards, shard_dir, compute_args):
+    """Runs the merge of the shards"""
+    subprocess.run(
+        [sys.executable, _COMPUTE_SCRIPT] + compute_args + ["--num_shards", str(num_shards), "--shard_dir", shard_dir],
+        check=True,
+    )
+
+if __name__ == "__main__":
+    """Use '-h' flag to view launcher options; remaining options are passed to compute.py"""
+    PARSER = argparse.ArgumentParser()
+    PARSER.add_argument("--num_shards", type=int, required=True)
+    PARSER.add_argument("--shard_dir", type=str, default=None, help="kept after the merge if given, temporary otherwise")
+    ARGS, COMPUTE_ARGS = PARSER.parse_known_args()
+    if ARGS.num_shards < 1:
+        raise ValueError("--num_shards must be a positive integer")
+    SHARD_DIR = ARGS.shard_dir if ARGS.shard_dir is not None else tempfile.mkdtemp(prefix="sizing_shards_")
+    run_shards(ARGS.num_shards, SHARD_DIR, COMPUTE_ARGS)
+    merge_shards(ARGS.num_shards, SHARD_DIR, COMPUTE_ARGS)
+    if ARGS.shard_dir is None: shutil.rmtree(SHARD_DIR)
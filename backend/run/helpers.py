@@ -33,6 +33,8 @@ STARTDATETIME = "startdatetime"
 ENDDATETIME = "enddatetime"
 ENERGY_MANAGEMENT_SYSTEM_ID = "energy_management_system_id"
 WEATHER_SAMPLE_METHOD = "weather_sample_method"
+ENGINE = "engine"
+CHUNK_SIZE = "chunk_size"
 PARAMS_JSON_FILENAME = "params.json"
 PARAMS_PICKLE_FILENAME = "params.pkl"
 
@@ -60,6 +62,8 @@ def initialize_simulation_object(run_param_dict):
         end_datetime=run_param_dict[ENDDATETIME] if ENDDATETIME in run_param_dict else None,
         weather=weather,
         extend_proportion=0.0,
+        engine=run_param_dict[ENGINE] if ENGINE in run_param_dict else CoreSimulation.ENGINE_OBJECT,
+        chunk_size=run_param_dict[CHUNK_SIZE] if CHUNK_SIZE in run_param_dict else None,
     )
     return sim
 
@@ -161,6 +165,46 @@ def email_compute_failure(table_name, id, error, admin_only=False):
     except Exception:
         raise RuntimeError("failure email failed to send to user")
 
+def initialize_sizing_object(params, core_sim=None):
+    """Initialize sizing object according to input run parameter dictionary"""
+    return Sizing(
+        core_sim if core_sim is not None else initialize_simulation_object(params),
+        params["num_levels"],
+        workers=params["workers"] if "workers" in params else 1,
+        design_cache=sizing.DESIGN_CACHE_ENABLED,
+        coarse_step=params["coarse_step"] if "coarse_step" in params else 4.0,
+        coarse_load=params["coarse_load"] if "coarse_load" in params else "peak",
+        representative_periods=params["representative_periods"] if "representative_periods" in params else None,
+        checkpoint_file=params["checkpoint_file"] if "checkpoint_file" in params else None,
+        checkpoint_interval=params["checkpoint_interval"] if "checkpoint_interval" in params else 300.0,
+        publish_interval=params["publish_interval"] if "publish_interval" in params else None,
+        time_budget=params["time_budget"] if "time_budget" in params else None,
+        feasibility_only=params["feasibility_only"] if "feasibility_only" in params else False,
+    )
+
+def validate_representative_periods(params, design):
+    """Print the metrics of the input design (dictionary of ratings by DER type) simulated over
+    the representative periods of a sizing analysis with input parameters params and over its full timeline"""
+    fields = initialize_sizing_object(params).validate_representative(design)
+    for name in ["deficit_percentage", "excess_percentage", "unused_percentage", "time_used_ratio"]:
+        print("{0}: representative {1}, full {2}".format(name, fields["representative"][name], fields["full"][name]), flush=True)
+    print("summary stats representative: "+json.dumps(fields["representative"]["metrics_summary_stats"], default=str), flush=True)
+    print("summary stats full: "+json.dumps(fields["full"]["metrics_summary_stats"], default=str), flush=True)
+
+def run_sizing_shard(params, shard_index):
+    """Run shard shard_index of a sizing analysis with input parameters params,
+    writing its results to params["shard_dir"] for run_analysis to merge"""
+    try:
+        sizing_model = initialize_sizing_object(params)
+        sizing_model.run_shard(
+            algorithm=params["algorithm"],
+            shard_index=shard_index,
+            num_shards=params["num_shards"],
+            shard_dir=params["shard_dir"],
+        )
+    except Exception as error:
+        raise RuntimeError("Error in sizing shard "+str(shard_index)+" run\n"+str(error))
+
 def run_analysis(table_name, id, params, results_relative_url, send_email=True):
     """Run the analysis specified by table_name with input parameters params."""
     results_dir = None if id is not None else os.path.join(
@@ -181,8 +225,16 @@ def run_analysis(table_name, id, params, results_relative_url, send_email=True):
             simulate = Simulate(core_sim)
             simulate.run(results_dir=results_dir, database_id=id)
         elif table_name == "sizing":
-            simulate = Sizing(core_sim, params["num_levels"])
-            simulate.run(algorithm=params["algorithm"], results_dir=results_dir, database_id=id, debug=params["debug"])
+            simulate = initialize_sizing_object(params, core_sim)
+            simulate.run(
+                algorithm=params["algorithm"],
+                results_dir=results_dir,
+                database_id=id,
+                debug=params["debug"],
+                shard_dir=params["shard_dir"] if "shard_dir" in params else None,
+                num_shards=params["num_shards"] if "num_shards" in params else 1,
+                resume=params["resume"] if "resume" in params else False,
+            )
         else:
             raise ValueError("run_analysis unknown type = "+table_name)
     except Exception as error:
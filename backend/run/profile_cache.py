@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import configargparse
+import run.helpers as run_helpers
+from datetime import datetime
+from src.models import Sizing
+from src.components import defaults
+import src.data.cache.profiles as profile_store
+
+"""
+Script to manage the renewable power profile store (PROFILE_CACHE_DIR in config.ini)
+
+warm    compute profiles of a grid's renewable generators at every sizing level
+list    print stored profiles
+evict   remove stored profiles matching the filters (all if no filter)
+"""
+
+def warm(args):
+    """Compute profiles for the grid, location and power load of the input arguments"""
+    params = {
+        run_helpers.LOAD_ID: args.powerload_id,
+        run_helpers.GRID_ID: args.grid_id,
+        run_helpers.LOCATION_ID: args.location_id,
+        run_helpers.ENERGY_MANAGEMENT_SYSTEM_ID: args.energy_management_system_id,
+        run_helpers.STARTDATETIME: _parse_datetime(args.startdatetime),
+        run_helpers.ENDDATETIME: _parse_datetime(args.enddatetime),
+        run_helpers.WEATHER_SAMPLE_METHOD: "mean",
+    }
+    core_sim = run_helpers.initialize_simulation_object(params)
+    for generator in core_sim.grid.get_generators(): # profiles at the grid's own ratings, as used by simulate
+        if generator.__class__.__name__ in defaults.renewable_generator_types():
+            core_sim.renewable_power_profile(generator)
+    Sizing(core_sim, args.num_levels).warm_profile_store()
+
+def _parse_datetime(value):
+    """Parse datetime in format YYYY-MM-DD_HH:MM:SS"""
+    if not value: return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d_%H:%M:%S')
+    except ValueError:
+        raise ValueError("Invalid datetime format. Please use YYYY-MM-DD_HH:MM:SS.")
+
+if __name__ == "__main__":
+    """Use '-h' flag to view command-line options"""
+    PARSER = configargparse.ArgParser()
+    PARSER.add_argument("-c", "--config_file", is_config_file=True)
+    PARSER.add_argument("action", type=str, choices=["warm", "list", "evict"])
+    PARSER.add_argument("--grid_id", type=int, default=None)
+    PARSER.add_argument("--location_id", type=int, default=None)
+    PARSER.add_argument("--energy_management_system_id", type=int, default=1)
+    PARSER.add_argument("--powerload_id", type=int, default=None)
+    PARSER.add_argument("--startdatetime", type=str, default=None, help='Start date and time (format: YYYY-MM-DD_HH:MM:SS)')
+    PARSER.add_argument("--enddatetime", type=str, default=None, help='End date and time (format: YYYY-MM-DD_HH:MM:SS)')
+    PARSER.add_argument("--num_levels", type=int, default=11)
+    PARSER.add_argument("--generator_type", type=str, default=None, help="evict only this generator class name")
+    PARSER.add_argument("--older_than_days", type=float, default=None, help="evict only entries older than this")
+    ARGS = PARSER.parse_args()
+    if not profile_store.enabled():
+        raise ValueError("Set PROFILE_CACHE_DIR in the [CACHE] section of config.ini to use the profile store")
+    if ARGS.action == "warm":
+        if ARGS.grid_id is None or ARGS.location_id is None or ARGS.powerload_id is None:
+            raise ValueError("warm requires --grid_id, --location_id and --powerload_id")
+        warm(ARGS)
+    elif ARGS.action == "list":
+        for metadata in profile_store.entries():
+            key = metadata["key"]
+            print("{0}\tlocation {1}\t{2}\t{3} timesteps from {4}\t{5} bytes".format(
+                key["parameters"]["type"], key["location_id"], key["parameters"],
+                key["time_grid"]["num_timesteps"], key["time_grid"]["start"], metadata["bytes"],
+            ))
+    elif ARGS.action == "evict":
+        removed = profile_store.evict(
+            location_id=ARGS.location_id,
+            generator_type=ARGS.generator_type,
+            older_than_days=ARGS.older_than_days,
+        )
+        print("Removed {0} profiles".format(removed))
@@ -1,3 +1,3 @@
 from .diesel_generator import DieselGenerator
 from .wind_turbine import WindTurbine
-from .photovoltaic_panel import SolarPhotovoltaicPanel
+from .photovoltaic_panel import SolarPhotovoltaicPanel, PVWattsExecutionException
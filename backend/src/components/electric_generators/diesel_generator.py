@@ -66,6 +66,16 @@ class DieselGenerator(Generator):
         self._fuel_level = 0.0
         self._fuel_consumed = 0.0
 
+    def sizing_parameters(self):
+        """Parameters that simulations depend on besides the power rating set by a sizing design"""
+        return {
+            "type": self.__class__.__name__,
+            "load_factor": self._load_factor,
+            "epg_efficiency": self._epg_efficiency,
+            "soft_min": self._soft_min,
+            "startup_delay": self._startup_delay,
+        }
+
     def startup_delay(self):
         """Time delay to become available when grid power is lost"""
         return self._startup_delay
@@ -152,6 +162,10 @@ class DieselGenerator(Generator):
         """Maximum fuel required to run generator for an input amount of time"""
         return self._max_load_factor(self.fuel_for_time, duration)
 
+    def max_fuel_for_energy(self, energy):
+        """Fuel required to generate an input amount of energy at full load"""
+        return self._max_load_factor(self._fuel_for_energy, energy)
+
     def max_available_energy(self, duration):
         """Maximum energy generated over an input duration of time"""
         return self._max_load_factor(self.available_energy, duration)
@@ -1,6 +1,10 @@
+import numpy
 import PySAM.Pvwattsv8 as pvwatts
 from src.components import Generator, defaults
 
+class PVWattsExecutionException(Exception):
+    pass
+
 class SolarPhotovoltaicPanel(Generator):
 
     def __init__(self, id, power_rating, is_sun_tracking, temperature_coefficient, 
@@ -50,9 +54,10 @@ class SolarPhotovoltaicPanel(Generator):
             raise ValueError("Solar photovoltaic temperature coefficient should be between -0.01 and 0")
 
     def update(self, power_rating):
+        if power_rating != self._power_rating: self._pvwatts_system_model = None # system capacity changes
         self._power_rating = power_rating
     
-    def _get_pvwatts_system_model(self):
+    def _get_pvwatts_system_model(self, latitude):
         """Return PVwatts system model"""
 
         if self._pvwatts_system_model is not None:
@@ -72,40 +77,96 @@ class SolarPhotovoltaicPanel(Generator):
             }
         }
         if not self._is_sun_tracking:
-            model_params["SystemDesign"]["azimuth"] = 180 if self._current_weather.latitude >= 0.0 else 0
-            model_params["SystemDesign"]["tilt"] = abs(self._current_weather.latitude)
+            model_params["SystemDesign"]["azimuth"] = 180 if latitude >= 0.0 else 0
+            model_params["SystemDesign"]["tilt"] = abs(latitude)
         self._pvwatts_system_model = pvwatts.new()
         self._pvwatts_system_model.assign(model_params)
         self._pvwatts_system_model.AdjustmentFactors.assign({'constant': 0})
         return self._pvwatts_system_model
 
-    def _power_pvwatts(self):
-        """Run PVwatts to get power"""
-        weather = self._current_weather
-        date_time = self._timeperiod.mid()
+    def _execute_pvwatts(self, location, date_times, direct_normal_irradiance, diffuse_horizontal_irradiance,
+                         global_horizontal_irradiance, wind_speed, temperature):
+        """Run PVwatts over a series of times and weather conditions, return array of power"""
         solar_resource_data = {
-                'tz': weather.timezone, # timezone
-                'elev': weather.elevation, # elevation
-                'lat': weather.latitude, # latitude
-                'lon': weather.longitude, # longitude
-                'year': (date_time.year,), # year
-                'month': (date_time.month,), # month
-                'day': (date_time.day,), # day
-                'hour': (date_time.hour,), # hour
-                'minute': (date_time.minute,), # minute
-                'dn': (weather.direct_normal_irradiance,), # direct normal irradiance
-                'df': (weather.diffuse_horizontal_irradiance,), # diffuse irradiance
-                'gh': (weather.global_horizontal_irradiance,), # global horizontal irradiance
-                'wspd': (weather.wind_speed,), # windspeed
-                'tdry': (weather.temperature,) # dry bulb temperature
+                'tz': location.timezone, # timezone
+                'elev': location.elevation, # elevation
+                'lat': location.latitude, # latitude
+                'lon': location.longitude, # longitude
+                'year': tuple(date_time.year for date_time in date_times), # year
+                'month': tuple(date_time.month for date_time in date_times), # month
+                'day': tuple(date_time.day for date_time in date_times), # day
+                'hour': tuple(date_time.hour for date_time in date_times), # hour
+                'minute': tuple(date_time.minute for date_time in date_times), # minute
+                'dn': tuple(direct_normal_irradiance), # direct normal irradiance
+                'df': tuple(diffuse_horizontal_irradiance), # diffuse irradiance
+                'gh': tuple(global_horizontal_irradiance), # global horizontal irradiance
+                'wspd': tuple(wind_speed), # windspeed
+                'tdry': tuple(temperature) # dry bulb temperature
         }
-        system_model = self._get_pvwatts_system_model()
+        system_model = self._get_pvwatts_system_model(location.latitude)
         system_model.SolarResource.assign({'solar_resource_data': solar_resource_data})
-        system_model.execute()
-        power = system_model.Outputs.dc[0] / 1000.0
-        return power
+        try:
+            system_model.execute()
+        except Exception as error:
+            raise PVWattsExecutionException(str(error))
+        return numpy.array(system_model.Outputs.dc) / 1000.0
+
+    def _power_pvwatts(self):
+        """Run PVwatts to get power"""
+        weather = self._current_weather
+        power = self._execute_pvwatts(
+            location = weather,
+            date_times = [self._timeperiod.mid()],
+            direct_normal_irradiance = [weather.direct_normal_irradiance],
+            diffuse_horizontal_irradiance = [weather.diffuse_horizontal_irradiance],
+            global_horizontal_irradiance = [weather.global_horizontal_irradiance],
+            wind_speed = [weather.wind_speed],
+            temperature = [weather.temperature],
+        )
+        return power[0].item()
+
+    def power_profile(self, location, time_periods, direct_normal_irradiance, diffuse_horizontal_irradiance,
+                      global_horizontal_irradiance, wind_speed, temperature):
+        """Power output over a horizon of time periods with one PVwatts run
+
+        Keyword arguments:
+        location                        object with latitude, longitude, elevation and timezone (e.g. Weather)
+        time_periods                    list of time periods; power is evaluated at each midpoint
+        direct_normal_irradiance        array of direct normal irradiance by time period
+        diffuse_horizontal_irradiance   array of diffuse horizontal irradiance by time period
+        global_horizontal_irradiance    array of global horizontal irradiance by time period
+        wind_speed                      array of wind speed by time period
+        temperature                     array of temperature by time period
+        """
+        return self._execute_pvwatts(
+            location = location,
+            date_times = [time_period.mid() for time_period in time_periods],
+            direct_normal_irradiance = direct_normal_irradiance,
+            diffuse_horizontal_irradiance = diffuse_horizontal_irradiance,
+            global_horizontal_irradiance = global_horizontal_irradiance,
+            wind_speed = wind_speed,
+            temperature = temperature,
+        )
     
+    def sizing_parameters(self):
+        """Parameters that simulations depend on besides the power rating set by a sizing design"""
+        return {
+            "type": self.__class__.__name__,
+            "is_sun_tracking": self._is_sun_tracking,
+            "temperature_coefficient": self._temperature_coefficient,
+        }
+
+    def profile_parameters(self):
+        """Parameters that power_profile depends on besides location and weather
+        (PVwatts output is not exactly proportional to system capacity, so the rating is included)"""
+        return {
+            "type": self.__class__.__name__,
+            "is_sun_tracking": self._is_sun_tracking,
+            "power_rating": self._power_rating,
+        }
+
     def _power(self):
+        if self._exogenous_power is not None: return self._exogenous_power
         return self._power_pvwatts()
 
     def _energy_output(self, duration):
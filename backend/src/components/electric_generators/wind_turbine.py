@@ -1,3 +1,4 @@
+import numpy
 from src.components import Generator, defaults
 
 class WindTurbine(Generator):
@@ -84,6 +85,7 @@ class WindTurbine(Generator):
                 (https://cdn.standards.iteh.ai/samples/7472/c203e9121d4c40e5bdc98844b1a1e2f4/ISO-2533-1975.pdf)
                 (https://doi.org/10.5194/angeo-2019-88)
         """
+        if self._exogenous_power is not None: return self._exogenous_power
         weather = self._current_weather
         if weather.wind_speed > self._cutin_speed and weather.wind_speed < self._cutout_speed:
             k = 2 # lower exponent may be more accurate than cubic textbook model according to citations
@@ -103,6 +105,53 @@ class WindTurbine(Generator):
         power = min(self._power_rating * fract_density * fract_speed, self._power_peak)
         return power
 
+    def power_factors(self, wind_speed, temperature, pressure):
+        """Rating-independent factors of power for arrays of weather conditions (vectorized _power):
+        row 0 is the air density fraction, row 1 the wind speed fraction (zero outside operating limits)"""
+        operating = (wind_speed > self._cutin_speed) & (wind_speed < self._cutout_speed)
+        k = 2
+        fract_speed = ((_power_elementwise(wind_speed, k) - self._cutin_speed**k) \
+                       / (self._rated_speed**k - self._cutin_speed**k))
+        pressure_o = 1013.25 # mbar
+        temperature_o = 288.15 # kelvin
+        celsius_to_kelvin = 273.15 # kelvin
+        temperature_kelvin = temperature + celsius_to_kelvin
+        temperature_adjusted = temperature_kelvin - (6.5 * self._height)/1000.0
+        pressure_adjusted = pressure * _power_elementwise(1 - (0.0065 * self._height / temperature_kelvin), 5.255)
+        fract_temp = temperature_adjusted / temperature_o
+        fract_pressure = pressure_adjusted / pressure_o
+        fract_density = (1 + fract_pressure) / (1 + fract_temp)
+        return numpy.vstack([fract_density, numpy.where(operating, fract_speed, 0.0)])
+
+    def power_from_factors(self, factors):
+        """Power generated at current rating from factors returned by power_factors"""
+        return numpy.minimum(self._power_rating * factors[0] * factors[1], self._power_peak)
+
+    def power_profile(self, wind_speed, temperature, pressure):
+        """Power generated for arrays of weather conditions (vectorized _power)"""
+        return self.power_from_factors(self.power_factors(wind_speed, temperature, pressure))
+
+    def sizing_parameters(self):
+        """Parameters that simulations depend on besides the power rating set by a sizing design"""
+        return {
+            "type": self.__class__.__name__,
+            "power_peak": self._power_peak, # not changed by update
+            "cutin_speed": self._cutin_speed,
+            "cutout_speed": self._cutout_speed,
+            "rated_speed": self._rated_speed,
+            "height": self._height,
+        }
+
+    def profile_parameters(self):
+        """Parameters that power_factors depends on besides weather"""
+        return {
+            "type": self.__class__.__name__,
+            "cutin_speed": self._cutin_speed,
+            "cutout_speed": self._cutout_speed,
+            "rated_speed": self._rated_speed,
+            "height": self._height,
+        }
+
     def _energy_output(self, duration):
         """Energy generated over an input duration of time"""
         energy_output = self._power() * duration
@@ -115,3 +164,9 @@ class WindTurbine(Generator):
     def _release(self, energy):
         """Output energy to grid (no action required for wind turbine)"""
         pass
+
+
+def _power_elementwise(base, exponent):
+    """base**exponent evaluated per element so results match the scalar math in _power
+    (vectorized numpy power may differ in the last bit)"""
+    return numpy.array([b**exponent for b in base], dtype=float)
@@ -33,6 +33,8 @@ class Battery(Generator):
         self._max_soc = max_soc
         self._charge_level = charge_level if charge_level else self._energy_rating
         self._starting_charge_percentage = self._charge_level / self._energy_rating
+        self._discharge_ratio = self._power_rating / self._energy_rating # kept by update
+        self._charge_ratio = self._charge_power_rating / self._energy_rating # kept by update
         self._economic_lifespan = economic_lifespan
         self._investment_cost = investment_cost
         self._om_cost = om_cost
@@ -79,13 +81,26 @@ class Battery(Generator):
             raise ValueError("Battery charge should be at least 0 and at most the battery size")
 
     def update(self, energy_rating):
-        discharge_ratio = self._power_rating / self._energy_rating
-        charge_ratio = self._charge_power_rating / self._energy_rating
+        """Resize battery keeping the power to energy ratios it was constructed with
+        (ratings do not depend on the order of previous updates)"""
         self._energy_rating = energy_rating
-        self._power_rating = energy_rating * discharge_ratio
-        self._charge_power_rating = energy_rating * charge_ratio
+        self._power_rating = energy_rating * self._discharge_ratio
+        self._charge_power_rating = energy_rating * self._charge_ratio
         self._charge_level = energy_rating
 
+    def sizing_parameters(self):
+        """Parameters that simulations depend on besides the energy rating set by a sizing design"""
+        return {
+            "type": self.__class__.__name__,
+            "discharge_ratio": self._discharge_ratio,
+            "charge_ratio": self._charge_ratio,
+            "charge_efficiency": self._charge_efficiency,
+            "discharge_efficiency": self._discharge_efficiency,
+            "min_soc": self._min_soc,
+            "max_soc": self._max_soc,
+            "starting_charge_percentage": self._starting_charge_percentage,
+        }
+
     def reset_charge(self):
         """Reset battery charge"""
         self._charge_level = self._starting_charge_percentage * self._energy_rating
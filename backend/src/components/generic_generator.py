@@ -12,10 +12,14 @@ class Generator(object):
         return (f'{self.__class__.__name__}('
            f'id={self._id!r})')
 
-    def update_current_conditions(self, timestep, weather):
-        """Update datetime"""
+    _exogenous_power = None
+
+    def update_current_conditions(self, timestep, weather, power=None):
+        """Update datetime
+        power       precomputed power output for the timestep (renewable generators)"""
         self._timeperiod = timestep.time_period()
         self._current_weather = weather.current_sample
+        self._exogenous_power = power
 
     def startup_delay(self):
         """Time delay to become available when grid power is lost defaults to 0.0"""
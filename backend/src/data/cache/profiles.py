@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import hashlib
+import configparser
+import numpy
+
+"""
+Disk store of renewable generator profiles shared across runs
+
+Each entry is a .npy array, memory-mapped when read, with a .json file of the fields it is keyed by:
+profile version, location, weather sample method, time grid and the generator parameters the profile depends on.
+Entries are written atomically so concurrent runs can share a store directory.
+The store is disabled when PROFILE_CACHE_DIR is not set in the [CACHE] section of config.ini.
+"""
+
+_CONFIG_INI = configparser.ConfigParser()
+_CONFIG_INI.read("config.ini")
+PROFILE_CACHE_DIR = _CONFIG_INI.get("CACHE", "PROFILE_CACHE_DIR", fallback="")
+_PROFILE_VERSION = 1 # increment when changes to profile computation invalidate stored profiles
+
+def enabled():
+    """Return True if a store directory is configured"""
+    return len(PROFILE_CACHE_DIR) > 0
+
+def time_grid(time_periods):
+    """Return dictionary identifying the time grid of a list of time periods"""
+    mids = numpy.array([time_period.mid() for time_period in time_periods], dtype="datetime64[s]")
+    return {
+        "start": str(mids[0]) if len(mids) > 0 else None,
+        "num_timesteps": len(mids),
+        "digest": hashlib.sha1(mids.astype(numpy.int64).tobytes()).hexdigest(),
+    }
+
+def make_key(location_id, sample_method, time_grid, parameters):
+    """Return key of a profile
+
+    Keyword arguments:
+    location_id         database id of weather location
+    sample_method       weather sample method
+    time_grid           dictionary from time_grid()
+    parameters          dictionary of generator parameters the profile depends on (including "type")
+    """
+    return {
+        "version": _PROFILE_VERSION,
+        "location_id": location_id,
+        "sample_method": sample_method,
+        "time_grid": time_grid,
+        "parameters": parameters,
+    }
+
+def _entry_path(key):
+    """Return path of entry without file extension"""
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return os.path.join(PROFILE_CACHE_DIR, "{0}_{1}_{2}".format(key["parameters"]["type"], key["location_id"], digest))
+
+def _write_atomic(path, write):
+    """Write a file through a temporary file in the same directory"""
+    temporary_path = "{0}.{1}.tmp".format(path, os.getpid())
+    with open(temporary_path, "wb") as f:
+        write(f)
+    os.replace(temporary_path, path)
+
+def get(key):
+    """Return memory-mapped profile for input key, or None if not stored"""
+    if not enabled(): return None
+    try:
+        return numpy.load(_entry_path(key)+".npy", mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+def put(key, profile):
+    """Store profile for input key"""
+    if not enabled(): return
+    os.makedirs(PROFILE_CACHE_DIR, exist_ok=True)
+    path = _entry_path(key)
+    metadata = { "key": key, "shape": list(numpy.shape(profile)), "created": time.time() }
+    _write_atomic(path+".json", lambda f: f.write(json.dumps(metadata, default=str).encode("utf-8")))
+    _write_atomic(path+".npy", lambda f: numpy.save(f, numpy.asarray(profile, dtype=float)))
+
+def entries():
+    """Return list of metadata dictionaries of stored profiles"""
+    if not enabled() or not os.path.isdir(PROFILE_CACHE_DIR): return []
+    metadata_list = []
+    for filename in sorted(os.listdir(PROFILE_CACHE_DIR)):
+        if not filename.endswith(".json"): continue
+        path = os.path.join(PROFILE_CACHE_DIR, filename[:-len(".json")])
+        try:
+            with open(path+".json", "rt", encoding="utf-8") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            continue
+        metadata["path"] = path
+        metadata["bytes"] = os.path.getsize(path+".npy") if os.path.exists(path+".npy") else 0
+        metadata_list.append(metadata)
+    return metadata_list
+
+def evict(location_id=None, generator_type=None, older_than_days=None):
+    """Remove stored profiles matching all input filters (all profiles if no filter), return number removed"""
+    removed = 0
+    for metadata in entries():
+        if location_id is not None and metadata["key"]["location_id"] != location_id: continue
+        if generator_type is not None and metadata["key"]["parameters"]["type"] != generator_type: continue
+        if older_than_days is not None and time.time() - metadata["created"] < older_than_days*86400.0: continue
+        for extension in [".npy", ".json"]:
+            if os.path.exists(metadata["path"]+extension): os.remove(metadata["path"]+extension)
+        removed += 1
+    return removed
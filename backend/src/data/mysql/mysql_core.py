@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from mysql.connector import connect
 from sqlalchemy import create_engine
 from urllib.parse import quote_plus
@@ -26,8 +27,9 @@ class MySqlDatabase(object):
         self.host = host
         self.port = port
 
-    def _get_connect(self, root=False):
-        """Connect to MYSQL server as root or to database as user, per input root flag"""
+    def _get_connect(self, root=False, use_pure=False):
+        """Connect to MYSQL server as root or to database as user, per input root flag;
+        use_pure selects the pure Python connector, whose close drops unread rows without reading them"""
         try:
             if root:
                 connection = connect(
@@ -42,7 +44,8 @@ class MySqlDatabase(object):
                     port=self.port,
                     user=self.user,
                     password=self.user_password,
-                    database=self.database_name
+                    database=self.database_name,
+                    use_pure=use_pure,
                 )
         except Exception as error:
             raise MySqlDatabaseException("MYSQL connection failed:\n"+str(error)+"\n")
@@ -143,6 +146,29 @@ class MySqlDatabase(object):
             raise MySqlDatabaseException("Query failed:\n"+str(error)+"\n")
         return result
 
+    def query_chunks(self, select, values=None, output_format="default", chunk_size=10000):
+        """Generate the rows of a SQL select query in lists of at most chunk_size rows
+        read through an unbuffered cursor, so the server streams results as they are consumed
+        instead of the whole result set being held in memory
+        Rows are in the formats of query: default - lists of row values, dict - python dictionaries
+        When the generator is closed early, the connection is closed without reading the rows left"""
+        dict_flag = output_format.lower() == "dict"
+        try:
+            connection = self._get_connect(use_pure=True)
+            try:
+                cursor = connection.cursor(dictionary=dict_flag, buffered=False)
+                cursor.execute(select, values)
+                rows = cursor.fetchmany(chunk_size)
+                while len(rows) > 0:
+                    yield rows
+                    rows = cursor.fetchmany(chunk_size)
+                cursor.close()
+            finally:
+                # a cursor with unread rows cannot close, but its connection can
+                connection.close()
+        except Exception as error:
+            raise MySqlDatabaseException("Query failed:\n"+str(error)+"\n")
+
     def _insert_insert_update(self, table_name:str, data_dict:dict, update:bool):
         """Insert or update row(s) in database table, per input flag update
         data_dict keys are field names in table
@@ -191,6 +217,27 @@ class MySqlDatabase(object):
         allowing for inserting or updating multiple rows or a single row"""
         return self._insert_insert_update(table_name, data_dict, update=False)
 
+    @contextmanager
+    def transaction(self):
+        """Yields a cursor of one connection to the database as user; its statements are committed together
+        when the block exits, or all rolled back if one fails"""
+        with self._get_connect() as connection:
+            cursor = connection.cursor()
+            try:
+                yield cursor
+                connection.commit()
+            except Exception as error:
+                connection.rollback()
+                raise MySqlDatabaseException("Transaction failed:\n"+str(error)+"\n")
+
+    def insert_many(self, cursor, table_name, fields, rows, chunk_size=1000):
+        """Insert rows (lists of values in the order of the input fields) with the input cursor
+        of a transaction, chunk_size rows per multi-row INSERT statement"""
+        if len(rows) == 0: return
+        sql = "INSERT INTO {0} ({1}) VALUES({2})".format(table_name, ",".join(fields), ",".join(["%s"]*len(fields)))
+        for i in range(0, len(rows), chunk_size):
+            cursor.executemany(sql, rows[i:i+chunk_size]) # sent as one INSERT with multiple VALUES rows
+
     def update(self, table_name, data_dict, where_dict):
         """Update row(s) in database table
         data_dict keys are field names in table
@@ -246,6 +293,44 @@ class MySqlDatabase(object):
             raise MySqlDatabaseException("exists() method failed\n"+str(error))
         return database_exists
 
+    def column_exists(self, table_name, column_name):
+        """Returns boolean indicating if the database table has the column"""
+        try:
+            num = self.query(
+                """SELECT COUNT(*)
+                    FROM INFORMATION_SCHEMA.COLUMNS
+                    WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND COLUMN_NAME = %s""",
+                values = [self.database_name, table_name, column_name], output_format="item",
+            )[0]
+        except Exception as error:
+            raise MySqlDatabaseException("column_exists() method failed\n"+str(error))
+        return num > 0
+
+    def index_exists(self, table_name, index_name):
+        """Returns boolean indicating if the database table has the index"""
+        try:
+            num = self.query(
+                """SELECT COUNT(*)
+                    FROM INFORMATION_SCHEMA.STATISTICS
+                    WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND INDEX_NAME = %s""",
+                values = [self.database_name, table_name, index_name], output_format="item",
+            )[0]
+        except Exception as error:
+            raise MySqlDatabaseException("index_exists() method failed\n"+str(error))
+        return num > 0
+
+    def add_column(self, table_name, column_name, definition):
+        """Add a column of the input SQL definition (e.g. "FLOAT DEFAULT NULL") to a database table
+        unless it has it already"""
+        if self.column_exists(table_name, column_name): return
+        self._execute_sql("ALTER TABLE `{0}` ADD COLUMN `{1}` {2}".format(table_name, column_name, definition))
+
+    def add_index(self, table_name, index_name, column_names):
+        """Add an index on the input list of columns to a database table unless it has it already"""
+        if self.index_exists(table_name, index_name): return
+        self._execute_sql("ALTER TABLE `{0}` ADD KEY `{1}` ({2})".format(
+            table_name, index_name, ",".join(["`"+column_name+"`" for column_name in column_names])))
+
     def num_tables(self):
         """Returns integer number of tables in database"""
         try:
@@ -269,11 +354,11 @@ class MySqlDatabase(object):
         except Exception as error:
             raise MySqlDatabaseException("Pandas to_sql failed:\n"+str(error)+"\n")
 
-    def read_dataframe(self, query):
-        """Execute SQL read using Pandas"""
+    def read_dataframe(self, query, params=None, dtype=None):
+        """Execute SQL read using Pandas, with optional query parameters and column dtypes"""
         try:            
             with self._get_connect_sql_alchemy() as connection:
-                data = pandas.read_sql(query, connection)
+                data = pandas.read_sql(query, connection, params=params, dtype=dtype)
         except Exception as error:
             raise MySqlDatabaseException("Pandas read_sql failed:\n"+str(error)+"\n")
         return data
@@ -2,6 +2,7 @@ import math
 import base64
 from dateutil import parser
 from datetime import timedelta
+from contextlib import closing
 from . import mysql_microgrid
 
 def get_all(user_id):
@@ -32,6 +33,17 @@ def get_all(user_id):
                     raise mysql_microgrid.MicrogridDBException("powerload get_all image decoding failed \n"+str(error))
     return powerloads
 
+def _interval(startdatetime, row, next_row):
+    """Returns dictionary of the time period between the input consecutive powerload_data rows
+    and its powerload value"""
+    return {
+        "startdatetime": startdatetime + timedelta(hours=row["time"]),
+        "middatetime": startdatetime + timedelta(hours=row["time"]+((next_row["time"]-row["time"])/2.0)),
+        "enddatetime": startdatetime + timedelta(hours=next_row["time"]),
+        "powerload_original": row["value"], # original data
+        "powerload": (row["value"]+next_row["value"])/2.0 # interpolated data used in computations
+    }
+
 def _data_get(powerload_id, startdatetime, objectFlag=False):
     """Returns a list of dictionaries with time and powerload value in chronological order
     for the input powerload id"""
@@ -46,16 +58,10 @@ def _data_get(powerload_id, startdatetime, objectFlag=False):
         raise mysql_microgrid.MicrogridDBException("powerload_data_get failed for powerload id = "+str(powerload_id)+"\n"+str(error))
     reformatted_powerload_data = [None] * (len(powerload_data)-1)
     for i in range(0,len(powerload_data)-1):
-        start = startdatetime + timedelta(hours=powerload_data[i]["time"])
-        end = startdatetime + timedelta(hours=powerload_data[i+1]["time"])
-        mid = startdatetime + timedelta(hours=powerload_data[i]["time"]+((powerload_data[i+1]["time"]-powerload_data[i]["time"])/2.0))
-        reformatted_powerload_data[i] = {
-            "startdatetime": start if objectFlag else start.strftime(mysql_microgrid.DATETIMEFORMAT),
-            "middatetime": mid if objectFlag else mid.strftime(mysql_microgrid.DATETIMEFORMAT),
-            "enddatetime": end if objectFlag else end.strftime(mysql_microgrid.DATETIMEFORMAT),
-            "powerload_original": powerload_data[i]["value"], # original data
-            "powerload": (powerload_data[i]["value"]+powerload_data[i+1]["value"])/2.0 # interpolated data used in computations
-        }
+        reformatted_powerload_data[i] = _interval(startdatetime, powerload_data[i], powerload_data[i+1])
+        if not objectFlag:
+            for key in ["startdatetime", "middatetime", "enddatetime"]:
+                reformatted_powerload_data[i][key] = reformatted_powerload_data[i][key].strftime(mysql_microgrid.DATETIMEFORMAT)
     if not objectFlag: # return last data point submitted by user
         start = startdatetime + timedelta(hours=powerload_data[len(powerload_data)-1]["time"])
         reformatted_powerload_data.append({
@@ -67,16 +73,41 @@ def _data_get(powerload_id, startdatetime, objectFlag=False):
         })
     return reformatted_powerload_data
 
-def get_single(powerload_id, objectFlag=False):
-    """Returns a dictionaries metadata and powerload data for a given powerload id"""
+def data_chunks(powerload_id, startdatetime, chunk_size=10000):
+    """Generates lists of at most chunk_size dictionaries with time and powerload value in chronological order
+    for the input powerload id, as returned by get_single with objectFlag, streaming powerload_data rows
+    from the database so only one chunk of them is in memory at a time"""
     try:
-        powerload = mysql_microgrid.DB.query(
+        previous_row = None
+        with closing(mysql_microgrid.DB.query_chunks(
+            """SELECT time, value 
+                FROM powerload_data 
+                WHERE powerloadId = %s
+                ORDER BY time ASC""",
+            values=[powerload_id], output_format="dict", chunk_size=chunk_size)) as chunks:
+            for rows in chunks:
+                intervals = []
+                for row in rows:
+                    if previous_row is not None: intervals.append(_interval(startdatetime, previous_row, row))
+                    previous_row = row
+                if len(intervals) > 0: yield intervals
+    except Exception as error:
+        raise mysql_microgrid.MicrogridDBException("powerload data_chunks failed for powerload id = "+str(powerload_id)+"\n"+str(error))
+
+def get_info(powerload_id):
+    """Returns a dictionary of metadata for a given powerload id, with datetime objects"""
+    try:
+        return mysql_microgrid.DB.query(
             """SELECT name, description, startdatetime, enddatetime
                 FROM powerload
                 WHERE id = %s""",
             [powerload_id], output_format="dict")[0]
     except Exception as error:
         raise mysql_microgrid.MicrogridDBException("powerload_get select failed for id="+str(powerload_id)+"\n"+str(error))
+
+def get_single(powerload_id, objectFlag=False):
+    """Returns a dictionaries metadata and powerload data for a given powerload id"""
+    powerload = get_info(powerload_id)
     name = powerload["name"]
     description = powerload["description"]
     startdatetime = powerload["startdatetime"]
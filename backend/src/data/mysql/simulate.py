@@ -5,8 +5,17 @@ from . import model_helpers
 
 MODEL_HELPERS = model_helpers.ModelDatabaseHelpers("simulate")
 
+_TIMESTAMPS = ["startDate", "midDate", "endDate"]
+
+def _output_columns(rows):
+    """Returns columnar output (see Metrics.output_columns) of output stored as a list of dictionaries by timestep"""
+    output = {name:[row[name] for row in rows] for name in _TIMESTAMPS}
+    output["columns"] = {name:[row[name] for row in rows] for name in (rows[0] if len(rows) > 0 else {}) if name not in _TIMESTAMPS}
+    return output
+
 def metrics_get(id):
-    """Return a metrics dictionary from the database"""
+    """Return a metrics dictionary from the database, with output in columns (see Metrics.output_columns);
+    output stored as rows by earlier versions is converted"""
     try:
         record = mysql_microgrid.DB.query(
             """SELECT metrics
@@ -16,13 +25,15 @@ def metrics_get(id):
     except Exception as error:
         raise mysql_microgrid.MicrogridDBException("metrics_get select failed for id="+str(id)+"\n"+str(error))
     if record["metrics"] is not None:
-        return json.loads(zlib.decompress(record["metrics"]).decode())
+        metrics = json.loads(zlib.decompress(record["metrics"]).decode())
+        if isinstance(metrics["output"], list): metrics["output"] = _output_columns(metrics["output"])
+        return metrics
     return None
 
 def metrics_add(id, metrics):
     """Add a metrics object to the database"""
     try:
-        data_dict = {"metrics": zlib.compress(json.dumps(metrics).encode())}
+        data_dict = {"metrics": zlib.compress(json.dumps(metrics, separators=(",", ":")).encode())}
         where_dict = {"id": id}
         mysql_microgrid.DB.update(table_name="simulate", data_dict=data_dict, where_dict=where_dict)
     except Exception as error:
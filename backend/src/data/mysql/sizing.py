@@ -1,3 +1,7 @@
+import json
+import zlib
+import datetime
+import configparser
 from . import mysql_microgrid
 from .components import add as component_add
 from .grids import get_components as grid_get_components, add as grid_add, update_add_components as grid_update_add_components
@@ -5,6 +9,10 @@ from . import model_helpers
 
 MODEL_HELPERS = model_helpers.ModelDatabaseHelpers("sizing")
 
+_CONFIG_INI = configparser.ConfigParser()
+_CONFIG_INI.read("config.ini")
+DESIGN_CACHE_ENABLED = _CONFIG_INI.getboolean("CACHE", "SIZING_DESIGN_CACHE", fallback=False)
+
 def grid_get(id):
     """Returns a dictionary with sizing grid info"""
     try:
@@ -18,141 +26,228 @@ def grid_get(id):
     return sizing_grid
 
 
-def grid_component_add(id, component_type_id, unused_percentage, time_steps_percentage):
-    """Insert sizing grid data from result into database"""
+_GRIDS_SORT_FIELDS = ["id", "name", "deficitPercentage", "excessPercentage"] # sizing_grid fields grids_get sorts by
+
+def _components_by_grid(where, values, human_readable):
+    """Returns dictionary of the components of sizing grids by sizing grid id, read in one query joining
+    components, component types and spec data of the sizing grids matching the input where clause on
+    sizing_grid_component, and pivoted to one dictionary per sizing grid (see grid_components_get)"""
     try:
-        id = mysql_microgrid.DB.insert(
-            table_name="sizing_grid_component", 
-            data_dict={
-                "sizingGridId":id,
-                "componentTypeId":component_type_id,
-                "unusedPercentage":unused_percentage,
-                "timeStepsPercentage":time_steps_percentage,
-            }
-        )
+        rows = mysql_microgrid.DB.query(
+            """SELECT sizing_grid_component.sizingGridId AS gridId, sizing_grid_component.id AS componentId,
+                    component_type.name AS typeName, unusedPercentage, timeStepsPercentage,
+                    componentSpecMetaId, component_spec_meta.name AS specName, sizing_grid_component_spec_data.value AS value
+                FROM sizing_grid_component
+                JOIN component_type
+                ON component_type.id = sizing_grid_component.componentTypeId
+                LEFT JOIN sizing_grid_component_spec_data
+                ON sizing_grid_component_spec_data.sizingGridComponentId = sizing_grid_component.id
+                LEFT JOIN component_spec_meta
+                ON component_spec_meta.id = componentSpecMetaId
+                WHERE {0}
+                ORDER BY sizing_grid_component.id, componentSpecMetaId""".format(where),
+        values=values,output_format="dict")
     except Exception as error:
-        raise mysql_microgrid.MicrogridDBException("sizing_grid_component insert failed for sizing_grid with id = " \
-                                    +str(id)+"\n"+str(error))
-    return id
+        raise mysql_microgrid.MicrogridDBException("sizing_grid_component read failed\n"+str(error))
+    components_by_grid = dict()
+    for i, row in enumerate(rows):
+        components = components_by_grid.setdefault(row["gridId"], dict())
+        if row["componentSpecMetaId"] is not None:
+            components[row["specName"] if human_readable else row["componentSpecMetaId"]] = row["value"]
+        last_of_component = i == len(rows)-1 or rows[i+1]["componentId"] != row["componentId"]
+        if human_readable and last_of_component:
+            components[row["typeName"]+" Unused Ratio"] = row["unusedPercentage"]
+            components[row["typeName"]+" Time Steps Ratio"] = row["timeStepsPercentage"]
+    return components_by_grid
+
+def grid_components_get(id, human_readable=False):
+    """Read sizing grid components for input sizing grid id"""
+    return _components_by_grid("sizing_grid_component.sizingGridId = %s", [id], human_readable).get(id, dict())
+
+def _grids_filter(display_all, deficit_max):
+    """Returns where clause and values selecting the sizing grids of a sizing result id shown by grids_get"""
+    if deficit_max is None: deficit_max = 0.0
+    return "sizingId = %s AND deficitPercentage <= %s"+("" if display_all else " AND LENGTH(dominatedBy) = 0"), [deficit_max]
 
+def grids_count(id, display_all, deficit_max):
+    """Returns the number of sizing grids grids_get returns for the sizing result input id without pagination"""
+    where, values = _grids_filter(display_all, deficit_max)
+    try:
+        count = mysql_microgrid.DB.query(
+            """SELECT COUNT(*)
+                FROM sizing_grid
+                WHERE {0}""".format(where),
+        values=[id]+values,output_format="item")[0]
+    except Exception as error:
+        raise mysql_microgrid.MicrogridDBException("sizing_grids_count select failed for id="+str(id)+"\n"+str(error))
+    return count
+
+def grids_get(id, display_all, deficit_max, human_readable=True, sort_by=None, descending=False, page=None, page_size=100):
+    """Returns a list of dictionaries with all sizing grids for the sizing result input id,
+    non-dominated only unless display_all, with deficit percentage at most deficit_max (0 if None),
+    ordered by the sizing_grid field sort_by (id if None) and, if page is not None,
+    only the page_size sizing grids of that page (starting from 0);
+    grids and their components are read in two queries"""
+    if sort_by is None: sort_by = "id"
+    if sort_by not in _GRIDS_SORT_FIELDS:
+        raise ValueError("sizing grids can only be sorted by "+", ".join(_GRIDS_SORT_FIELDS))
+    if page is not None and (int(page) != page or page < 0 or int(page_size) != page_size or page_size < 1):
+        raise ValueError("sizing grids page must be a non-negative integer and page_size a positive integer")
+    where, values = _grids_filter(display_all, deficit_max)
+    selection = "WHERE {0} ORDER BY {1} {2}{3}{4}".format(
+        where, sort_by, "DESC" if descending else "ASC", "" if sort_by == "id" else ", id",
+        "" if page is None else " LIMIT %s OFFSET %s")
+    values = [id] + values + ([] if page is None else [int(page_size), int(page)*int(page_size)])
+    try:
+        sizing_grids = mysql_microgrid.DB.query(
+            """SELECT id as ID, name as Name, deficitPercentage AS "Sizing Grid Deficit Ratio", metricsSummaryStats {0}
+                FROM sizing_grid 
+                {1}""".format(", parent AS Parent, dominatedBy AS \"Dominated By\"" if display_all else "", selection),
+        values=values,output_format="dict")
+    except Exception as error:
+        raise mysql_microgrid.MicrogridDBException("sizing_grids_get select failed for id="+str(id)+"\n"+str(error))
+    if len(sizing_grids) == 0: return []
+    components_by_grid = _components_by_grid(
+        "sizing_grid_component.sizingGridId IN ({0})".format(",".join(["%s"]*len(sizing_grids))),
+        [sizing_grid["ID"] for sizing_grid in sizing_grids], human_readable)
+    return [sizing_grid | components_by_grid.get(sizing_grid["ID"], dict()) for sizing_grid in sizing_grids]
 
-def grid_component_spec_data_add(sizing_grid_component_id, component_spec_meta_parameter_name, value):
-    """Insert sizing grid component spec data into database"""
+def grid_designs_add(id, designs, replace=False):
+    """Insert sizing grids with their components and component spec data into database in one transaction,
+    with one multi-row insert per table and component spec meta ids read once;
+    designs are dictionaries of sizing_grid fields with a list of "components", each a dictionary of
+    sizing_grid_component fields with "specs", a dictionary of values by component_spec_meta parameterName.
+    With replace, the sizing grids already stored for the sizing result input id are deleted in the same transaction"""
+    parameter_names = sorted(set(name for design in designs for component in design["components"] for name in component["specs"]))
     try:
-        component_spec_meta_id = mysql_microgrid.DB.query(
-            """SELECT id
-                FROM component_spec_meta
-                WHERE parameterName = %s""",
-            values=[component_spec_meta_parameter_name],output_format="item")[0]
+        with mysql_microgrid.DB.transaction() as cursor:
+            if replace: cursor.execute("DELETE FROM sizing_grid WHERE sizingId = %s", [id])
+            if len(designs) == 0: return
+            spec_meta_ids = dict()
+            if len(parameter_names) > 0:
+                cursor.execute(
+                    """SELECT parameterName, id
+                        FROM component_spec_meta
+                        WHERE parameterName IN ({0})""".format(",".join(["%s"]*len(parameter_names))),
+                    parameter_names)
+                spec_meta_ids = dict(cursor.fetchall())
+            missing = [name for name in parameter_names if name not in spec_meta_ids]
+            if len(missing) > 0: raise ValueError("component_spec_meta missing parameterName "+", ".join(missing))
+            mysql_microgrid.DB.insert_many(cursor, "sizing_grid",
+                ["sizingId", "name", "deficitPercentage", "excessPercentage", "dominatedBy", "parent", "metricsSummaryStats"],
+                [[id, design["name"], design["deficitPercentage"], design["excessPercentage"], design["dominatedBy"],
+                  design["parent"], design["metricsSummaryStats"]] for design in designs])
+            cursor.execute("SELECT name, id FROM sizing_grid WHERE sizingId = %s ORDER BY id", [id])
+            grid_ids = dict(cursor.fetchall()) # the last inserted id by name
+            mysql_microgrid.DB.insert_many(cursor, "sizing_grid_component",
+                ["sizingGridId", "componentTypeId", "unusedPercentage", "timeStepsPercentage"],
+                [[grid_ids[design["name"]], component["componentTypeId"], component["unusedPercentage"],
+                  component["timeStepsPercentage"]] for design in designs for component in design["components"]])
+            cursor.execute(
+                """SELECT sizing_grid_component.sizingGridId, sizing_grid_component.componentTypeId, sizing_grid_component.id
+                    FROM sizing_grid_component
+                    JOIN sizing_grid
+                    ON sizing_grid.id = sizing_grid_component.sizingGridId
+                    WHERE sizingId = %s
+                    ORDER BY sizing_grid_component.id""", [id])
+            component_ids = { (grid_id, type_id):component_id for grid_id, type_id, component_id in cursor.fetchall() }
+            mysql_microgrid.DB.insert_many(cursor, "sizing_grid_component_spec_data",
+                ["sizingGridComponentId", "componentSpecMetaId", "value"],
+                [[component_ids[(grid_ids[design["name"]], component["componentTypeId"])], spec_meta_ids[name], value]
+                 for design in designs for component in design["components"] for name, value in component["specs"].items()])
     except Exception as error:
-        raise mysql_microgrid.MicrogridDBException("sizing_grid_component_spec_data_add read failed for parameterName = " \
-                                    +component_spec_meta_parameter_name+"\n"+str(error))
+        raise mysql_microgrid.MicrogridDBException("sizing_grid bulk insert failed for sizing with id = " \
+                                    +str(id)+"\n"+str(error))
+
+def design_cache_get(context_key):
+    """Returns dictionary of cached design evaluations by design name for the input context key"""
+    try:
+        records = mysql_microgrid.DB.query(
+            """SELECT design, metrics
+                FROM sizing_design_cache
+                WHERE contextKey = %s""",
+            values=[context_key])
+    except Exception as error:
+        raise mysql_microgrid.MicrogridDBException("sizing_design_cache read failed for contextKey = " \
+                                    +str(context_key)+"\n"+str(error))
+    return { design:json.loads(metrics) for design, metrics in records }
+
+def design_cache_add(context_key, evaluations):
+    """Insert dictionary of design evaluations by design name for the input context key in one transaction,
+    replacing evaluations of the same designs written concurrently by other runs"""
+    if len(evaluations) == 0: return
     try:
-        id = mysql_microgrid.DB.insert(
-            table_name="sizing_grid_component_spec_data", 
+        mysql_microgrid.DB.insert_update(
+            table_name="sizing_design_cache",
             data_dict={
-                "sizingGridComponentId":sizing_grid_component_id,
-                "componentSpecMetaId":component_spec_meta_id,
-                "value":value,
+                "contextKey":[context_key]*len(evaluations),
+                "design":list(evaluations.keys()),
+                "metrics":[json.dumps(metrics) for metrics in evaluations.values()],
+                "createdatetime":[datetime.datetime.now()]*len(evaluations),
             }
         )
     except Exception as error:
-        raise mysql_microgrid.MicrogridDBException("sizing_grid_component_spec_data_add failed for sizing_grid_component_id = " \
-                                    +str(id)+" and component_spec_meta_id = "+component_spec_meta_id+"\n"+str(error))
-    return id
+        raise mysql_microgrid.MicrogridDBException("sizing_design_cache insert failed for contextKey = " \
+                                    +str(context_key)+"\n"+str(error))
 
-def grid_component_spec_data_get(id, human_readable=False):
-    """Read sizing grid component spec data for input sizing grid component id"""
+def partial_front_add(id, progress, front):
+    """Replace the published progress dictionary and partial front (list of dictionaries by non-dominated design)
+    of the running sizing analysis with input id in one update"""
     try:
-        data = mysql_microgrid.DB.query(
-            """SELECT componentSpecMetaId AS id, name, sizing_grid_component_spec_data.value AS value
-                FROM sizing_grid_component_spec_data
-                JOIN component_spec_meta
-                ON component_spec_meta.id = componentSpecMetaId
-                WHERE sizingGridComponentId = %s""",
-        values=[id],output_format="dict")
+        mysql_microgrid.DB.update(
+            table_name="sizing",
+            data_dict={
+                "progress":json.dumps(progress, default=str),
+                "partialFront":zlib.compress(json.dumps(front).encode("utf-8")),
+            },
+            where_dict={"id":id}
+        )
     except Exception as error:
-        raise mysql_microgrid.MicrogridDBException("sizing_grid_component_spec_data read failed for sizing_grid_component with id = " \
-                                    +str(id)+"\n"+str(error))
-    data = { d["name"]:d["value"] for d in data } if human_readable else { d["id"]:d["value"] for d in data }
-    return data
+        raise mysql_microgrid.MicrogridDBException("partial_front_add update failed for id="+str(id)+"\n"+str(error))
 
-def grid_components_get(id, human_readable=False):
-    """Read sizing grid components for input sizing grid id"""
+def partial_front_get(id, deficit_max=None):
+    """Returns a dictionary with the progress and the partial front published by the sizing analysis with input id,
+    limited to designs with deficit percentage at most deficit_max"""
+    if deficit_max is None: deficit_max = 0.0
     try:
-        components = mysql_microgrid.DB.query(
-            """SELECT sizing_grid_component.id AS id, componentTypeId, unusedPercentage AS "Unused Ratio", timeStepsPercentage as "Time Steps Ratio", name
-                FROM sizing_grid_component
-                JOIN component_type
-                ON component_type.id = componentTypeId
-                WHERE sizingGridId = %s""",
-        values=[id],output_format="dict")
+        records = mysql_microgrid.DB.query(
+            """SELECT progress, partialFront, timeBudget
+                FROM sizing
+                WHERE id = %s""",
+            values=[id],output_format="dict")
     except Exception as error:
-        raise mysql_microgrid.MicrogridDBException("sizing_grid_component read failed for sizing_grid with id = " \
-                                    +str(id)+"\n"+str(error))
-    reformatted_components = dict()
-    for component in components:
-        try:
-            component_spec_data = grid_component_spec_data_get(component["id"], human_readable)
-        except Exception as error:
-            raise mysql_microgrid.MicrogridDBException("sizing_grid_components_get sizing_grid_component_spec_data_get failed for id="+str(component["id"])+"\n"+str(error))
-        reformatted_components = reformatted_components | component_spec_data
-        if human_readable:
-            for key, value in component.items():
-                if key not in ["id","name","componentTypeId"]:
-                    reformatted_components[component["name"]+" "+key] = value
-    return reformatted_components
-
-def grids_get(id, display_all, deficit_max, human_readable=True):
-    """Returns a list of dictionaries with all sizing grids for the sizing result input id"""
-    if deficit_max is None: deficit_max = 0.0
+        raise mysql_microgrid.MicrogridDBException("partial_front_get select failed for id="+str(id)+"\n"+str(error))
+    if len(records) == 0 or records[0]["progress"] is None:
+        return {"progress":None, "timeBudget":records[0]["timeBudget"] if len(records) > 0 else None, "front":[]}
+    front = json.loads(zlib.decompress(records[0]["partialFront"]).decode("utf-8"))
+    return {
+        "progress":json.loads(records[0]["progress"]),
+        "timeBudget":records[0]["timeBudget"],
+        "front":[design for design in front if design["deficit_percentage"] <= deficit_max],
+    }
+
+def time_budget_get(id):
+    """Returns the time budget (seconds) of the sizing analysis with input id, or None if it has none"""
     try:
-        sizing_grids = mysql_microgrid.DB.query(
-            """SELECT id as ID, name as Name, deficitPercentage AS "Sizing Grid Deficit Ratio", metricsSummaryStats {0}
-                FROM sizing_grid 
-                WHERE {1} sizingId = %s AND deficitPercentage <= {2}""".format(
-                    ", parent AS Parent, dominatedBy AS \"Dominated By\"" if display_all else "",
-                    "" if display_all else "LENGTH(dominatedBy) = 0 and",
-                    deficit_max,
-            ),
-        values=[id],output_format="dict")
+        records = mysql_microgrid.DB.query(
+            """SELECT timeBudget
+                FROM sizing
+                WHERE id = %s""",
+            values=[id],output_format="dict")
     except Exception as error:
-        raise mysql_microgrid.MicrogridDBException("sizing_grids_get select failed for id="+str(id)+"\n"+str(error))
-    sizing_grids_with_component_info = []
-    for sizing_grid in sizing_grids:
-        try:
-            components = grid_components_get(sizing_grid["ID"], human_readable)
-        except Exception as error:
-            raise mysql_microgrid.MicrogridDBException("sizing_grids_get sizing_grid_components_get failed for id="+str(sizing_grid["id"])+"\n"+str(error))
-        sizing_grids_with_component_info.append((sizing_grid | components))
-    return sizing_grids_with_component_info
-
-def grid_designs_remove(id):
-    """Delete sizing result from database"""
-    try:
-        mysql_microgrid.DB.delete("sizing_grid", {"sizingId": id})
-    except Exception as error:
-        raise mysql_microgrid.MicrogridDBException("grid_designs_remove failed for id="+str(id)+"\n"+str(error))
-
-def grid_design_add(id, name, deficit_percentage, excess_percentage, dominated_by, parent, metrics_summary_stats):
-    """Insert sizing grid from result into database"""
-    try:
-        id = mysql_microgrid.DB.insert(
-            table_name="sizing_grid", 
-            data_dict={ 
-                "sizingId":id,
-                "name":name,
-                "deficitPercentage":deficit_percentage,
-                "excessPercentage":excess_percentage,
-                "dominatedBy":dominated_by,
-                "parent":parent,
-                "metricsSummaryStats":metrics_summary_stats,
-            }
-        )
+        raise mysql_microgrid.MicrogridDBException("time_budget_get select failed for id="+str(id)+"\n"+str(error))
+    return records[0]["timeBudget"] if len(records) > 0 else None
+
+def time_budget_set(id, time_budget):
+    """Set the time budget (seconds) of the sizing analysis with input id; a running analysis reads it
+    at least every 30 seconds and stops with the best front found so far once it has passed"""
+    if time_budget is not None and time_budget <= 0:
+        return False, "Time budget must be positive"
+    try:
+        mysql_microgrid.DB.update(table_name="sizing", data_dict={"timeBudget":time_budget}, where_dict={"id":id})
     except Exception as error:
-        raise mysql_microgrid.MicrogridDBException("sizing_grid insert failed for sizing with id = " \
-                                    +str(id)+"\n"+str(error))
-    return id
+        raise mysql_microgrid.MicrogridDBException("time_budget_set update failed for id="+str(id)+"\n"+str(error))
+    return True, "Success"
 
 def result_save_to_grids(user_id, sizing_grid_id):
     """Save sizing grid from sizing result to user's components and grid"""
@@ -37,12 +37,37 @@ def add(dataframe, table_name):
     except Exception as error:
         raise mysql_weather.WeatherDBException("weather add failed: "+str(error))
 
-def read(location_id):
-    """Read all weather records for input location id from the database"""
+def read(location_id, stats=None, columns=None, start=None, end=None, dtype="float32"):
+    """Read weather records for input location id from the database
+
+    Keyword arguments:
+    location_id             database id of location
+    stats                   list of yearOrStat values to read, e.g. ["mean"] (all years and stats if None)
+    columns                 list of metric columns to read (METRIC_COLS_SQL if None)
+    start                   (month, day) of first day to read (from January 1st if None)
+    end                     (month, day) of last day to read (through December 31st if None)
+    dtype                   dtype of metric columns (as returned by the database driver if None)
+    """
+    if columns is None: columns = METRIC_COLS_SQL
+    for column in columns:
+        if column not in METRIC_COLS_SQL:
+            raise ValueError("weather read unknown column: "+str(column))
+    query = "SELECT locationId, yearOrStat, month, day, hour, minute, {0} FROM weather WHERE locationId = %s".format(
+        ", ".join(columns)
+    )
+    params = [location_id]
+    if stats is not None:
+        query += " AND yearOrStat IN ({0})".format(", ".join(["%s"]*len(stats)))
+        params += [str(stat) for stat in stats]
+    if start is not None:
+        query += " AND (month, day) >= (%s, %s)"
+        params += [int(start[0]), int(start[1])]
+    if end is not None:
+        query += " AND (month, day) <= (%s, %s)"
+        params += [int(end[0]), int(end[1])]
     try:
         dataframe = mysql_weather.DB.read_dataframe(
-            """SELECT * FROM weather 
-            WHERE locationId = {0}""".format(location_id)
+            query, params=tuple(params), dtype=None if dtype is None else { column:dtype for column in columns }
         )
     except Exception as error:
         raise mysql_weather.WeatherDBException("weather read failed: "+str(error))
@@ -54,7 +79,7 @@ def generate_summary_records():
     location_ids = database_locations.get_ids()
     for location_id in location_ids:
         print(location_id, flush=True)
-        data = read(location_id)
+        data = read(location_id, dtype=None)
         groups = dict()
         for stat in ["mean", "std", "min", "median", "max"]:
             # fillna(0) for std with only one data point
@@ -1,2 +1,5 @@
 from .grid import Grid
 from .grid_state import GridState
+from .simulation_trace import SimulationTrace
+from .grid_kernel import GridKernel
+from .batch_grid_kernel import BatchGridKernel
@@ -0,0 +1,407 @@
+import numpy
+from src.components import defaults
+from src.reports import Metrics, MetricsSummary, InfeasibleRun
+
+_DIESEL_ENERGY_PER_GALLON = 37.658 # kWh per gallon of diesel (see DieselGenerator._fuel_cons_rate)
+
+class BatchGridKernel(object):
+
+    def __init__(self, generators, timesteps, renewable_power_profile, energy_management_system, diesel_level):
+        """BatchGridKernel constructor __init__
+        Steps many designs of the same grid through a timeline together: the time loop
+        runs in python and the state of every design (battery charge, diesel fuel, case)
+        is updated with vectorized numpy operations
+
+        Keyword arguments:
+        generators                  dictionary with generator types as keys and lists
+                                    containing exactly one generator as values
+        timesteps                   list of TimeStep objects in chronological order
+        renewable_power_profile     function returning the power output by timestep
+                                    of an input renewable generator at its current rating
+        energy_management_system    string name of Grid energy management system method
+        diesel_level                volume of fuel available to the grid at the start of each run
+        """
+        for type, generator_list in generators.items():
+            if len(generator_list) != 1:
+                raise ValueError("Exactly 1 "+type+" is required in grid")
+        if energy_management_system not in _ENERGY_MANAGEMENT_SYSTEMS:
+            raise ValueError("energy management system undefined for BatchGridKernel: "+str(energy_management_system))
+        self._generators = { type:generator_list[0] for type, generator_list in generators.items() }
+        self.types = list(self._generators.keys())
+        self._metric_types = sorted(self.types)
+        self._timesteps = timesteps
+        self._renewable_power_profile = renewable_power_profile
+        self._energy_management_system = _ENERGY_MANAGEMENT_SYSTEMS[energy_management_system]
+        self._diesel_level = diesel_level
+        self._load = numpy.array([timestep.power_load() for timestep in timesteps], dtype=float)
+        self._duration = numpy.array([timestep.time_period().duration() for timestep in timesteps], dtype=float)
+        self._weight = numpy.array([timestep.weight() for timestep in timesteps], dtype=float)
+        self._online_ratio = {
+            type:numpy.array([timestep.online_ratio()[generator] for timestep in timesteps], dtype=float)
+            for type, generator in self._generators.items()
+        }
+
+    def _lower(self, ratings):
+        """Per-design parameter arrays; components are updated in design order as
+        Grid.update_components_doe would for each design"""
+        num_designs = ratings.shape[0]
+        zeros = lambda: numpy.zeros(num_designs)
+        p = {
+            "present":{ type:ratings[:,j] != 0 for j, type in enumerate(self.types) },
+            "renewable":{},
+            "dg_power":zeros(), "dg_rate":zeros(), "dg_max_power":zeros(), "dg_max_rate":zeros(),
+            "dg_min_power":zeros(), "dg_min_rate":zeros(), "dg_soft_min_power":zeros(),
+            "b_energy":zeros(), "b_power":zeros(), "b_charge_power":zeros(),
+            "b_charge_eff":numpy.ones(num_designs), "b_discharge_eff":numpy.ones(num_designs),
+            "b_min_charge":zeros(), "b_max_charge":zeros(),
+        }
+        for j, type in enumerate(self.types):
+            generator = self._generators[type]
+            if type in defaults.renewable_generator_types():
+                p["renewable"][type] = numpy.zeros((len(self._timesteps), num_designs))
+            for i in range(num_designs):
+                rating = ratings[i, j].item()
+                if rating == 0: continue
+                generator.update(rating)
+                if type in defaults.renewable_generator_types():
+                    p["renewable"][type][:,i] = self._renewable_power_profile(generator)
+                if type == defaults.DIESEL_GENERATOR:
+                    for load_factor, power, rate in [
+                        (generator._load_factor, "dg_power", "dg_rate"),
+                        (1.0, "dg_max_power", "dg_max_rate"),
+                        (generator._soft_min, "dg_min_power", "dg_min_rate"),
+                    ]:
+                        p[power][i] = generator._power_rating * load_factor
+                        p[rate][i] = p[power][i] * load_factor / (_DIESEL_ENERGY_PER_GALLON * generator._epg_efficiency)
+                    p["dg_soft_min_power"][i] = generator._power_rating * generator._soft_min
+                elif type == defaults.BATTERY:
+                    p["b_energy"][i] = generator._energy_rating
+                    p["b_power"][i] = generator._power_rating
+                    p["b_charge_power"][i] = generator._charge_power_rating
+                    p["b_charge_eff"][i] = generator._charge_efficiency
+                    p["b_discharge_eff"][i] = generator._discharge_efficiency
+                    p["b_min_charge"][i] = generator._energy_rating * generator._min_soc
+                    p["b_max_charge"][i] = generator._energy_rating * generator._max_soc
+        return p
+
+    def run(self, ratings, stop_at_deficit=False):
+        """Simulate every design over the timeline and return a MetricsSummary per design,
+        or an InfeasibleRun for a design with a deficit if stop_at_deficit
+
+        Keyword arguments:
+        ratings             2-d array with a row per design and a column per generator type
+                            (in the order of the generators dictionary); a rating of 0 removes the type
+        stop_at_deficit     stop simulating each design at its first deficit timestep:
+                            designs with deficits are dropped from the arrays stepped
+                            once they are a quarter of them, and the loop ends when all have one
+        """
+        ratings = numpy.asarray(ratings)
+        num_designs = ratings.shape[0]
+        if num_designs == 0: return []
+        designs = numpy.arange(num_designs) # design index by array position
+        first_deficit = numpy.full(num_designs, -1)
+        p = self._lower(ratings)
+        EPSILON = defaults.EPSILON
+        METRICS_EPSILON = Metrics._EPSILON
+        present = p["present"]
+        has = { type:type in present for type in defaults.generator_types() }
+        no_power = numpy.zeros(num_designs)
+        dg_present = present[defaults.DIESEL_GENERATOR] if has[defaults.DIESEL_GENERATOR] else no_power > 0
+        b_present = present[defaults.BATTERY] if has[defaults.BATTERY] else no_power > 0
+        dg_power, dg_rate = p["dg_power"], p["dg_rate"]
+        dg_max_power, dg_max_rate = p["dg_max_power"], p["dg_max_rate"]
+        dg_min_power, dg_min_rate = p["dg_min_power"], p["dg_min_rate"]
+        b_power, b_charge_power = p["b_power"], p["b_charge_power"]
+        b_charge_eff, b_discharge_eff = p["b_charge_eff"], p["b_discharge_eff"]
+        b_min_charge, b_max_charge = p["b_min_charge"], p["b_max_charge"]
+
+        # state
+        fuel_level = numpy.zeros(num_designs)
+        diesel_level = numpy.full(num_designs, self._diesel_level)
+        charge = p["b_energy"].copy()
+        case = numpy.zeros(num_designs, dtype=numpy.int8) # 0 stands in for no previous case
+
+        # statistics
+        deficit_count = numpy.zeros(num_designs)
+        deficit_time = numpy.zeros(num_designs)
+        excess_count = numpy.zeros(num_designs)
+        unused_ratio = { type:numpy.zeros(num_designs) for type in self._metric_types }
+        unused_count = { type:numpy.zeros(num_designs) for type in self._metric_types }
+        energy_totals = { type:numpy.zeros(num_designs) for type in [defaults.LOAD] + self._metric_types }
+        diesel_gallons = numpy.zeros(num_designs)
+        diesel_wet_stacking_hours = numpy.zeros(num_designs)
+
+        def average_power(energy, duration):
+            return energy / duration if duration > 0 else energy * 0.0
+
+        def diesel_energy(online_duration, power, rate):
+            """Diesel energy at input load factor (fuel is refilled then removed as in Grid)"""
+            fuel = numpy.minimum(rate * online_duration, diesel_level)
+            level = numpy.where(fuel > 0.0, fuel_level + fuel, fuel_level)
+            energy = numpy.where(dg_present, power * numpy.minimum(level, rate * online_duration) / rate, 0.0)
+            return energy, level - fuel
+
+        def battery_discharge_energy(online_duration):
+            return numpy.where(b_present, b_power * numpy.minimum(
+                online_duration, numpy.maximum(0, charge - b_min_charge) / b_power
+            ) * b_discharge_eff, 0.0)
+
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            for t in range(len(self._timesteps)):
+                d = self._duration[t].item()
+                w = self._weight[t].item()
+                load = self._load[t].item()
+                od = { type:d * self._online_ratio[type][t].item() for type in self.types }
+                renewable = { type:p["renewable"][type][t] for type in p["renewable"] }
+
+                # fully online power (only changes state through diesel fuel rounding)
+                if has[defaults.DIESEL_GENERATOR]:
+                    _, fuel_level = diesel_energy(d, dg_max_power, dg_max_rate)
+
+                # Identify energy available, including upper and lower bounds
+                e_load = - (load * d)
+                e_pv = renewable[defaults.PHOTOVOLTAIC_PANEL] * od[defaults.PHOTOVOLTAIC_PANEL] \
+                    if has[defaults.PHOTOVOLTAIC_PANEL] else no_power
+                e_wt = renewable[defaults.WIND_TURBINE] * od[defaults.WIND_TURBINE] \
+                    if has[defaults.WIND_TURBINE] else no_power
+                if has[defaults.DIESEL_GENERATOR]:
+                    od_dg = od[defaults.DIESEL_GENERATOR]
+                    e_diesel_min, fuel_level = diesel_energy(od_dg, dg_min_power, dg_min_rate)
+                    e_diesel_max, fuel_level = diesel_energy(od_dg, dg_max_power, dg_max_rate)
+                else: e_diesel_min = e_diesel_max = no_power
+                if has[defaults.BATTERY]:
+                    od_b = od[defaults.BATTERY]
+                    e_battery_discharge = battery_discharge_energy(od_b)
+                    e_battery_charge = - numpy.where(b_present, numpy.minimum(
+                        numpy.maximum(0, (b_max_charge - charge) / b_charge_eff), b_charge_power * od_b
+                    ), 0.0)
+                else: e_battery_discharge = e_battery_charge = no_power
+
+                # identify case for current timestep
+                case = self._energy_management_system(
+                    average_power(e_load, d),
+                    average_power(e_pv, d),
+                    average_power(e_wt, d),
+                    average_power(e_diesel_max, d),
+                    average_power(e_battery_discharge, d),
+                    average_power(e_battery_charge, d),
+                    case,
+                    p["dg_soft_min_power"],
+                    dg_present,
+                )
+
+                # generation (do not allow excess from renewables)
+                energy = e_load + e_pv + e_wt
+                energy_diesel = numpy.zeros(num_designs)
+                energy_battery = numpy.zeros(num_designs)
+                diesel_4 = numpy.minimum(e_diesel_max, numpy.maximum(0.0, -energy))
+                battery_4 = numpy.minimum(e_battery_discharge, numpy.maximum(0.0, -(energy+diesel_4)))
+                diesel_3 = numpy.minimum(e_diesel_max, numpy.maximum(0.0, -(energy+e_battery_charge)))
+                battery_3 = numpy.minimum(-(energy+diesel_3), 0.0)
+                battery_2 = numpy.minimum(e_battery_discharge, numpy.maximum(0.0, -energy))
+                energy_1 = e_load + e_battery_charge
+                pv_1 = numpy.minimum(e_pv, -1*energy_1)
+                energy_1 = energy_1 + pv_1
+                wt_1 = numpy.where(energy_1 < 0.0, numpy.minimum(e_wt, -1*energy_1), 0.0)
+                energy_available_to_charge = e_load + wt_1 + pv_1
+                battery_1 = numpy.where(energy_available_to_charge <= 0, 0.0,
+                                        numpy.maximum(e_battery_charge, -1*energy_available_to_charge))
+                energy_diesel = numpy.select([case == 4, case == 3], [diesel_4, diesel_3], 0.0)
+                energy_battery = numpy.select(
+                    [case == 4, case == 3, case == 2, case == 1, case == 0],
+                    [battery_4, battery_3, battery_2, battery_1, e_battery_charge], 0.0
+                )
+                energies = {
+                    defaults.PHOTOVOLTAIC_PANEL:numpy.where(case == 1, pv_1, e_pv),
+                    defaults.WIND_TURBINE:numpy.where(case == 1, wt_1, e_wt),
+                    defaults.DIESEL_GENERATOR:energy_diesel,
+                    defaults.BATTERY:energy_battery,
+                }
+                powers = { type:average_power(energies[type], d) for type in self.types }
+
+                # generate power
+                available = {
+                    defaults.PHOTOVOLTAIC_PANEL:average_power(e_pv, d),
+                    defaults.WIND_TURBINE:average_power(e_wt, d),
+                    defaults.DIESEL_GENERATOR:average_power(e_diesel_max, d),
+                    defaults.BATTERY:average_power(e_battery_discharge, d),
+                }
+                generation = { type:no_power for type in self.types }
+                fuel_consumed = numpy.zeros(num_designs)
+                wet_stacking_flag = numpy.zeros(num_designs, dtype=bool)
+                for type in self.types:
+                    generate = present[type] & (powers[type] > 0.0)
+                    unmet_energy = powers[type] * d
+                    unmet_power = unmet_energy / od[type] if od[type] > 0 else unmet_energy * 0.0
+                    if type == defaults.DIESEL_GENERATOR:
+                        fuel = numpy.minimum(
+                            dg_rate * ((unmet_power * od[type]) / dg_power),
+                            dg_rate * od[type]
+                        )
+                        fuel = numpy.minimum(numpy.maximum(0.0, fuel - fuel_level + EPSILON), diesel_level)
+                        refill = generate & (fuel > 0.0)
+                        fuel_level = numpy.where(refill, fuel_level + fuel, fuel_level)
+                        diesel_level = numpy.where(refill, diesel_level - fuel, diesel_level)
+                        energy = numpy.minimum(
+                            dg_max_power * numpy.minimum(fuel_level, dg_max_rate * od[type]) / dg_max_rate,
+                            unmet_power * od[type]
+                        )
+                        fuel_level = numpy.where(generate, fuel_level - dg_rate * (energy / dg_power), fuel_level)
+                        fuel_consumed = numpy.where(generate, numpy.where(refill, fuel, 0.0), fuel_consumed)
+                        wet_stacking_flag = numpy.where(generate, unmet_power < p["dg_soft_min_power"], wet_stacking_flag)
+                    elif type == defaults.BATTERY:
+                        energy = numpy.minimum(battery_discharge_energy(od[type]), unmet_power * od[type])
+                        store = present[type] & (powers[type] < 0.0)
+                        unstored_power = -unmet_energy / od[type] if od[type] > 0 else unmet_energy * 0.0
+                        charge_duration = numpy.minimum(numpy.minimum(
+                            od[type], (unstored_power * od[type]) / b_charge_power),
+                            numpy.maximum(0, (b_max_charge - charge) / b_charge_eff) / b_charge_power,
+                        )
+                        charge_energy = b_charge_power * charge_duration
+                        usable = charge_energy * b_charge_eff
+                        stored = usable + (charge_energy - usable)
+                        if numpy.any(store & (-unmet_energy - stored > EPSILON)):
+                            raise ValueError("Unstored energy error: "+str(numpy.max(
+                                numpy.where(store, -unmet_energy - stored, 0.0))))
+                        charge = numpy.where(generate, charge - energy / b_discharge_eff,
+                                             numpy.where(store, charge + usable, charge))
+                        generation[type] = numpy.where(store, average_power(-1*stored, d), 0.0)
+                        fuel_consumed = numpy.where(generate, 0.0, fuel_consumed)
+                        wet_stacking_flag = numpy.where(generate, False, wet_stacking_flag)
+                    else:
+                        energy = numpy.minimum(renewable[type] * od[type], unmet_power * od[type])
+                        fuel_consumed = numpy.where(generate, 0.0, fuel_consumed)
+                        wet_stacking_flag = numpy.where(generate, False, wet_stacking_flag)
+                    generation[type] = numpy.where(generate, average_power(energy, d), generation[type])
+
+                # statistics (same arithmetic and order as Metrics)
+                deficit = -1 * load
+                excess = 0.0
+                for type in self._metric_types:
+                    deficit = deficit + generation[type]
+                    excess = excess + (available[type] - generation[type])
+                    in_use = (available[type] > 100*METRICS_EPSILON) & (generation[type] > 100*METRICS_EPSILON)
+                    unused_ratio[type] += numpy.where(in_use, (available[type] - generation[type]) / available[type] * w, 0.0)
+                    unused_count[type] += numpy.where(in_use, w, 0.0)
+                    energy_totals[type] += generation[type] * d * w
+                energy_totals[defaults.LOAD] += -1 * load * d * w
+                is_deficit = deficit < -METRICS_EPSILON
+                deficit_count += numpy.where(is_deficit, w, 0.0)
+                deficit_time += numpy.where(is_deficit, d * w, 0.0)
+                excess_count += numpy.where(excess > 100*METRICS_EPSILON, w, 0.0)
+                diesel_gallons += fuel_consumed * w
+                diesel_wet_stacking_hours += wet_stacking_flag * d * w
+
+                if not stop_at_deficit: continue
+                first_deficit[designs[is_deficit & (first_deficit[designs] < 0)]] = t
+                keep = first_deficit[designs] < 0
+                if not numpy.any(keep): break
+                if 4 * numpy.count_nonzero(~keep) < len(keep): continue
+                designs = designs[keep]
+                num_designs = len(designs)
+                p = _take(p, keep)
+                present = p["present"]
+                (no_power, dg_present, b_present, dg_power, dg_rate, dg_max_power, dg_max_rate, dg_min_power, dg_min_rate,
+                 b_power, b_charge_power, b_charge_eff, b_discharge_eff, b_min_charge, b_max_charge,
+                 fuel_level, diesel_level, charge, case,
+                 deficit_count, deficit_time, excess_count, unused_ratio, unused_count, energy_totals,
+                 diesel_gallons, diesel_wet_stacking_hours) = _take((
+                    no_power, dg_present, b_present, dg_power, dg_rate, dg_max_power, dg_max_rate, dg_min_power, dg_min_rate,
+                    b_power, b_charge_power, b_charge_eff, b_discharge_eff, b_min_charge, b_max_charge,
+                    fuel_level, diesel_level, charge, case,
+                    deficit_count, deficit_time, excess_count, unused_ratio, unused_count, energy_totals,
+                    diesel_gallons, diesel_wet_stacking_hours), keep)
+
+        def summary(i):
+            return MetricsSummary(
+                num_timesteps = numpy.sum(self._weight).item(),
+                types = self._metric_types,
+                deficit_count = deficit_count[i].item(),
+                deficit_time = deficit_time[i].item(),
+                excess_count = excess_count[i].item(),
+                unused_ratio = { type:unused_ratio[type][i].item() for type in self._metric_types },
+                unused_count = { type:unused_count[type][i].item() for type in self._metric_types },
+                energy = { type:energy_totals[type][i].item() for type in energy_totals },
+                diesel_gallons = diesel_gallons[i].item(),
+                diesel_wet_stacking_hours = diesel_wet_stacking_hours[i].item(),
+            )
+
+        if not stop_at_deficit: return [summary(i) for i in range(num_designs)]
+        position = { design:i for i, design in enumerate(designs.tolist()) }
+        return [InfeasibleRun(first_deficit[design].item()) if first_deficit[design] >= 0 else summary(position[design])
+                for design in range(len(first_deficit))]
+
+
+def _take(arrays, keep):
+    """Returns the input array, or tuple or dictionary of them, restricted to the designs kept
+    (designs are the last axis of every array)"""
+    if isinstance(arrays, dict): return { key:_take(value, keep) for key, value in arrays.items() }
+    if isinstance(arrays, tuple): return tuple(_take(value, keep) for value in arrays)
+    return numpy.compress(keep, arrays, axis=-1)
+
+
+def _wet_stacking(power, soft_min_power, diesel_present):
+    """Vectorized Grid._wet_stacking"""
+    return diesel_present & (power < soft_min_power)
+
+def _energy_management_system_1(load, photovoltaic, wind, diesel_max, battery_discharge,
+                                battery_charge, previous_case, soft_min_power, diesel_present):
+    """Vectorized Grid._energy_management_system_1"""
+    return numpy.select([
+        load > 0,
+        photovoltaic + wind + load >= 0,
+        photovoltaic + wind + diesel_max + load >= 0,
+    ], [0, 1, 3], 4).astype(numpy.int8)
+
+def _energy_management_system_2(load, photovoltaic, wind, diesel_max, battery_discharge,
+                                battery_charge, previous_case, soft_min_power, diesel_present):
+    """Vectorized Grid._energy_management_system_2"""
+    battery_full = numpy.abs(battery_charge) < defaults.EPSILON
+    battery_meets_load = photovoltaic + wind + battery_discharge + load >= 0
+    case_1 = numpy.where((photovoltaic + wind + load + battery_charge <= 0) & (previous_case == 3), 3, 1)
+    case_other = numpy.select([
+        battery_meets_load & (battery_full | (previous_case == 2) | (previous_case == 4)),
+        photovoltaic + wind + diesel_max + load >= 0,
+    ], [2, 3], 4)
+    case_other = numpy.where(
+        (case_other == 3) & battery_meets_load & battery_full
+            & _wet_stacking(load-photovoltaic-wind, soft_min_power, diesel_present),
+        2, case_other
+    )
+    return numpy.select([
+        load > 0,
+        photovoltaic + wind + load >= 0,
+    ], [0, case_1], case_other).astype(numpy.int8)
+
+def _energy_management_system_3(load, photovoltaic, wind, diesel_max, battery_discharge,
+                                battery_charge, previous_case, soft_min_power, diesel_present):
+    """Vectorized Grid._energy_management_system_3"""
+    battery_full = numpy.abs(battery_charge) < defaults.EPSILON
+    battery_meets_load = photovoltaic + wind + battery_discharge + load >= 0
+    case_1 = numpy.where((photovoltaic + wind + load + battery_charge <= 0)
+                         & ((previous_case == 3) | (previous_case == 5)), 3, 1)
+    case_other = numpy.select([
+        photovoltaic + wind + diesel_max + load >= 0,
+        battery_meets_load,
+    ], [3, 2], 4)
+    continue_battery = (case_other == 3) & (previous_case > 0) & (previous_case <= 2) & battery_meets_load
+    avoid_wet_stacking = (case_other == 3) & (previous_case >= 3) & battery_meets_load & battery_full \
+        & _wet_stacking(load-photovoltaic-wind, soft_min_power, diesel_present)
+    case_other = numpy.where(continue_battery | avoid_wet_stacking, 2, case_other)
+    return numpy.select([
+        load > 0,
+        photovoltaic + wind + load >= 0,
+    ], [0, case_1], case_other).astype(numpy.int8)
+
+def _energy_management_system_4(load, photovoltaic, wind, diesel_max, battery_discharge,
+                                battery_charge, previous_case, soft_min_power, diesel_present):
+    """Vectorized Grid._energy_management_system_4"""
+    return _energy_management_system_1(load, photovoltaic, wind, diesel_max, battery_discharge,
+                                       battery_charge, previous_case, soft_min_power, diesel_present)
+
+_ENERGY_MANAGEMENT_SYSTEMS = {
+    "_energy_management_system_1": _energy_management_system_1,
+    "_energy_management_system_2": _energy_management_system_2,
+    "_energy_management_system_3": _energy_management_system_3,
+    "_energy_management_system_4": _energy_management_system_4,
+}
@@ -90,13 +90,17 @@ class Grid(object):
         online_duration = duration * self._online_ratio[generator]
         return online_duration
 
-    def update_current_conditions(self, timestep, weather):
-        """Update weather, grid connnectivity, generator availability"""
+    def update_current_conditions(self, timestep, weather, exogenous_power=None):
+        """Update weather, grid connnectivity, generator availability
+        exogenous_power    dictionary mapping generators to precomputed power for the timestep"""
         self._online_ratio = timestep.online_ratio()
         self._available_power = {}
         for type in self._generators:
             for generator in self._generators[type]:
-                generator.update_current_conditions(timestep, weather)
+                generator.update_current_conditions(
+                    timestep, weather,
+                    exogenous_power.get(generator) if exogenous_power is not None else None
+                )
 
     def _wet_stacking(self, power):
         """True if power will cause wet stacking
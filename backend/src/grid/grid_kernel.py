@@ -0,0 +1,441 @@
+import numpy
+from .simulation_trace import SimulationTrace
+from src.components import defaults
+
+_DIESEL_ENERGY_PER_GALLON = 37.658 # kWh per gallon of diesel (see DieselGenerator._fuel_cons_rate)
+
+class GridKernel(object):
+
+    def __init__(self, grid):
+        """GridKernel constructor __init__
+        Lowers the components of a grid into flat float arrays so the dispatch loop
+        runs over plain scalars instead of component objects
+
+        Keyword arguments:
+        grid            grid to lower (component state is read at construction and written back after run)
+        """
+        self._grid = grid
+        self.generators = grid.get_generators()
+        self.types = list(grid.get_generator_dict().keys())
+        index = {generator:i for i, generator in enumerate(self.generators)}
+        self.type_indices = {
+            type:[index[generator] for generator in grid.get_generator_dict()[type]]
+            for type in self.types
+        }
+        num_generators = len(self.generators)
+        self.renewable_indices = [i for i, generator in enumerate(self.generators)
+                                  if generator.__class__.__name__ in defaults.renewable_generator_types()]
+        self.diesel_indices = self.type_indices.get(defaults.DIESEL_GENERATOR, [])
+        self.battery_indices = self.type_indices.get(defaults.BATTERY, [])
+
+        # diesel generator ratings and fuel curves at configured, max and min load factors
+        self.diesel_power_rating = numpy.zeros(num_generators)
+        self.diesel_soft_min_power = numpy.zeros(num_generators)
+        self.diesel_power = numpy.zeros(num_generators)
+        self.diesel_fuel_rate = numpy.zeros(num_generators)
+        self.diesel_max_power = numpy.zeros(num_generators)
+        self.diesel_max_fuel_rate = numpy.zeros(num_generators)
+        self.diesel_min_power = numpy.zeros(num_generators)
+        self.diesel_min_fuel_rate = numpy.zeros(num_generators)
+        self.diesel_fuel_level = numpy.zeros(num_generators)
+        for i in self.diesel_indices:
+            dg = self.generators[i]
+            self.diesel_power_rating[i] = dg._power_rating
+            self.diesel_soft_min_power[i] = dg._power_rating * dg._soft_min
+            for load_factor, power, rate in [
+                (dg._load_factor, self.diesel_power, self.diesel_fuel_rate),
+                (1.0, self.diesel_max_power, self.diesel_max_fuel_rate),
+                (dg._soft_min, self.diesel_min_power, self.diesel_min_fuel_rate),
+            ]:
+                power[i] = dg._power_rating * load_factor
+                rate[i] = power[i] * load_factor / (_DIESEL_ENERGY_PER_GALLON * dg._epg_efficiency)
+            self.diesel_fuel_level[i] = dg._fuel_level
+
+        # battery capacities, power limits, efficiencies and state of charge limits
+        self.battery_energy_rating = numpy.zeros(num_generators)
+        self.battery_power_rating = numpy.zeros(num_generators)
+        self.battery_charge_power_rating = numpy.zeros(num_generators)
+        self.battery_charge_efficiency = numpy.ones(num_generators)
+        self.battery_discharge_efficiency = numpy.ones(num_generators)
+        self.battery_min_charge = numpy.zeros(num_generators)
+        self.battery_max_charge = numpy.zeros(num_generators)
+        self.battery_charge_level = numpy.zeros(num_generators)
+        for i in self.battery_indices:
+            b = self.generators[i]
+            self.battery_energy_rating[i] = b._energy_rating
+            self.battery_power_rating[i] = b._power_rating
+            self.battery_charge_power_rating[i] = b._charge_power_rating
+            self.battery_charge_efficiency[i] = b._charge_efficiency
+            self.battery_discharge_efficiency[i] = b._discharge_efficiency
+            self.battery_min_charge[i] = b._energy_rating * b._min_soc
+            self.battery_max_charge[i] = b._energy_rating * b._max_soc
+            self.battery_charge_level[i] = b._charge_level
+        self.diesel_level = grid.get_diesel_level()
+
+        self.trace = None # SimulationTrace of the outputs by timestep, allocated by run
+
+    def run(self, energy_management_system, load, duration, online_ratio, renewable_power, after_timestep=None,
+            previous_case=None):
+        """Run the dispatch loop over all timesteps; mirrors Grid.operate
+        Returns the case of the last timestep run
+
+        Keyword arguments:
+        energy_management_system    string name of Grid energy management system method
+        load                        array of power load by timestep
+        duration                    array of timestep durations (hours)
+        online_ratio                array (timesteps x generators) of online ratios
+        renewable_power             array (timesteps x renewable generators) of renewable power
+        after_timestep              function called with each timestep index once its results are stored;
+                                    the loop stops early if it returns True
+        previous_case               case of the timestep before the first (e.g. the last of a previous run)
+        """
+        if energy_management_system not in _ENERGY_MANAGEMENT_SYSTEMS:
+            raise ValueError("energy management system undefined for GridKernel: "+str(energy_management_system))
+        energy_management_system = _ENERGY_MANAGEMENT_SYSTEMS[energy_management_system]
+        num_timesteps = len(load)
+        num_generators = len(self.generators)
+        self.trace = SimulationTrace(self.generators, num_timesteps)
+        trace = self.trace
+
+        # plain python scalars and lists for the loop
+        EPSILON = defaults.EPSILON
+        types = self.types
+        pv = self.type_indices.get(defaults.PHOTOVOLTAIC_PANEL, [])
+        wt = self.type_indices.get(defaults.WIND_TURBINE, [])
+        dgs = self.diesel_indices
+        bs = self.battery_indices
+        renewable_column = [None] * num_generators
+        for column, i in enumerate(self.renewable_indices): renewable_column[i] = column
+        dg_power = self.diesel_power.tolist()
+        dg_rate = self.diesel_fuel_rate.tolist()
+        dg_max_power = self.diesel_max_power.tolist()
+        dg_max_rate = self.diesel_max_fuel_rate.tolist()
+        dg_min_power = self.diesel_min_power.tolist()
+        dg_min_rate = self.diesel_min_fuel_rate.tolist()
+        dg_soft_min_power = self.diesel_soft_min_power.tolist()
+        fuel_level = self.diesel_fuel_level.tolist()
+        released = [0.0] * num_generators
+        b_energy_rating = self.battery_energy_rating.tolist()
+        b_power = self.battery_power_rating.tolist()
+        b_charge_power = self.battery_charge_power_rating.tolist()
+        b_charge_eff = self.battery_charge_efficiency.tolist()
+        b_discharge_eff = self.battery_discharge_efficiency.tolist()
+        b_min_charge = self.battery_min_charge.tolist()
+        b_max_charge = self.battery_max_charge.tolist()
+        charge = self.battery_charge_level.tolist()
+        diesel_level = self.diesel_level
+        soft_min_powers = [dg_soft_min_power[i] for i in dgs]
+        case = previous_case
+
+        # exogenous diesel bounds: fuel to run each generator for the timestep and the
+        # resulting energy at max and min load factors (valid while fuel level covers the fuel)
+        online_duration = duration[:,numpy.newaxis] * online_ratio
+        fully_online_duration = numpy.repeat(duration[:,numpy.newaxis], num_generators, axis=1)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            max_fuel_full = self.diesel_max_fuel_rate * fully_online_duration
+            max_energy_full = self.diesel_max_power * max_fuel_full / self.diesel_max_fuel_rate
+            max_fuel = self.diesel_max_fuel_rate * online_duration
+            max_energy = self.diesel_max_power * max_fuel / self.diesel_max_fuel_rate
+            min_fuel = self.diesel_min_fuel_rate * online_duration
+            min_energy = self.diesel_min_power * min_fuel / self.diesel_min_fuel_rate
+        max_fuel_full, max_energy_full = max_fuel_full.tolist(), max_energy_full.tolist()
+        max_fuel, max_energy = max_fuel.tolist(), max_energy.tolist()
+        min_fuel, min_energy = min_fuel.tolist(), min_energy.tolist()
+        load = load.tolist()
+        duration = duration.tolist()
+        online_ratio = online_ratio.tolist()
+        renewable_power = renewable_power.tolist()
+
+        def renewable_energy(indices, durations, output):
+            supply = 0.0
+            for i in indices:
+                energy = power[renewable_column[i]] * durations[i]
+                supply += energy
+                output[i] = energy / d if d > 0 else 0.0
+            return supply
+
+        def diesel_energy(fuel_for_time, energy_for_time, output, unit_power, unit_rate):
+            supply = 0.0
+            level = diesel_level
+            for i in dgs:
+                fuel = min(fuel_for_time[i], level)
+                if fuel > 0.0:
+                    fuel_level[i] += fuel
+                    level -= fuel
+                if fuel_level[i] >= fuel_for_time[i]: energy = energy_for_time[i]
+                else: energy = unit_power[i] * fuel_level[i] / unit_rate[i]
+                fuel_level[i] -= fuel
+                supply += energy
+                output[i] = energy / d if d > 0 else 0.0
+            return supply
+
+        def battery_energy(durations, output):
+            supply = 0.0
+            for i in bs:
+                energy = b_power[i] * min(durations[i], max(0, charge[i] - b_min_charge[i]) / b_power[i]) \
+                    * b_discharge_eff[i]
+                supply += energy
+                output[i] = energy / d if d > 0 else 0.0
+            return supply
+
+        for t in range(num_timesteps):
+            d = duration[t]
+            ratio = online_ratio[t]
+            power = renewable_power[t]
+            od = [d * r for r in ratio]
+            full = [0.0] * num_generators
+            available = [0.0] * num_generators
+            generation = [0.0] * num_generators
+
+            # Identify available power
+            fully_online = [d] * num_generators
+            for type in types:
+                if type == defaults.DIESEL_GENERATOR:
+                    diesel_energy(max_fuel_full[t], max_energy_full[t], full, dg_max_power, dg_max_rate)
+                elif type == defaults.BATTERY:
+                    battery_energy(fully_online, full)
+                else:
+                    renewable_energy(self.type_indices[type], fully_online, full)
+
+            # Identify energy available, including upper and lower bounds
+            e_load = - (load[t] * d)
+            e_pv = renewable_energy(pv, od, available)
+            e_wt = renewable_energy(wt, od, available)
+            e_diesel_min = diesel_energy(min_fuel[t], min_energy[t], available, dg_min_power, dg_min_rate)
+            e_diesel_max = diesel_energy(max_fuel[t], max_energy[t], available, dg_max_power, dg_max_rate)
+            e_battery_discharge = battery_energy(od, available)
+            capacity = 0.0
+            for i in bs:
+                capacity += min(max(0, (b_max_charge[i] - charge[i]) / b_charge_eff[i]), b_charge_power[i] * od[i])
+            e_battery_charge = - capacity
+
+            # identify case for current timestep
+            if d > 0:
+                p_load, p_pv, p_wt = e_load / d, e_pv / d, e_wt / d
+                p_diesel_max, p_battery_discharge, p_battery_charge = e_diesel_max / d, e_battery_discharge / d, e_battery_charge / d
+            else:
+                p_load = p_pv = p_wt = p_diesel_max = p_battery_discharge = p_battery_charge = 0.0
+            case = energy_management_system(p_load, p_pv, p_wt, p_diesel_max, p_battery_discharge,
+                                            p_battery_charge, case, soft_min_powers)
+
+            # generation (do not allow excess from renewables)
+            energy = e_load
+            if case >= 2:
+                energy += e_pv
+                energy += e_wt
+            if case == 5:
+                energy_battery = min(e_battery_discharge, max(0.0, -energy))
+                energy_diesel = min(e_diesel_max, max(0.0,-(energy+energy_battery)))
+                if energy_diesel < e_diesel_min:
+                    delta_diesel = e_diesel_min - energy_diesel
+                    delta_battery = min(energy_battery, delta_diesel)
+                    energy_battery -= delta_battery
+                    energy_diesel += delta_battery
+            elif case == 4:
+                energy_diesel = min(e_diesel_max, max(0.0, -energy))
+                energy_battery = min(e_battery_discharge, max(0.0, -(energy+energy_diesel)))
+            elif case == 3:
+                energy_diesel = min(e_diesel_max, max(0.0, -(energy+e_battery_charge)))
+                energy_battery = min(-(energy+energy_diesel), 0.0)
+            elif case == 2:
+                energy_diesel = 0.0
+                energy_battery = min(e_battery_discharge, max(0.0, -energy))
+            elif case == 1:
+                energy_diesel = 0.0
+                energy += e_battery_charge
+                e_pv = min(e_pv, -1*energy)
+                energy += e_pv
+                if energy < 0.0:
+                    e_wt = min(e_wt, -1*energy)
+                else: e_wt = 0.0
+                energy += e_wt
+                energy_available_to_charge = e_load + e_wt + e_pv
+                if energy_available_to_charge <= 0: energy_battery = 0.0
+                else:
+                    energy_battery = max(e_battery_charge, -1*energy_available_to_charge)
+            elif case == 0:
+                energy_diesel = 0.0
+                energy_battery = e_battery_charge
+            powers = {
+                defaults.PHOTOVOLTAIC_PANEL: e_pv / d if d > 0 else 0.0,
+                defaults.WIND_TURBINE: e_wt / d if d > 0 else 0.0,
+                defaults.DIESEL_GENERATOR: energy_diesel / d if d > 0 else 0.0,
+                defaults.BATTERY: energy_battery / d if d > 0 else 0.0,
+            }
+
+            # generate power
+            fuel_consumed = 0
+            wet_stacking_flag = False
+            for type in types:
+                if powers[type] > 0.0:
+                    fuel_consumed = 0.0
+                    wet_stacking_flag = False
+                    unmet_energy = powers[type] * d
+                    for i in self.type_indices[type]:
+                        unmet_power = unmet_energy / od[i] if od[i] > 0 else 0.0
+                        if type == defaults.DIESEL_GENERATOR:
+                            fuel = min(
+                                dg_rate[i] * ((unmet_power * od[i]) / dg_power[i]),
+                                dg_rate[i] * od[i]
+                            )
+                            fuel = min(max(0.0, fuel - fuel_level[i] + EPSILON), diesel_level)
+                            if fuel > 0.0:
+                                fuel_level[i] += fuel
+                                diesel_level -= fuel
+                                fuel_consumed += fuel
+                            wet_stacking_flag = unmet_power < dg_soft_min_power[i]
+                            energy = min(
+                                dg_max_power[i] * min(fuel_level[i], dg_max_rate[i] * od[i]) / dg_max_rate[i],
+                                unmet_power * od[i]
+                            )
+                            fuel = dg_rate[i] * (energy / dg_power[i])
+                            fuel_level[i] -= fuel
+                            released[i] += fuel
+                        elif type == defaults.BATTERY:
+                            energy = min(
+                                b_power[i] * min(od[i], max(0, charge[i] - b_min_charge[i]) / b_power[i]) \
+                                    * b_discharge_eff[i],
+                                unmet_power * od[i]
+                            )
+                            charge[i] -= energy / b_discharge_eff[i]
+                        else:
+                            energy = min(power[renewable_column[i]] * od[i], unmet_power * od[i])
+                        unmet_energy -= energy
+                        generation[i] = energy / d if d > 0 else 0.0
+                        if (unmet_energy < EPSILON): break
+                elif powers[type] < 0.0 and type == defaults.BATTERY:
+                    unstored_energy = -powers[type] * d
+                    for i in bs:
+                        unstored_power = unstored_energy / od[i] if od[i] > 0 else 0.0
+                        stored = unstored_power * od[i]
+                        charge_duration = min(
+                            od[i],
+                            stored / b_charge_power[i],
+                            max(0, (b_max_charge[i] - charge[i]) / b_charge_eff[i]) / b_charge_power[i],
+                        )
+                        charge_energy = b_charge_power[i] * charge_duration
+                        usable = charge_energy * b_charge_eff[i]
+                        loss = charge_energy - usable
+                        charge[i] += usable
+                        energy = usable + loss
+                        unstored_energy -= energy
+                        generation[i] = -1*energy / d if d > 0 else 0.0
+                        if (unstored_energy < EPSILON): break
+                    if unstored_energy > EPSILON:
+                        raise ValueError("Unstored energy error: "+str(unstored_energy))
+                elif powers[type] < 0.0:
+                    raise ValueError("Power is negative for type: "+type)
+
+            # store results
+            trace.case[t] = case
+            trace.non_degraded_power[t] = full
+            trace.available_power[t] = available
+            trace.power_generation[t] = generation
+            if len(bs) > 0:
+                total_capacity = 0.0
+                total_charge = 0.0
+                for i in bs:
+                    total_capacity += b_energy_rating[i]
+                    total_charge += charge[i]
+                trace.state_of_charge[t] = total_charge / total_capacity
+            trace.diesel_consumption[t] = fuel_consumed
+            trace.diesel_is_wet_stacking[t] = wet_stacking_flag
+            if after_timestep is not None and after_timestep(t): break
+
+        self._write_back(fuel_level, released, charge, diesel_level)
+        return case
+
+    def _write_back(self, fuel_level, released, charge, diesel_level):
+        """Write final fuel and charge levels back to components so the grid ends in the
+        same state as after running Grid.operate for every timestep"""
+        for i in self.diesel_indices:
+            dg = self.generators[i]
+            dg._fuel_level = fuel_level[i]
+            dg._fuel_consumed += released[i]
+        for i in self.battery_indices:
+            self.generators[i]._charge_level = charge[i]
+        self._grid._diesel_level = diesel_level
+
+    def grid_state(self, t):
+        """GridState for input timestep index"""
+        return self.trace.grid_state(t)
+
+
+def _wet_stacking(power, soft_min_powers):
+    """True if power will cause wet stacking for any diesel generator"""
+    for soft_min_power in soft_min_powers:
+        if power < soft_min_power: return True
+    return False
+
+def _energy_management_system_1(load, photovoltaic, wind, diesel_max, battery_discharge,
+                                battery_charge, previous_case, soft_min_powers):
+    """Scalar form of Grid._energy_management_system_1"""
+    case = 4
+    if load > 0:
+        case = 0
+    elif photovoltaic + wind + load >= 0:
+        case = 1
+    elif photovoltaic + wind + diesel_max + load >= 0:
+        case = 3
+    return case
+
+def _energy_management_system_2(load, photovoltaic, wind, diesel_max, battery_discharge,
+                                battery_charge, previous_case, soft_min_powers):
+    """Scalar form of Grid._energy_management_system_2"""
+    case = 4
+    if load > 0:
+        case = 0
+    elif photovoltaic + wind + load >= 0:
+        case = 1
+        if photovoltaic + wind + load + battery_charge <= 0 and previous_case and previous_case == 3:
+            case = 3
+    else:
+        if photovoltaic + wind + battery_discharge + load >= 0 and \
+                (abs(battery_charge) < defaults.EPSILON or (previous_case and previous_case in [2,4])):
+            case = 2
+        elif photovoltaic + wind + diesel_max + load >= 0:
+            case = 3
+        if case == 3:
+            if photovoltaic + wind + battery_discharge + load >= 0 and \
+                abs(battery_charge) < defaults.EPSILON \
+                and _wet_stacking(load-photovoltaic-wind, soft_min_powers):
+                case = 2
+    return case
+
+def _energy_management_system_3(load, photovoltaic, wind, diesel_max, battery_discharge,
+                                battery_charge, previous_case, soft_min_powers):
+    """Scalar form of Grid._energy_management_system_3"""
+    case = 4
+    if load > 0:
+        case = 0
+    elif photovoltaic + wind + load >= 0:
+        case = 1
+        if photovoltaic + wind + load + battery_charge <= 0 and previous_case and previous_case in [3, 5]:
+            case = 3
+    else:
+        if photovoltaic + wind + diesel_max + load >= 0:
+            case = 3
+        elif photovoltaic + wind + battery_discharge + load >= 0:
+            case = 2
+        if case == 3 and previous_case and previous_case <= 2:
+            if photovoltaic + wind + battery_discharge + load >= 0:
+                case = 2
+        elif case == 3 and previous_case and previous_case >= 3:
+            if photovoltaic + wind + battery_discharge + load >= 0 and \
+                abs(battery_charge) < defaults.EPSILON \
+                and _wet_stacking(load-photovoltaic-wind, soft_min_powers):
+                case = 2
+    return case
+
+def _energy_management_system_4(load, photovoltaic, wind, diesel_max, battery_discharge,
+                                battery_charge, previous_case, soft_min_powers):
+    """Scalar form of Grid._energy_management_system_4"""
+    return _energy_management_system_1(load, photovoltaic, wind, diesel_max, battery_discharge,
+                                       battery_charge, previous_case, soft_min_powers)
+
+_ENERGY_MANAGEMENT_SYSTEMS = {
+    "_energy_management_system_1": _energy_management_system_1,
+    "_energy_management_system_2": _energy_management_system_2,
+    "_energy_management_system_3": _energy_management_system_3,
+    "_energy_management_system_4": _energy_management_system_4,
+}
@@ -30,6 +30,12 @@ class GridState(object):
     def power_generation(self):
         return self._power_generation
 
+    def non_degraded_power_by_generator(self):
+        return self._non_degraded_power
+
+    def available_power_by_generator(self):
+        return self._available_power
+
     def state_of_charge(self):
         return self._state_of_charge
 
@@ -80,6 +86,22 @@ class GridState(object):
             power_supply += power
         return power_supply
 
+    def available_power_by_types(self):
+        """Dictionary of power available by DER type, summed in one pass (see available_power_by_type)"""
+        power_available = {}
+        for generator, power in self._available_power.items():
+            type = generator.__class__.__name__
+            power_available[type] = power_available.get(type, 0.0) + power
+        return power_available
+
+    def power_supply_by_types(self):
+        """Dictionary of power supplied by DER type, summed in one pass (see power_supply_type)"""
+        power_supply = {}
+        for generator, power in self._power_generation.items():
+            type = generator.__class__.__name__
+            power_supply[type] = power_supply.get(type, 0.0) + power
+        return power_supply
+
     def power_supply_type(self, type):
         """Power supplied of input type to meet load (and charge BESS)"""
         power_supply = 0.0
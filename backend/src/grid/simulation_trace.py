@@ -0,0 +1,87 @@
+import numpy
+from .grid_state import GridState
+from src.components import defaults
+
+class SimulationTrace(object):
+
+    def __init__(self, generators, num_timesteps):
+        """SimulationTrace constructor __init__
+        Grid states of a simulation by timestep in preallocated arrays, with a column per generator,
+        instead of a GridState of dictionaries keyed by generator per timestep
+
+        Keyword arguments:
+        generators          list of generators in the order of the columns
+        num_timesteps       number of timesteps
+        """
+        self.generators = generators
+        self._types = [generator.__class__.__name__ for generator in generators]
+        shape = (num_timesteps, len(generators))
+        self.case = numpy.zeros(num_timesteps, dtype=numpy.int8)
+        self.non_degraded_power = numpy.zeros(shape)
+        self.available_power = numpy.zeros(shape)
+        self.power_generation = numpy.zeros(shape)
+        self.state_of_charge = numpy.zeros(num_timesteps)
+        self.diesel_consumption = numpy.zeros(num_timesteps)
+        self.diesel_is_wet_stacking = numpy.zeros(num_timesteps, dtype=bool)
+        self._index = {generator:i for i, generator in enumerate(generators)}
+
+    def __len__(self):
+        return len(self.case)
+
+    def record(self, t, grid_state):
+        """Stores the input GridState at timestep index t; generators without power in it have none"""
+        self.case[t] = grid_state.case()
+        for values, powers in [
+            (self.non_degraded_power, grid_state.non_degraded_power_by_generator()),
+            (self.available_power, grid_state.available_power_by_generator()),
+            (self.power_generation, grid_state.power_generation()),
+        ]:
+            for generator, power in powers.items():
+                values[t, self._index[generator]] = power
+        self.state_of_charge[t] = grid_state.state_of_charge()
+        self.diesel_consumption[t] = grid_state.diesel_consumption()
+        self.diesel_is_wet_stacking[t] = grid_state.diesel_is_wet_stacking()
+
+    def grid_state(self, t):
+        """GridState for timestep index t, read from the arrays"""
+        return GridState(
+            case=int(self.case[t]),
+            non_degraded_power=dict(zip(self.generators, self.non_degraded_power[t].tolist())),
+            available_power=dict(zip(self.generators, self.available_power[t].tolist())),
+            power_generation=dict(zip(self.generators, self.power_generation[t].tolist())),
+            state_of_charge=float(self.state_of_charge[t]),
+            diesel_consumption=float(self.diesel_consumption[t]),
+            diesel_is_wet_stacking=bool(self.diesel_is_wet_stacking[t]),
+        )
+
+    def types(self):
+        """Sorted list of generator types"""
+        return sorted(set(self._types))
+
+    def _total(self, values, types):
+        """Array by timestep of the sum of the columns of generators of the input types,
+        added in generator order as GridState sums its dictionaries"""
+        total = numpy.zeros(len(self))
+        for i, type in enumerate(self._types):
+            if type in types: total = total + values[:,i]
+        return total
+
+    def power_supply_by_type(self):
+        """Dictionary of arrays by timestep of power supplied by generator type"""
+        return { type:self._total(self.power_generation, [type]) for type in self.types() }
+
+    def available_power_by_type(self):
+        """Dictionary of arrays by timestep of power available by generator type"""
+        return { type:self._total(self.available_power, [type]) for type in self.types() }
+
+    def total_power_supply(self):
+        """Array by timestep of total power supplied (see GridState.power_supply)"""
+        return self._total(self.power_generation, self.types())
+
+    def total_non_degraded_power(self):
+        """Array by timestep of non-degraded power to meet load (see GridState.non_degraded_power)"""
+        return self._total(self.non_degraded_power, [type for type in self.types() if type != defaults.BATTERY])
+
+    def total_available_power(self):
+        """Array by timestep of power available to meet load (see GridState.available_power)"""
+        return self._total(self.available_power, [type for type in self.types() if type != defaults.BATTERY])
@@ -1,14 +1,29 @@
+import copy
+import numpy
+import hashlib
+import itertools
+from contextlib import closing
 from datetime import timedelta
 from src.utils import TimePeriod, TimeStep
-from src.reports import Metrics
+from src.grid import GridKernel, BatchGridKernel, SimulationTrace
+from src.reports import Metrics, MetricsAccumulator, InfeasibleRun
+from src.components import defaults
+from src.components.electric_generators import WindTurbine, PVWattsExecutionException
 import src.data.mysql.energy_management_systems as database_energy_management_systems
 import src.data.mysql.powerloads as database_powerloads
+import src.data.cache.profiles as profile_store
+from src.models import representative_periods
 
 class CoreSimulation(object):
 
+    ENGINE_OBJECT = "object"
+    ENGINE_ARRAY = "array"
+    LOAD_MEAN = "mean"
+    LOAD_PEAK = "peak"
+
     def __init__(self, grid, energy_management_system_id, powerload_id, weather, 
                  start_datetime=None, end_datetime=None, 
-                 extend_proportion=0.0):
+                 extend_proportion=0.0, engine=ENGINE_OBJECT, chunk_size=None):
         """Simulation constructor __init__
 
         Keyword arguments:
@@ -19,7 +34,18 @@ class CoreSimulation(object):
         end_datetime                    datetime object set to end of simulation
         weather                         weather object with distributions
         extend_proportion               extend the timeframe by the specified proportion
+        engine                          "object" operates grid components each timestep,
+                                        "array" runs the dispatch loop over a GridKernel
+        chunk_size                      if set, the timeline is not loaded: runs stream powerload rows from
+                                        the database and simulate chunk_size timesteps at a time, so memory
+                                        does not grow with the horizon (see _run_chunks)
         """
+        if engine not in [self.ENGINE_OBJECT, self.ENGINE_ARRAY]:
+            raise ValueError("Simulation engine not defined: "+str(engine))
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError("Simulation chunk_size must be positive")
+        if chunk_size is not None and extend_proportion > 0.0:
+            raise ValueError("Simulation cannot extend the timeframe of a streaming simulation")
         self.grid = grid
         self._energy_management_system = database_energy_management_systems.get_parameter_name(energy_management_system_id)
         self._powerload_id = powerload_id
@@ -27,44 +53,32 @@ class CoreSimulation(object):
         self._start_datetime = start_datetime
         self._end_datetime = end_datetime
         self._extend_proportion = extend_proportion
+        self._engine = engine
+        self._chunk_size = chunk_size
+        self._powerload_start = None # start datetime of the powerload timeline, if streaming
+        self._horizon_bounds = None # (start, end) datetimes of the timesteps simulated
+        self._batch_kernel = None
+        self._weather_profile = None
+        self._renewable_power_profiles = dict() # keyed by (generator, power rating)
+        self._time_grid = None
+        self._fine = None # simulation whose timeline a coarsened or representative simulation derives from
+        self._windows = None # fine timestep indices by timestep of a coarsened or representative simulation
         self.timesteps = None
         self._load()
 
     def _load(self):
         """Construct list of timesteps in chronological order
-        Extend the timeframe by a specified input proportion of timesteps"""
-        self.timesteps = []
+        Extend the timeframe by a specified input proportion of timesteps
+        A streaming simulation only checks the bounds of its timeline"""
+        if self._chunk_size is not None:
+            powerload_info = database_powerloads.get_info(self._powerload_id)
+            self._powerload_start = powerload_info["startdatetime"]
+            self._horizon_bounds = self._horizon(powerload_info)
+            return
         powerload_info = database_powerloads.get_single(self._powerload_id, objectFlag=True)
-        start = powerload_info["startdatetime"]
-        end = powerload_info["enddatetime"]
-        if self._start_datetime is not None:
-            if self._start_datetime < start - timedelta(seconds=1):
-                raise Exception("Simulation _load failed because start datetime specified is before beginning of powerload timeline.")
-            if self._start_datetime > end + timedelta(seconds=1):
-                raise Exception("Simulation _load failed because start datetime specified is after end of powerload timeline.")
-            start = self._start_datetime
-        if self._end_datetime is not None:
-            if self._end_datetime < start - timedelta(seconds=1):
-                raise Exception("Simulation _load failed because end datetime specified is before the start datetime specified.")
-            if self._end_datetime > end  + timedelta(seconds=1):
-                raise Exception("Simulation _load failed because end datetime specified is after end of powerload timeline.")
-            end = self._end_datetime
-        if end <= start:
-            raise Exception("Simulation _load failed because end datetime specified does not occur after start datetime specified.")
-        for i in range(0,len(powerload_info["data"])):
-            if powerload_info["data"][i]["startdatetime"] < start: continue
-            if powerload_info["data"][i]["enddatetime"] > end: continue
-            tp = TimePeriod(
-                start = powerload_info["data"][i]["startdatetime"],
-                mid = powerload_info["data"][i]["middatetime"],
-                end = powerload_info["data"][i]["enddatetime"],
-            )
-            self.timesteps.append(TimeStep(
-                time_period=tp,
-                power_load=powerload_info["data"][i]["powerload"],
-                sun_weight=1.0, 
-            ))
-            start = tp.end()
+        self._horizon_bounds = self._horizon(powerload_info)
+        start, end = self._horizon_bounds
+        self.timesteps = list(self._timesteps(powerload_info["data"], start, end))
         if len(self.timesteps) == 0:
             raise Exception("Simulation _load failed start time {0} and end time {1} are too close together;".format(start, end) \
                             + " no timesteps to simulate\n")
@@ -90,11 +104,77 @@ class CoreSimulation(object):
                 )
                 self.timesteps.append(last_timestep)
                 i += 1
+        online_ratio = self._online_ratio()
+        for timestep in self.timesteps:
+            timestep.set_online_ratio(online_ratio)
+
+    def _horizon(self, powerload_info):
+        """Return start and end datetimes of the simulation within the input powerload metadata"""
+        start = powerload_info["startdatetime"]
+        end = powerload_info["enddatetime"]
+        if self._start_datetime is not None:
+            if self._start_datetime < start - timedelta(seconds=1):
+                raise Exception("Simulation _load failed because start datetime specified is before beginning of powerload timeline.")
+            if self._start_datetime > end + timedelta(seconds=1):
+                raise Exception("Simulation _load failed because start datetime specified is after end of powerload timeline.")
+            start = self._start_datetime
+        if self._end_datetime is not None:
+            if self._end_datetime < start - timedelta(seconds=1):
+                raise Exception("Simulation _load failed because end datetime specified is before the start datetime specified.")
+            if self._end_datetime > end  + timedelta(seconds=1):
+                raise Exception("Simulation _load failed because end datetime specified is after end of powerload timeline.")
+            end = self._end_datetime
+        if end <= start:
+            raise Exception("Simulation _load failed because end datetime specified does not occur after start datetime specified.")
+        return start, end
+
+    @staticmethod
+    def _timesteps(powerload_data, start, end):
+        """Generate timesteps in chronological order of the input powerload data rows between input datetimes"""
+        for row in powerload_data:
+            if row["startdatetime"] < start: continue
+            if row["enddatetime"] > end: continue
+            tp = TimePeriod(
+                start = row["startdatetime"],
+                mid = row["middatetime"],
+                end = row["enddatetime"],
+            )
+            yield TimeStep(
+                time_period=tp,
+                power_load=row["powerload"],
+                sun_weight=1.0, 
+            )
+            start = tp.end()
+
+    def _online_ratio(self):
+        """Return dictionary of online ratios of a fully online grid by generator"""
         online_ratio = {}
         for generator in self.grid.get_generators():
             online_ratio[generator] = 1.0
-        for timestep in self.timesteps:
-            timestep.set_online_ratio(online_ratio)
+        return online_ratio
+
+    def _timestep_chunks(self):
+        """Generate lists of at most chunk_size timesteps in chronological order,
+        streamed from the powerload rows of the database"""
+        start, end = self._horizon_bounds
+        online_ratio = self._online_ratio()
+        with closing(database_powerloads.data_chunks(self._powerload_id, self._powerload_start, self._chunk_size)) as row_chunks:
+            timesteps = self._timesteps(itertools.chain.from_iterable(row_chunks), start, end)
+            chunk = list(itertools.islice(timesteps, self._chunk_size))
+            while len(chunk) > 0:
+                for timestep in chunk:
+                    timestep.set_online_ratio(online_ratio)
+                yield chunk
+                chunk = list(itertools.islice(timesteps, self._chunk_size))
+
+    def is_streaming(self):
+        """Return True if runs stream the timeline in chunks (see chunk_size)"""
+        return self._chunk_size is not None
+
+    def _check_timeline(self, method):
+        """Raise ValueError if the timeline is streamed in chunks instead of loaded, as input method needs it"""
+        if self._chunk_size is not None:
+            raise ValueError("Simulation "+method+" needs the timeline, which a streaming simulation does not load")
 
     def _get_time_periods(self):
         """Return list of time periods"""
@@ -103,10 +183,199 @@ class CoreSimulation(object):
             time_periods.append(timestep.time_period())
         return time_periods
 
-    def _operate_grid(self, timestep, previous_case=None):
+    def _get_weather_profile(self):
+        """Return dictionary of weather conditions by timestep as arrays (computed once)"""
+        if self._weather_profile is not None: return self._weather_profile
+        self._weather_profile = self._weather.profile(self._get_time_periods())
+        return self._weather_profile
+
+    def renewable_power_profile(self, generator):
+        """Return power output by timestep of an input renewable generator at its current rating.
+        Profiles depend only on weather and rating, so they are computed once per rating
+        and shared across runs through the profile store:
+        wind turbines store rating-independent factors computed in one vectorized pass,
+        photovoltaic panels store the output of one PVWatts run over the horizon"""
+        key = (generator, generator._power_rating)
+        if key in self._renewable_power_profiles: return self._renewable_power_profiles[key]
+        if self._fine is not None:
+            profile = self._fine.renewable_power_profile(generator)
+            durations = numpy.array([timestep.time_period().duration() for timestep in self._fine.timesteps])
+            profile = numpy.array([profile[window[0]] if len(window) == 1 else numpy.average(profile[window], weights=durations[window])
+                                   for window in self._windows])
+        elif isinstance(generator, WindTurbine):
+            profile = generator.power_from_factors(self._stored_profile(generator, self._wind_power_factors))
+        else:
+            profile = self._stored_profile(generator, self._photovoltaic_power_profile)
+        self._renewable_power_profiles[key] = profile
+        return profile
+
+    def _periods(self, length):
+        """Return list of lists of consecutive timestep indices by period of the input length (hours)"""
+        periods = dict()
+        first_start = self.timesteps[0].time_period().start()
+        for t, timestep in enumerate(self.timesteps):
+            periods.setdefault(int((timestep.time_period().start() - first_start).total_seconds() // (length*3600.0)), []).append(t)
+        return list(periods.values())
+
+    def _derived(self, windows, timesteps):
+        """Return a copy of the simulation over the input timesteps, where renewable power by timestep
+        is the duration-weighted mean of the power of the input window of timestep indices of this simulation"""
+        derived = copy.copy(self)
+        derived._fine = self
+        derived._windows = windows
+        derived._batch_kernel = None
+        derived._weather_profile = None
+        derived._renewable_power_profiles = dict()
+        derived._time_grid = None
+        derived.timesteps = timesteps
+        return derived
+
+    def coarsened(self, step, load=LOAD_MEAN):
+        """Return a copy of the simulation over a timeline aggregated to timesteps of the input length,
+        so each run costs proportionally fewer timesteps; load and renewable power of an aggregated timestep
+        are duration-weighted means over the timesteps aggregated, so energies are preserved,
+        and to preserve load peaks the peak timestep of each aggregated timestep can be kept apart
+
+        Keyword arguments:
+        step                    length of aggregated timesteps (hours)
+        load                    "mean" aggregates every timestep, "peak" keeps peak load timesteps apart
+        """
+        self._check_timeline("coarsened")
+        if load not in [self.LOAD_MEAN, self.LOAD_PEAK]:
+            raise ValueError("Simulation load aggregation not defined: "+str(load))
+        if step <= 0:
+            raise ValueError("Simulation coarsened step must be positive")
+        windows = []
+        for window in self._periods(step):
+            peak = max(range(len(window)), key=lambda i: self.timesteps[window[i]].power_load())
+            if load == self.LOAD_MEAN or len(window) == 1:
+                windows.append(window)
+            elif peak < len(window) / 2:
+                windows.extend([[window[peak]], window[:peak]+window[peak+1:]])
+            else:
+                windows.extend([window[:peak]+window[peak+1:], [window[peak]]])
+        timesteps = []
+        start = self.timesteps[0].time_period().start()
+        for window in windows:
+            aggregated = [self.timesteps[t] for t in window]
+            durations = [timestep.time_period().duration() for timestep in aggregated]
+            end = start + timedelta(hours=sum(durations))
+            timestep = TimeStep(
+                time_period = TimePeriod(start=start, mid=start+(end-start)/2, end=end),
+                power_load = sum(timestep.power_load()*duration for timestep, duration in zip(aggregated, durations)) / sum(durations),
+                sun_weight = aggregated[0].sun_weight(),
+            )
+            timestep.set_online_ratio(aggregated[0].online_ratio())
+            timesteps.append(timestep)
+            start = end
+        return self._derived(windows, timesteps)
+
+    def representative(self, num_periods, period=24.0):
+        """Return a copy of the simulation over representative periods of the timeline, in chronological order
+        so battery state carries from one to the next; periods are clustered by their load and renewable
+        power profiles (see representative_periods.k_medoids) and the timesteps of each medoid period
+        stand for the periods of its cluster in metrics (see TimeStep.weight).
+        Periods of a different number of timesteps than most (e.g. a partial last day) are kept as they are
+
+        Keyword arguments:
+        num_periods             number of representative periods
+        period                  length of periods (hours)
+        """
+        self._check_timeline("representative")
+        if num_periods < 1:
+            raise ValueError("Simulation number of representative periods must be positive")
+        periods = self._periods(period)
+        lengths = [len(indices) for indices in periods]
+        length = max(set(lengths), key=lengths.count)
+        clustered = [indices for indices in periods if len(indices) == length]
+        series = [numpy.array([timestep.power_load() for timestep in self.timesteps], dtype=float)]
+        for generator in self.grid.get_generators():
+            if generator.__class__.__name__ not in defaults.renewable_generator_types(): continue
+            series.append(numpy.asarray(self.renewable_power_profile(generator), dtype=float))
+        series = [values / numpy.max(numpy.abs(values)) for values in series if numpy.max(numpy.abs(values)) > 0]
+        features = numpy.array([numpy.concatenate([values[indices] for values in series]) for indices in clustered])
+        medoids, labels = representative_periods.k_medoids(features, min(num_periods, len(clustered)))
+        weights = { clustered[medoid][0]:float(numpy.sum(labels == cluster)) for cluster, medoid in enumerate(medoids) }
+        selected = [indices for indices in periods if len(indices) != length or indices[0] in weights]
+        windows = [[t] for indices in selected for t in indices]
+        timesteps = []
+        for indices in selected:
+            for t in indices:
+                timestep = TimeStep(
+                    time_period = self.timesteps[t].time_period(),
+                    power_load = self.timesteps[t].power_load(),
+                    sun_weight = self.timesteps[t].sun_weight(),
+                    weight = weights[indices[0]] if indices[0] in weights else 1.0,
+                )
+                timestep.set_online_ratio(self.timesteps[t].online_ratio())
+                timesteps.append(timestep)
+        return self._derived(windows, timesteps)
+
+    def _stored_profile(self, generator, compute):
+        """Return profile of an input generator from the profile store,
+        computing it with the input function and storing it if not found"""
+        if self._time_grid is None: self._time_grid = profile_store.time_grid(self._get_time_periods())
+        key = profile_store.make_key(
+            location_id = self._weather.location_id(),
+            sample_method = self._weather.sample_method(),
+            time_grid = self._time_grid,
+            parameters = generator.profile_parameters(),
+        )
+        profile = profile_store.get(key)
+        if profile is None:
+            profile = compute(generator)
+            profile_store.put(key, profile)
+        return profile
+
+    def _wind_power_factors(self, generator):
+        """Return power factors by timestep of an input wind turbine"""
+        weather_profile = self._get_weather_profile()
+        return generator.power_factors(
+            wind_speed = weather_profile["wind_speed"],
+            temperature = weather_profile["temperature"],
+            pressure = weather_profile["pressure"],
+        )
+
+    def _photovoltaic_power_profile(self, generator):
+        """Return power output by timestep of an input photovoltaic panel with one PVWatts run,
+        or by timestep if PVWatts rejects the horizon"""
+        weather_profile = self._get_weather_profile()
+        try:
+            return generator.power_profile(
+                location = self._weather,
+                time_periods = self._get_time_periods(),
+                direct_normal_irradiance = weather_profile["direct_normal_irradiance"],
+                diffuse_horizontal_irradiance = weather_profile["diffuse_horizontal_irradiance"],
+                global_horizontal_irradiance = weather_profile["global_horizontal_irradiance"],
+                wind_speed = weather_profile["wind_speed"],
+                temperature = weather_profile["temperature"],
+            )
+        except PVWattsExecutionException as error:
+            print("PVWatts rejected the horizon of {0} timesteps, evaluating photovoltaic power by timestep\n{1}".format(
+                len(self.timesteps), error), flush=True)
+            return self._renewable_power_profile_by_timestep(generator)
+
+    def _renewable_power_profile_by_timestep(self, generator):
+        """Return power output by timestep of an input generator, updating conditions at every timestep
+        (fallback when a generator cannot evaluate the horizon in one call)"""
+        profile = numpy.zeros(len(self.timesteps))
+        for t, timestep in enumerate(self.timesteps):
+            self._weather.update(timestep.time_period())
+            generator.update_current_conditions(timestep, self._weather)
+            profile[t] = generator._power()
+        return profile
+
+    def _exogenous_power(self):
+        """Precompute power profiles of the renewable generators in the grid"""
+        return {
+            generator:self.renewable_power_profile(generator) for generator in self.grid.get_generators()
+            if generator.__class__.__name__ in defaults.renewable_generator_types()
+        }
+
+    def _operate_grid(self, timestep, previous_case=None, exogenous_power=None):
         """Update grid parameters for input timestep, then generate power"""
         self._weather.update(timestep.time_period())
-        self.grid.update_current_conditions(timestep, self._weather)
+        self.grid.update_current_conditions(timestep, self._weather, exogenous_power)
         power_generation = self.grid.operate(
             energy_management_system = self._energy_management_system,
             previous_case = previous_case,
@@ -115,31 +384,121 @@ class CoreSimulation(object):
         )
         return power_generation
 
-    def _run(self):
-        """Iterate through timesteps, operate grid and store info"""
-        case = None
-        for timestep in self.timesteps:
-            timestep.set_grid_state(
-                self._operate_grid(
-                    timestep=timestep,
-                    previous_case=case,
-                )
+    def _run(self, accumulator, trace, stop_at_deficit=False, previous_case=None):
+        """Iterate through timesteps, operate grid, add each timestep to the input MetricsAccumulator
+        and, if trace, store grid states in a SimulationTrace the timesteps refer to;
+        return the index of the first timestep with a deficit if stop_at_deficit stopped there
+        (None otherwise), the SimulationTrace (None if not trace) and the case of the last timestep run
+        (previous_case is the case before the first timestep, e.g. the last of a previous chunk)"""
+        if self._engine == self.ENGINE_ARRAY:
+            return self._run_array(accumulator, trace, stop_at_deficit, previous_case)
+        exogenous_power = self._exogenous_power()
+        simulation_trace = SimulationTrace(self.grid.get_generators(), len(self.timesteps)) if trace else None
+        case = previous_case
+        for t, timestep in enumerate(self.timesteps):
+            grid_state = self._operate_grid(
+                timestep=timestep,
+                previous_case=case,
+                exogenous_power={ g:profile[t].item() for g, profile in exogenous_power.items() },
             )
-            case = timestep.grid_state().case()
+            accumulator.add(timestep, grid_state)
+            if trace:
+                simulation_trace.record(t, grid_state)
+                timestep.set_trace(simulation_trace, t)
+            case = grid_state.case()
+            if stop_at_deficit and accumulator.has_deficit(): return t, simulation_trace, case
+        return None, simulation_trace, case
+
+    def _run_array(self, accumulator, trace, stop_at_deficit=False, previous_case=None):
+        """Lower grid to a GridKernel, gather per-timestep inputs into arrays,
+        run the dispatch loop, add each timestep to the input MetricsAccumulator
+        and, if trace, refer the timesteps to the SimulationTrace of the kernel;
+        return values are those of _run"""
+        kernel = GridKernel(self.grid)
+        load = numpy.array([timestep.power_load() for timestep in self.timesteps], dtype=float)
+        duration = numpy.array([timestep.time_period().duration() for timestep in self.timesteps], dtype=float)
+        online_ratio = numpy.array([
+            [timestep.online_ratio()[generator] for generator in kernel.generators]
+            for timestep in self.timesteps
+        ], dtype=float).reshape(len(self.timesteps), len(kernel.generators))
+        renewable_power = numpy.zeros((len(self.timesteps), len(kernel.renewable_indices)))
+        for column, i in enumerate(kernel.renewable_indices):
+            renewable_power[:,column] = self.renewable_power_profile(kernel.generators[i])
+        deficit_step = []
+
+        def add(t):
+            grid_state = kernel.grid_state(t)
+            accumulator.add(self.timesteps[t], grid_state)
+            if trace: self.timesteps[t].set_trace(kernel.trace, t)
+            if stop_at_deficit and accumulator.has_deficit(): deficit_step.append(t)
+            return len(deficit_step) > 0
+
+        case = kernel.run(
+            energy_management_system = self._energy_management_system,
+            load = load,
+            duration = duration,
+            online_ratio = online_ratio,
+            renewable_power = renewable_power,
+            after_timestep = add,
+            previous_case = previous_case,
+        )
+        return deficit_step[0] if len(deficit_step) > 0 else None, kernel.trace if trace else None, case
 
     def _clear_run(self, diesel_level):
         """Reset grid state at each time period to 'None'
         Reset batteries to starting charge levels"""
         self.grid.reset_batteries()
-        for timestep in self.timesteps:
-            timestep.set_grid_state(None)
+        for timestep in self.timesteps if self.timesteps is not None else []:
+            timestep.set_trace(None)
         self.grid.reset_fuel(diesel_level)
 
-    def run(self):
-        """Run simulation"""    
+    def _run_chunks(self, accumulator, chunk_metrics, stop_at_deficit=False):
+        """Stream the timeline in chunks of timesteps, each run from the grid state the previous one ends in
+        with weather and renewable power profiles resolved for the chunk alone, adding every timestep
+        to the input MetricsAccumulator; memory is bounded by the chunk size, not the horizon.
+        If chunk_metrics, it is called with the Metrics of each chunk (e.g. to write them to disk)
+        before the chunk is dropped. Return values are those of _run, without a SimulationTrace"""
+        num_timesteps = 0
+        case = None
+        try:
+            with closing(self._timestep_chunks()) as chunks: # stops the powerload stream if a deficit stops the run
+                for chunk in chunks:
+                    self.timesteps = chunk
+                    self._weather_profile = None
+                    self._renewable_power_profiles = dict()
+                    self._time_grid = None
+                    deficit_step, simulation_trace, case = self._run(accumulator, chunk_metrics is not None, stop_at_deficit, case)
+                    self._weather.clear_samples()
+                    if deficit_step is not None: return num_timesteps + deficit_step, None, case
+                    if chunk_metrics is not None: chunk_metrics(Metrics(chunk, simulation_trace))
+                    num_timesteps += len(chunk)
+        finally:
+            self.timesteps = None
+            self._weather_profile = None
+            self._renewable_power_profiles = dict()
+            self._time_grid = None
+        if num_timesteps == 0:
+            start, end = self._horizon_bounds
+            raise Exception("Simulation _run_chunks failed start time {0} and end time {1} are too close together;".format(start, end) \
+                            + " no timesteps to simulate\n")
+        return None, None, case
+
+    def run(self, trace=False, stop_at_deficit=False, chunk_metrics=None):
+        """Run simulation and return a MetricsSummary, or Metrics with per-timestep traces if trace;
+        if stop_at_deficit, a run with a deficit stops at its first deficit timestep
+        and returns an InfeasibleRun instead (e.g. when only feasibility of a design matters).
+        A streaming simulation (see chunk_size) returns the MetricsSummary and passes per-timestep traces
+        chunk by chunk to the input chunk_metrics function instead"""
+        if self._chunk_size is not None and trace:
+            raise ValueError("Simulation per-timestep traces of a streaming simulation go to chunk_metrics")
         diesel_level = self.grid.get_diesel_level()
-        self._run()
-        metrics = Metrics(self.timesteps)
+        accumulator = MetricsAccumulator()
+        if self._chunk_size is not None:
+            deficit_step, simulation_trace, _ = self._run_chunks(accumulator, chunk_metrics, stop_at_deficit)
+        else:
+            deficit_step, simulation_trace, _ = self._run(accumulator, trace, stop_at_deficit)
+        if deficit_step is not None: metrics = InfeasibleRun(deficit_step)
+        else: metrics = Metrics(self.timesteps, simulation_trace) if trace else accumulator.summary()
         self._clear_run(diesel_level)
         return metrics
 
@@ -153,10 +512,81 @@ class CoreSimulation(object):
 
     def der_sizing_initialize(self):
         """Return peak load and generator dict for sizing method"""
+        self._check_timeline("der_sizing_initialize")
         return self.peak_load(), self.grid.get_generator_dict()
     
+    def der_sizing_context(self):
+        """Return dictionary of the inputs other than the ratings set by sizing designs that simulation results
+        depend on: power load timeline, weather, energy management system and component parameters"""
+        starts = numpy.array([timestep.time_period().start() for timestep in self.timesteps], dtype="datetime64[s]")
+        ends = numpy.array([timestep.time_period().end() for timestep in self.timesteps], dtype="datetime64[s]")
+        loads = numpy.array([timestep.power_load() for timestep in self.timesteps], dtype=float)
+        weights = numpy.array([timestep.weight() for timestep in self.timesteps], dtype=float)
+        return {
+            "powerload_id": self._powerload_id,
+            "timeline": hashlib.sha1(starts.astype(numpy.int64).tobytes() + ends.astype(numpy.int64).tobytes()
+                                     + loads.tobytes() + (weights.tobytes() if numpy.any(weights != 1.0) else b"")).hexdigest(),
+            "location_id": self._weather.location_id(),
+            "weather_sample_method": self._weather.sample_method(),
+            "energy_management_system": self._energy_management_system,
+            "diesel_level": self.grid.get_diesel_level(),
+            "components": sorted([generator.sizing_parameters() for generator in self.grid.get_generators()],
+                                 key=lambda parameters: parameters["type"]),
+        }
+
     def der_sizing_load_design(self, initial_energy_resources, design_specs):
         """a more generalized version may be needed
         design specs can currently only accomodate component ratings"""
         component_ratings = design_specs
         self.grid.update_components_doe(initial_energy_resources, component_ratings)
+
+    def der_sizing_run_batch(self, initial_energy_resources, design_specs_list, stop_at_deficit=False):
+        """Simulate a list of designs together over the timeline (see BatchGridKernel)
+        and return a MetricsSummary for each design, or an InfeasibleRun for a design
+        with a deficit if stop_at_deficit"""
+        if self._batch_kernel is None:
+            self._batch_kernel = BatchGridKernel(
+                generators = initial_energy_resources,
+                timesteps = self.timesteps,
+                renewable_power_profile = self.renewable_power_profile,
+                energy_management_system = self._energy_management_system,
+                diesel_level = self.grid.get_diesel_level(),
+            )
+        ratings = numpy.array([[design_specs[type] for type in self._batch_kernel.types]
+                               for design_specs in design_specs_list])
+        return self._batch_kernel.run(ratings, stop_at_deficit)
+
+    def der_sizing_warm_profiles(self, initial_energy_resources, levels):
+        """Compute renewable power profiles at the input rating levels by generator type
+        so they are in the profile store for later runs; ratings are restored afterwards"""
+        for type, ratings in levels.items():
+            if type not in defaults.renewable_generator_types(): continue
+            for generator in initial_energy_resources[type]:
+                power_rating = generator._power_rating
+                for rating in ratings:
+                    if rating == 0: continue
+                    generator.update(rating)
+                    self.renewable_power_profile(generator)
+                generator.update(power_rating)
+
+    def der_sizing_load_profile(self):
+        """Return arrays of power load and duration (hours) by timestep"""
+        loads = numpy.array([timestep.power_load() for timestep in self.timesteps], dtype=float)
+        durations = numpy.array([timestep.time_period().duration() for timestep in self.timesteps], dtype=float)
+        return loads, durations
+
+    def der_sizing_renewable_power(self, initial_energy_resources, design_specs_list):
+        """Return array of total renewable power by design and timestep for a list of designs
+        without loading them into the grid; ratings are restored afterwards"""
+        renewable_power = numpy.zeros((len(design_specs_list), len(self.timesteps)))
+        for type in defaults.renewable_generator_types():
+            if type not in initial_energy_resources: continue
+            for generator in initial_energy_resources[type]:
+                power_rating = generator._power_rating
+                for i, design_specs in enumerate(design_specs_list):
+                    rating = design_specs[type] if type in design_specs else power_rating
+                    if rating == 0: continue
+                    generator.update(rating)
+                    renewable_power[i] += self.renewable_power_profile(generator)
+                generator.update(power_rating)
+        return renewable_power
@@ -0,0 +1,50 @@
+import numpy
+
+"""
+Selection of representative periods of a simulation horizon by k-medoids clustering
+
+Periods (e.g. days) are points of their load and renewable power profiles; the medoids of k clusters
+stand for the periods of their clusters, so a horizon of n periods can be simulated with k of them.
+Medoids are initialized greedily (each added medoid reduces total distance the most), then clusters
+and medoids are updated in turn until the medoids do not change; both steps are deterministic.
+"""
+
+_MAX_ITERATIONS = 100
+
+def _distances(features):
+    """Returns matrix of euclidean distances between the rows of the input array"""
+    squared = numpy.sum(features**2, axis=1)
+    return numpy.sqrt(numpy.maximum(squared[:, numpy.newaxis] + squared[numpy.newaxis, :] - 2.0 * (features @ features.T), 0.0))
+
+def k_medoids(features, num_clusters):
+    """Returns array of the indices of the medoid rows in increasing order and array of the medoid index by row
+
+    Keyword arguments:
+    features                2-d array with a row of features per period
+    num_clusters            number of clusters, at most the number of rows
+    """
+    num_points = features.shape[0]
+    if num_clusters < 1 or num_clusters > num_points:
+        raise ValueError("k_medoids number of clusters must be between 1 and the number of periods")
+    distances = _distances(numpy.asarray(features, dtype=float))
+    medoids = [int(numpy.argmin(numpy.sum(distances, axis=0)))]
+    closest = distances[:, medoids[0]].copy()
+    while len(medoids) < num_clusters:
+        costs = numpy.sum(numpy.minimum(closest[:, numpy.newaxis], distances), axis=0)
+        costs[medoids] = numpy.inf
+        medoids.append(int(numpy.argmin(costs)))
+        closest = numpy.minimum(closest, distances[:, medoids[-1]])
+    medoids = numpy.array(sorted(medoids))
+    for _ in range(_MAX_ITERATIONS):
+        labels = numpy.argmin(distances[:, medoids], axis=1)
+        labels[medoids] = numpy.arange(len(medoids))
+        updated = medoids.copy()
+        for cluster in range(len(medoids)):
+            members = numpy.flatnonzero(labels == cluster)
+            updated[cluster] = members[numpy.argmin(numpy.sum(distances[numpy.ix_(members, members)], axis=0))]
+        updated = numpy.sort(updated)
+        if numpy.array_equal(updated, medoids): break
+        medoids = updated
+    labels = numpy.argmin(distances[:, medoids], axis=1)
+    labels[medoids] = numpy.arange(len(medoids))
+    return medoids, labels
@@ -1,6 +1,7 @@
 import os
 import src.utils.helpers as util_helpers
 import src.data.mysql.simulate as database_simulate
+from src.reports import MetricsCsvWriter
 
 class Simulate(object):
 
@@ -17,6 +18,35 @@ class Simulate(object):
 
     def run(self, results_dir=None, database_id=None):
         """Run the simulation"""
-        metrics = self._core_sim.run()
+        if self._core_sim.is_streaming(): return self._run_streaming(results_dir, database_id)
+        metrics = self._core_sim.run(trace=True)
         if results_dir is not None: self.results_to_disk(results_dir, metrics)
         if database_id is not None: self.to_database(database_id, metrics)
+
+    def _run_streaming(self, results_dir=None, database_id=None):
+        """Run a streaming simulation, writing the results of each chunk of timesteps to disk as it completes;
+        the database output holds every timestep, so only its columns are kept across chunks"""
+        writer = None
+        if results_dir is not None:
+            writer = MetricsCsvWriter(os.path.join(results_dir,util_helpers.CORE_SIM_RESULTS_FILENAME))
+        output = dict()
+
+        def write(metrics):
+            if writer is not None: writer.write(metrics)
+            if database_id is not None: _extend_output(output, metrics.output_columns())
+
+        summary = self._core_sim.run(chunk_metrics=write if writer is not None or database_id is not None else None)
+        if database_id is not None:
+            database_simulate.metrics_add(database_id, {"output":output, "summary_stats":summary.summary_stats()})
+
+
+def _extend_output(output, chunk_output):
+    """Appends the input columnar output of a chunk of timesteps (see Metrics.output_columns) to output"""
+    if len(output) == 0:
+        output.update(chunk_output)
+        return
+    for name, values in chunk_output.items():
+        if name == "columns":
+            for column, column_values in values.items(): output["columns"][column].extend(column_values)
+        else:
+            output[name].extend(values)
@@ -0,0 +1,102 @@
+"""
+Index of sizing results answering dominance queries without scanning every result
+
+Results are points (design ratings by DER type..., deficit percentage) kept in static k-d trees of sizes 2^i;
+adding a result merges the trees of equal size into one (logarithmic method), so adding stays cheap
+while each query searches O(log n) balanced trees.
+A query finds the result added first among those with every coordinate at most the query's,
+skipping subtrees outside that range or holding only results added later than one already found,
+which is the result a scan of the results in order would return.
+"""
+
+_POINT = 0
+_AXIS = 1
+_LEFT = 2
+_RIGHT = 3
+_LOWER = 4 # lowest value by coordinate in the subtree
+_FIRST = 5 # lowest order in the subtree
+
+def _build(points, depth=0):
+    """Returns balanced k-d tree node of input list of (coordinates, order, result) tuples"""
+    if len(points) == 0: return None
+    axis = depth % len(points[0][0])
+    points = sorted(points, key=lambda point: point[0][axis])
+    median = len(points) // 2
+    left = _build(points[:median], depth+1)
+    right = _build(points[median+1:], depth+1)
+    lower = list(points[median][0])
+    first = points[median][1]
+    for child in [left, right]:
+        if child is None: continue
+        lower = [min(a, b) for a, b in zip(lower, child[_LOWER])]
+        first = min(first, child[_FIRST])
+    return [points[median], axis, left, right, lower, first]
+
+def _points(node, points):
+    """Appends points of the input tree to the input list"""
+    if node is None: return points
+    points.append(node[_POINT])
+    _points(node[_LEFT], points)
+    _points(node[_RIGHT], points)
+    return points
+
+class DominanceIndex(object):
+
+    def __init__(self, der_types, results=()):
+        """DominanceIndex constructor __init__
+
+        Keyword arguments:
+        der_types               DER types in the order of design coordinates
+        results                 results to add in order
+        """
+        self._der_types = der_types
+        self._trees = [] # (size, root) with sizes decreasing powers of 2
+        self._names = set()
+        for result in results: self.add(result)
+
+    def __len__(self):
+        return len(self._names)
+
+    def _coordinates(self, design):
+        return tuple(design[der_type] for der_type in self._der_types)
+
+    def add(self, result):
+        """Adds the input result after all results added before; a result of an added design is ignored"""
+        if result.get_name() in self._names: return
+        order = len(self._names)
+        self._names.add(result.get_name())
+        points = [(self._coordinates(result.design) + (result.deficit_percentage,), order, result)]
+        while len(self._trees) > 0 and self._trees[-1][0] == len(points):
+            points = _points(self._trees.pop()[1], points)
+        self._trees.append((len(points), _build(points)))
+
+    def _first(self, design, deficit_percentage):
+        """Returns the first added result with a different design, no higher ratings than the input design
+        and no higher deficit than the input deficit, or None"""
+        bound = self._coordinates(design) + (deficit_percentage,)
+        best = [None, len(self._names)]
+        for _, root in self._trees:
+            self._search(root, bound, bound[:-1], best)
+        return best[0]
+
+    def _search(self, node, bound, excluded, best):
+        """Searches the input tree for points in range added before best and updates best"""
+        if node is None or node[_FIRST] >= best[1]: return
+        for a, b in zip(node[_LOWER], bound):
+            if a > b: return
+        coordinates, order, result = node[_POINT]
+        if order < best[1] and coordinates[:-1] != excluded \
+            and all(a <= b for a, b in zip(coordinates, bound)):
+            best[0] = result
+            best[1] = order
+        children = [child for child in [node[_LEFT], node[_RIGHT]] if child is not None]
+        for child in sorted(children, key=lambda child: child[_FIRST]):
+            self._search(child, bound, excluded, best)
+
+    def dominates(self, design):
+        """Checks if any added result without deficit dominates the input design"""
+        return self._first(design, 0.0) is not None
+
+    def first_dominator(self, result):
+        """Returns the first added result that dominates the input result, or None"""
+        return self._first(result.design, result.deficit_percentage)
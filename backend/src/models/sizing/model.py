@@ -2,9 +2,18 @@ import math
 import os
 import random
 import json
+import hashlib
+import zlib
+import multiprocessing
+import time
+import numpy
 import src.components.defaults as component_defaults
 import src.data.mysql.sizing as database_sizing
 import src.data.mysql.components as database_components
+from src.models.sizing.dominance import DominanceIndex
+from src.models.sizing import prescreen
+from src.models.sizing.surrogate import RadialBasisSurrogate
+from src.reports import InfeasibleRun
 import datetime
 from itertools import product
 
@@ -17,6 +26,21 @@ _COMPONENT_SPEC_BY_TYPE_INCLUDED_IN_SIZING = {
     component_defaults.BATTERY:["b_energy", "b_charge_power", "b_discharge_power"]
 }
 _MULTIPLIER = {"b_charge_power":None, "b_discharge_power":None, "wt_peak_power":None}
+_MAX_BATCH_SIZE = 512 # designs simulated together by CoreSimulation.der_sizing_run_batch
+_MIN_BATCH_SIZE = 4 # fewer designs are simulated one at a time, faster than a batch pass
+_WORKER_SIZING = None # Sizing object inherited by forked worker processes
+_SHARDED_ALGORITHMS = ["exact", "heuristic"] # algorithms run_shard can partition
+_FEASIBILITY_ONLY_ALGORITHMS = ["exact", "frontier", "multifidelity"] # algorithms only needing deficits of designs without them
+_SHARD_FILENAME = "shard_{0}.json"
+_DESIGN_CACHE_VERSION = 1 # increment when changes to simulations invalidate cached design evaluations
+_DESIGN_CACHE_FLUSH_SIZE = 512 # design evaluations written to the design cache together
+_CHECKPOINT_VERSION = 1 # increment when the checkpoint format changes
+_TIME_BUDGET_READ_INTERVAL = 30.0 # seconds between reads of the time budget of a run writing to the database
+_SURROGATE_INITIAL_DESIGNS = 8 # designs sampled by DER type before the first surrogate fit, besides the corners
+_SURROGATE_BATCH_SIZE = 32 # designs simulated between surrogate fits
+_SURROGATE_BAND = 1.0 # predicted deficit percentage up to which a design may be near the frontier
+_SURROGATE_EXCESS_WEIGHT = 0.1 # weight of predicted excess percentage, favoring the less oversized designs
+_SURROGATE_MAX_FRACTION = 0.25 # max proportion of designs the surrogate algorithm simulates
 _MAX_MULTIPLIER = {
     component_defaults.PHOTOVOLTAIC_PANEL:5.0,
     component_defaults.WIND_TURBINE:5.0,
@@ -40,17 +64,28 @@ class Design(dict):
                 flag = True
         return flag
     
-    def is_dominated(self, results):
-        """Checks if the design is dominated by any of the input results"""
-        for r in results.values():
-            if r.dominates_design(self):
-                return True
-        return False
+    def is_dominated(self, index):
+        """Checks if the design is dominated by any of the results in the input DominanceIndex"""
+        return index.dominates(self)
+
+    def alternative(self, levels, down_flag, der_type, step_size):
+        """Returns the design moved up or down the input levels of the input der_type
+        by the input step_size, or None if it would move past the last level"""
+        index = levels[der_type].index(self[der_type])
+        new_index = index-step_size if down_flag else index+step_size
+        while new_index >= 0 and new_index < len(levels[der_type]) and \
+            levels[der_type][new_index] == levels[der_type][index]:
+                new_index = new_index-1 if down_flag else new_index+1
+        if new_index < 0 or new_index >= len(levels[der_type]): return None
+        new_design = Design({ k:v for k,v in self.items() })
+        new_design[der_type] = levels[der_type][new_index]
+        return new_design
 
 
 class Result(object):
 
-    def __init__(self, sizing, design, deficit_percentage, excess_percentage, unused_percentage, time_used_ratio, metrics_summary_stats, parent):
+    def __init__(self, sizing, design, deficit_percentage, excess_percentage, unused_percentage, time_used_ratio, metrics_summary_stats, parent,
+                 first_deficit_step=None):
         self.sizing = sizing
         self.design = design
         self.deficit_percentage = deficit_percentage
@@ -59,12 +94,17 @@ class Result(object):
         self.time_used_ratio = time_used_ratio
         self.metrics_summary_stats = metrics_summary_stats
         self.parent = parent
+        self.first_deficit_step = first_deficit_step # set, and the other fields None, if the simulation stopped at it
         self.dominated_by = None
 
     def get_name(self):
         """Returns a string representation of the design"""
         return self.design.get_name()
 
+    def has_deficit(self):
+        """Checks if the design has a deficit"""
+        return self.first_deficit_step is not None or self.deficit_percentage > 0.0
+
     def is_dominated(self):
         """Checks if the result is dominated"""
         return self.dominated_by is not None
@@ -79,14 +119,10 @@ class Result(object):
         """Checks if the result dominates the input design"""
         return design.may_be_dominated_by(self.design) and self.deficit_percentage == 0.0
 
-    def set_dominated_by(self, results):
-        """Sets the result that dominates the current result from the input results"""
-        results_not_self = { k:v for k,v in results.items() }
-        if self.get_name() in results_not_self: results_not_self.pop(self.get_name())
-        for v in results_not_self.values():
-            if self.is_dominated_by(v):
-                self.dominated_by = v
-                return
+    def set_dominated_by(self, index):
+        """Sets the result that dominates the current result to the first one added to the input DominanceIndex"""
+        dominator = index.first_dominator(self)
+        if dominator is not None: self.dominated_by = dominator
 
     def generate_alternative_design(self, down_flag, der_type, step_size):
         """Generates an alternative design 
@@ -94,16 +130,19 @@ class Result(object):
         by the input step_size"""
         if (down_flag and self.deficit_percentage > 0.0) or (not down_flag and self.deficit_percentage == 0.0):
             return None
-        index = self.sizing.levels[der_type].index(self.design[der_type])
-        new_index = index-step_size if down_flag else index+step_size
-        while new_index >= 0 and new_index < len(self.sizing.levels[der_type]) and \
-            self.sizing.levels[der_type][new_index] == self.sizing.levels[der_type][index]:
-                new_index = new_index-1 if down_flag else new_index+1
-        if new_index < 0 or new_index >= len(self.sizing.levels[der_type]): return None
-        new_design = Design({ k:v for k,v in self.design.items() })
-        new_design[der_type] = self.sizing.levels[der_type][new_index]
-        return new_design
+        return self.design.alternative(self.sizing.levels, down_flag, der_type, step_size)
     
+    def fields(self):
+        """Returns the Result constructor arguments computed from simulation metrics"""
+        return {
+            "deficit_percentage": self.deficit_percentage,
+            "excess_percentage": self.excess_percentage,
+            "unused_percentage": self.unused_percentage,
+            "time_used_ratio": self.time_used_ratio,
+            "metrics_summary_stats": self.metrics_summary_stats,
+            "first_deficit_step": self.first_deficit_step,
+        }
+
     def to_csv(self):
         """Writes the result to a csv string"""
         csv = self.get_name()+","
@@ -115,45 +154,107 @@ class Result(object):
         csv += ","+(self.parent.get_name() if self.parent is not None else "none")+"\n"
         return csv
     
-    def to_database(self, id):
-        """Writes the result to the database"""
-        record_id = database_sizing.grid_design_add(
-            id=id,
-            name=self.get_name(),
-            deficit_percentage=self.deficit_percentage,
-            excess_percentage=self.excess_percentage,
-            dominated_by=self.dominated_by.get_name() if self.dominated_by is not None else "",
-            parent=self.parent.get_name() if self.parent is not None else "none",
-            metrics_summary_stats = json.dumps(self.metrics_summary_stats)
-        )
+    def database_record(self):
+        """Returns the sizing grid of the result in the format of database_sizing.grid_designs_add"""
+        components = []
         for der_type in self.sizing.der_types:
-            component_type_id = database_components.types_id_get(der_type)
-            component_id = database_sizing.grid_component_add(
-                id = record_id,
-                component_type_id=component_type_id,
-                unused_percentage = self.unused_percentage[der_type],
-                time_steps_percentage = self.time_used_ratio[der_type],
-            )
-            for i in range(0, len(_COMPONENT_SPEC_BY_TYPE_INCLUDED_IN_SIZING[der_type])):
-                component_spec_meta_parameter_name = _COMPONENT_SPEC_BY_TYPE_INCLUDED_IN_SIZING[der_type][i]
+            specs = dict()
+            for component_spec_meta_parameter_name in _COMPONENT_SPEC_BY_TYPE_INCLUDED_IN_SIZING[der_type]:
                 multiplier = _MULTIPLIER[component_spec_meta_parameter_name] if component_spec_meta_parameter_name in _MULTIPLIER else 1.0
-                database_sizing.grid_component_spec_data_add(
-                    sizing_grid_component_id=component_id,
-                    component_spec_meta_parameter_name=component_spec_meta_parameter_name,
-                    value = self.design[der_type] * multiplier,
-                )
+                specs[component_spec_meta_parameter_name] = self.design[der_type] * multiplier
+            components.append({
+                "componentTypeId": database_components.types_id_get(der_type),
+                "unusedPercentage": self.unused_percentage[der_type],
+                "timeStepsPercentage": self.time_used_ratio[der_type],
+                "specs": specs,
+            })
+        return {
+            "name": self.get_name(),
+            "deficitPercentage": self.deficit_percentage,
+            "excessPercentage": self.excess_percentage,
+            "dominatedBy": self.dominated_by.get_name() if self.dominated_by is not None else "",
+            "parent": self.parent.get_name() if self.parent is not None else "none",
+            "metricsSummaryStats": json.dumps(self.metrics_summary_stats),
+            "components": components,
+        }
+
+    def to_database(self, id):
+        """Writes the result to the database"""
+        database_sizing.grid_designs_add(id, [self.database_record()])
 
 class Sizing(object):
 
-    def __init__(self, core_sim, num_levels):
+    def __init__(self, core_sim, num_levels, workers=1, design_cache=False, coarse_step=4.0, coarse_load="peak",
+                 representative_periods=None, checkpoint_file=None, checkpoint_interval=300.0,
+                 publish_interval=None, time_budget=None, feasibility_only=False):
+        """Sizing constructor __init__
+
+        Keyword arguments:
+        core_sim                CoreSimulation of the sizing grid template
+        num_levels              number of discrete levels for DER capacities
+        workers                 number of processes simulating designs (forked from this one, so each
+                                holds a warm copy of core_sim); results do not depend on the number of workers
+        design_cache            reuse design evaluations stored in the database by sizing runs with the same
+                                simulation inputs (see CoreSimulation.der_sizing_context) and store new ones
+        coarse_step             length (hours) of the timesteps the multifidelity algorithm screens designs on
+        coarse_load             "mean" or "peak" load of the timesteps aggregated (see CoreSimulation.coarsened)
+        representative_periods  simulate designs over this number of representative days of the timeline
+                                instead of all of them (see CoreSimulation.representative); levels still
+                                depend on the peak load of the full timeline
+        checkpoint_file         file the state of runs is written to every checkpoint_interval seconds,
+                                and read by runs that resume (see run)
+        checkpoint_interval     seconds between checkpoints
+        publish_interval        runs writing results to the database publish their partial front (see publish)
+                                at every phase boundary and, if not None, every publish_interval simulated designs
+        time_budget             seconds after which runs stop with the non-dominated designs simulated so far
+                                as results, or None; runs writing results to the database read it from there
+        feasibility_only        stop simulating designs at their first deficit timestep, so only designs without
+                                deficit have results (with the deficits of the others unknown, they are listed
+                                in infeasible instead); for the exact, frontier and multifidelity algorithms
+        """
+        if int(workers) != workers or workers < 1:
+            raise ValueError("Sizing workers must be a positive integer")
         self.core_sim = core_sim
         self.num_levels = num_levels
+        self.workers = int(workers)
+        self._pool = None
         self.levels = None
         self.info = { "min":{}, "max":{}, "decimals":{}}
         self.der_types = []
         self.peak_load = None
         self.energy_resources = None
         self.results = dict() # use as ordered set with None values
+        self.simulations_skipped = 0 # designs whose deficit the frontier algorithm inferred without simulating
+        self.simulations_prescreened = 0 # designs the frontier algorithm searched whose deficit the prescreen proved
+        self.feasibility_only = feasibility_only
+        self.infeasible = dict() # first deficit timestep (None if simulated in full) by name of designs with deficits, if feasibility_only
+        self.coarse_step = coarse_step
+        self.coarse_load = coarse_load
+        self.fidelity_report = None # comparison of coarse and full timeline verdicts of the multifidelity algorithm
+        self.representative_periods = representative_periods
+        self._full_sim = core_sim # CoreSimulation of the full timeline when core_sim has representative periods
+        self.checkpoint_file = checkpoint_file
+        self.checkpoint_interval = checkpoint_interval
+        self._checkpoint_time = time.monotonic()
+        self._checkpoint_evaluations = dict() # [design, Result constructor arguments] by design name since the run started
+        self._algorithm = None
+        self._phase = None # part of the algorithm running, recorded in checkpoints
+        self._cutoff_set = set() # combinations with deficits or below them in the running exact search
+        self.publish_interval = publish_interval
+        self.time_budget = time_budget
+        self._database_id = None # id of the sizing result the running algorithm publishes its partial front to
+        self._run_start = None
+        self._time_budget_read = None # time.monotonic() of the last read of the time budget from the database
+        self._evaluated = set() # names of designs simulated since the run started
+        self._published_evaluations = 0 # number of designs simulated at the last publication
+        self._front = None # non-dominated Results by design name, tracked when publishing or with a time budget
+        self._stopped = False # whether the time budget stopped the run
+        self._index = None # DominanceIndex of self.results
+        self._prefetched = dict() # results simulated ahead of _analyze_design by _run_designs
+        self._known = dict() # Result constructor arguments by design name read from shards, used instead of simulating
+        self.design_cache = design_cache
+        self._design_cache_key = None # _design_cache_context_key, computed before designs are loaded into the grid
+        self._design_cache_buffer = dict() # Result constructor arguments by design name not yet in the design cache
         self._initialize()
 
     def closest_level(self, value, resource_type):
@@ -175,6 +276,169 @@ class Sizing(object):
             self.info["min"][der_type] = 0
             self.info["max"][der_type] = self.peak_load * _MAX_MULTIPLIER[der_type]
             self.info["decimals"][der_type] = 0
+        if self.representative_periods is not None:
+            self.core_sim = self._full_sim.representative(self.representative_periods)
+        self._index = DominanceIndex(self.der_types)
+        self._design_cache_key = self._design_cache_context_key()
+        if self.design_cache:
+            self._known.update(database_sizing.design_cache_get(self._design_cache_key))
+
+    def _design_cache_context_key(self):
+        """Returns the key of design cache entries shared by sizing runs with the same DER types and
+        simulation inputs; design evaluations are stored under it by design name"""
+        context = {
+            "version": _DESIGN_CACHE_VERSION,
+            "der_types": self.der_types,
+            "simulation": self.core_sim.der_sizing_context(),
+        }
+        return hashlib.sha1(json.dumps(context, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _record_evaluation(self, design, fields):
+        """Adds the Result constructor arguments of a simulated design to the design cache buffer
+        and to the next checkpoint, written if checkpoint_interval has passed since the last one;
+        evaluations stopped at a deficit are not recorded, as runs of any mode share them"""
+        if fields.get("first_deficit_step") is not None: return
+        if self.checkpoint_file is not None:
+            self._checkpoint_evaluations[design.get_name()] = [design, fields]
+            if time.monotonic() - self._checkpoint_time >= self.checkpoint_interval: self.checkpoint()
+        if not self.design_cache: return
+        self._known[design.get_name()] = fields
+        self._design_cache_buffer[design.get_name()] = fields
+        if len(self._design_cache_buffer) >= _DESIGN_CACHE_FLUSH_SIZE: self._flush_design_cache()
+
+    def _flush_design_cache(self):
+        """Writes buffered design evaluations to the design cache"""
+        if len(self._design_cache_buffer) == 0: return
+        database_sizing.design_cache_add(self._design_cache_key, self._design_cache_buffer)
+        self._design_cache_buffer = dict()
+
+    def checkpoint(self):
+        """Writes the state of the run to checkpoint_file: design evaluations, algorithm phase, levels,
+        random number generator state and the cutoff set of the exact search (zlib compressed JSON)"""
+        state = {
+            "version": _CHECKPOINT_VERSION,
+            "context_key": self._design_cache_key,
+            "algorithm": self._algorithm,
+            "phase": self._phase,
+            "num_levels": self.num_levels,
+            "der_types": self.der_types,
+            "levels": self.levels,
+            "random_state": random.getstate(),
+            "cutoff_set": sorted(self._cutoff_set),
+            "evaluations": [{"design":design, "fields":fields} for design, fields in self._checkpoint_evaluations.values()],
+        }
+        directory = os.path.dirname(self.checkpoint_file)
+        if directory != "": os.makedirs(directory, exist_ok=True)
+        with open(self.checkpoint_file+".tmp", "wb") as f:
+            f.write(zlib.compress(json.dumps(state).encode("utf-8")))
+        os.replace(self.checkpoint_file+".tmp", self.checkpoint_file) # a resume never reads a partially written checkpoint
+        self._checkpoint_time = time.monotonic()
+
+    def _load_checkpoint(self, algorithm):
+        """Reads the design evaluations of checkpoint_file for run to use instead of simulating
+        and returns the checkpoint state, or None if there is no checkpoint file"""
+        if not os.path.isfile(self.checkpoint_file): return None
+        with open(self.checkpoint_file, "rb") as f:
+            state = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+        if state["version"] != _CHECKPOINT_VERSION or state["algorithm"] != algorithm \
+            or state["num_levels"] != self.num_levels or state["der_types"] != self.der_types \
+            or state["context_key"] != self._design_cache_key:
+            raise ValueError("Sizing checkpoint {0} was computed with different parameters".format(self.checkpoint_file))
+        for entry in state["evaluations"]:
+            design = Design(entry["design"])
+            self._known[design.get_name()] = entry["fields"]
+            self._checkpoint_evaluations[design.get_name()] = [design, entry["fields"]]
+        return state
+
+    def _set_phase(self, phase):
+        """Sets the part of the algorithm running, publishes the partial front at the boundary
+        if designs were simulated since the last publication and stops the run if its time budget has passed"""
+        self._phase = phase
+        if self._front is None: return
+        if len(self._evaluated) > self._published_evaluations: self.publish()
+        self._check_time_budget()
+
+    def _track(self, results):
+        """Updates the partial front with the input results of simulated designs, publishes it
+        every publish_interval simulated designs, reads the time budget from the database
+        every _TIME_BUDGET_READ_INTERVAL seconds and stops the run if its time budget has passed"""
+        if self._front is None: return
+        for result in results:
+            if result.get_name() in self._evaluated: continue
+            self._evaluated.add(result.get_name())
+            if self.feasibility_only and result.has_deficit(): continue
+            candidate = self._result(result.design, None, result.fields())
+            if not any(candidate.is_dominated_by(r) for r in self._front.values()):
+                update_results(self._front, candidate)
+        if self.publish_interval is not None \
+            and len(self._evaluated) - self._published_evaluations >= self.publish_interval: self.publish()
+        elif self._database_id is not None \
+            and time.monotonic() - self._time_budget_read >= _TIME_BUDGET_READ_INTERVAL: self._read_time_budget()
+        self._check_time_budget()
+
+    def _check_time_budget(self):
+        """Raises _TimeBudgetExceeded if time_budget seconds have passed since the run started"""
+        if self.time_budget is not None and time.monotonic() - self._run_start >= self.time_budget:
+            raise _TimeBudgetExceeded()
+
+    def publish(self, status="running"):
+        """Writes the progress of the run and its partial front (the non-dominated designs simulated so far)
+        to the database in one update, then reads the time budget, which may be set while the run is running"""
+        if self._database_id is None: return
+        front = [{
+            "name": result.get_name(),
+            "design": result.design,
+            "deficit_percentage": result.deficit_percentage,
+            "excess_percentage": result.excess_percentage,
+        } for result in self._front.values()]
+        progress = {
+            "status": status,
+            "algorithm": self._algorithm,
+            "phase": self._phase,
+            "simulated": len(self._evaluated),
+            "designs": self.num_levels ** len(self.der_types),
+            "front": len(front),
+            "elapsed_seconds": round(time.monotonic() - self._run_start, 1),
+            "time_budget": self.time_budget,
+            "updatedatetime": datetime.datetime.now(),
+        }
+        database_sizing.partial_front_add(self._database_id, progress, front)
+        self._published_evaluations = len(self._evaluated)
+        self._read_time_budget()
+
+    def _read_time_budget(self):
+        """Sets the time budget to the one of the sizing result in the database, if it has one"""
+        time_budget = database_sizing.time_budget_get(self._database_id)
+        self._time_budget_read = time.monotonic()
+        if time_budget is not None: self.time_budget = time_budget
+
+    def _stop_at_time_budget(self):
+        """Replaces the results with the partial front when the time budget stops the run"""
+        print("time budget of {0}s passed in phase {1}, stopping with {2} non-dominated of {3} simulated designs".format(
+            self.time_budget, self._phase, len(self._front), len(self._evaluated)), flush=True)
+        self._stopped = True
+        self._prefetched = dict()
+        self.results = dict()
+        self._index = DominanceIndex(self.der_types)
+        for result in self._front.values(): self._add_result(result)
+
+    def validate_representative(self, design):
+        """Returns dictionary of the Result constructor arguments of the input design (a dictionary of
+        ratings by DER type) simulated over the representative periods and over the full timeline"""
+        if self.representative_periods is None:
+            raise ValueError("Sizing has no representative periods to validate")
+        design = Design({der_type:design[der_type] for der_type in self.der_types})
+        fields = dict()
+        for timeline, core_sim in [("representative", self.core_sim), ("full", self._full_sim)]:
+            random.seed(0)
+            core_sim.der_sizing_load_design(self.energy_resources, design)
+            fields[timeline] = self._metrics_fields(core_sim.run())
+        return fields
+
+    def warm_profile_store(self):
+        """Computes renewable power profiles at every level so later runs read them from the profile store"""
+        self._generate_levels(self.num_levels)
+        self.core_sim.der_sizing_warm_profiles(self.energy_resources, self.levels)
 
     def _generate_levels(self, num_levels):
         """Generates levels for each DER type"""
@@ -189,40 +453,156 @@ class Sizing(object):
     def _simulate(self, design, parent):
         """Simulates the input design and returns the result"""
         random.seed(0)
-        self.core_sim.der_sizing_load_design(self.energy_resources, design)
-        metrics = self.core_sim.run()
-        result = Result(
-            sizing = self,
-            design = design,
-            deficit_percentage = metrics.deficit_percentage(),
-            excess_percentage = metrics.excess_percentage(),
-            unused_percentage = {t:metrics.unused_percentage(t)[0] for t in self.der_types},
-            time_used_ratio = {t:metrics.unused_percentage(t)[1] for t in self.der_types},
-            metrics_summary_stats = metrics.summary_stats(),
-            parent = parent,
-        )
+        if design.get_name() in self._known: fields = self._known[design.get_name()]
+        else:
+            self.core_sim.der_sizing_load_design(self.energy_resources, design)
+            fields = self._metrics_fields(self.core_sim.run(stop_at_deficit=self.feasibility_only))
+            self._record_evaluation(design, fields)
+        result = self._result(design, parent, fields)
+        self._track([result])
         return result
 
-    def _analyze_design(self, design, parent, results):
-        """Analyzes the input design and returns the result if it is not dominated by any existing results"""
+    def _simulate_batch(self, designs):
+        """Simulates the input designs and returns the results in the same order;
+        with multiple workers the designs are split into one chunk per worker,
+        or one design per task if the chunks would be too small for a batch pass"""
+        if len(designs) == 0: return []
+        random.seed(0)
+        fields_by_name = { d.get_name():self._known[d.get_name()] for d in designs if d.get_name() in self._known }
+        to_simulate = [d for d in designs if d.get_name() not in fields_by_name]
+        if self.workers > 1 and len(to_simulate) > 1:
+            chunk_size = math.ceil(len(to_simulate) / self.workers)
+            if chunk_size < _MIN_BATCH_SIZE: chunk_size = 1
+            chunk_size = min(chunk_size, _MAX_BATCH_SIZE)
+            chunks = [to_simulate[i:i+chunk_size] for i in range(0, len(to_simulate), chunk_size)]
+            fields_by_chunk = self._get_pool().map(_simulate_in_worker, chunks)
+        else:
+            chunks = [to_simulate[i:i+_MAX_BATCH_SIZE] for i in range(0, len(to_simulate), _MAX_BATCH_SIZE)]
+            fields_by_chunk = [[self._metrics_fields(metrics) for metrics in self._simulate_metrics(chunk)] for chunk in chunks]
+        for chunk, fields_list in zip(chunks, fields_by_chunk):
+            for design, fields in zip(chunk, fields_list):
+                fields_by_name[design.get_name()] = fields
+                self._record_evaluation(design, fields)
+        results = [self._result(design, None, fields_by_name[design.get_name()]) for design in designs]
+        self._track(results)
+        return results
+
+    def _simulate_metrics(self, designs):
+        """Returns simulation metrics of the input designs, simulated one at a time if there are few
+        and together by CoreSimulation.der_sizing_run_batch otherwise"""
+        if len(designs) >= _MIN_BATCH_SIZE:
+            return self.core_sim.der_sizing_run_batch(self.energy_resources, designs, stop_at_deficit=self.feasibility_only)
+        metrics_list = []
+        for design in designs:
+            self.core_sim.der_sizing_load_design(self.energy_resources, design)
+            metrics_list.append(self.core_sim.run(stop_at_deficit=self.feasibility_only))
+        return metrics_list
+
+    def _get_pool(self):
+        """Returns the pool of worker processes, forking them on first use
+        after computing renewable profiles at the current levels so workers inherit them"""
+        global _WORKER_SIZING
+        if self._pool is None:
+            if self.levels is not None:
+                self.core_sim.der_sizing_warm_profiles(self.energy_resources, self.levels)
+            _WORKER_SIZING = self
+            self._pool = multiprocessing.get_context("fork").Pool(self.workers)
+        return self._pool
+
+    def _close_pool(self, terminate=False):
+        """Stops the worker processes, once they finish their tasks or, if terminate, right away
+        (e.g. when an exception or a signal interrupts a simulation the workers are running)"""
+        if self._pool is None: return
+        if terminate: self._pool.terminate()
+        else: self._pool.close()
+        self._pool.join()
+        self._pool = None
+
+    def _prefetch_line(self, design, down_flag, der_type, step_size, index=None):
+        """Simulates together the designs a search from the input design visits along der_type,
+        up to the first design dominated by the results in the input DominanceIndex; _analyze_design then uses them in order
+        and results of designs the search does not reach are discarded.
+        Only used with multiple workers, which otherwise idle while a search runs one design at a time"""
+        if self.workers == 1: return
+        designs = []
+        design = design.alternative(self.levels, down_flag, der_type, step_size)
+        while design is not None:
+            if index is not None and design.is_dominated(index): break
+            if design.get_name() not in self.results and design.get_name() not in self._prefetched:
+                designs.append(design)
+            design = design.alternative(self.levels, down_flag, der_type, step_size)
+        if len(designs) < 2: return # a single design is simulated when it is reached
+        random_state = random.getstate() # random.seed(0) is applied when the search reaches a design
+        for result in self._simulate_batch(designs):
+            self._prefetched[result.get_name()] = result
+        random.setstate(random_state)
+
+    def _metrics_fields(self, metrics):
+        """Returns the Result constructor arguments computed from the simulation metrics of a design,
+        or only its first deficit timestep if the simulation stopped at it"""
+        if isinstance(metrics, InfeasibleRun):
+            return {
+                "deficit_percentage": None,
+                "excess_percentage": None,
+                "unused_percentage": None,
+                "time_used_ratio": None,
+                "metrics_summary_stats": None,
+                "first_deficit_step": metrics.first_deficit_step(),
+            }
+        unused = {t:metrics.unused_percentage(t) for t in self.der_types}
+        return {
+            "deficit_percentage": metrics.deficit_percentage(),
+            "excess_percentage": metrics.excess_percentage(),
+            "unused_percentage": {t:unused[t][0] for t in self.der_types},
+            "time_used_ratio": {t:unused[t][1] for t in self.der_types},
+            "metrics_summary_stats": metrics.summary_stats(),
+        }
+
+    def _result(self, design, parent, fields):
+        """Returns the result of the input design from its _metrics_fields"""
+        return Result(sizing=self, design=design, parent=parent, **fields)
+
+    def _add_result(self, result):
+        """Adds the input result to the results, where a result of the same design keeps its place;
+        if feasibility_only, a result with deficit is added to infeasible instead"""
+        if result.get_name() in self.results: return
+        if self.feasibility_only and result.has_deficit():
+            self.infeasible.setdefault(result.get_name(), result.first_deficit_step)
+            return
+        self.results[result.get_name()] = result
+        self._index.add(result)
+
+    def _analyze_design(self, design, parent, index):
+        """Analyzes the input design and returns the result if it is not dominated by any results
+        in the input DominanceIndex"""
         if design is None: return None
-        if results is not None and design.is_dominated(results): return None
+        if index is not None and design.is_dominated(index): return None
         if design.get_name() in self.results:
             result = self.results[design.get_name()]
         else:
-            result = self._simulate(design, parent)
-            self.results[result.get_name()] = result
-            if results is not None: result.set_dominated_by(results)
-        if results is not None and result.is_dominated(): return None
+            if design.get_name() in self._prefetched:
+                random.seed(0) # as _simulate would
+                result = self._prefetched.pop(design.get_name())
+                result.parent = parent
+            else: result = self._simulate(design, parent)
+            self._add_result(result)
+            if index is not None: result.set_dominated_by(index)
+        if index is not None and result.is_dominated(): return None
         return result
 
     def _run_designs(self, designs, debug=False):
         """Runs the input designs""" 
         if debug: designs = [Design({'SolarPhotovoltaicPanel': 0, 'DieselGenerator': 70, 'Battery': 385})]
+        prefetch = dict()
+        for design in designs:
+            if design is None or design.get_name() in self.results or design.is_dominated(self._index): continue
+            prefetch[design.get_name()] = design
+        self._prefetched = { r.get_name():r for r in self._simulate_batch(list(prefetch.values())) }
         for design in designs:            
-            self._analyze_design(design, None, self.results)
+            self._analyze_design(design, None, self._index)
+        self._prefetched = dict()
         for result in list(self.results.values()):
-            result.set_dominated_by(self.results)
+            result.set_dominated_by(self._index)
 
     def _filter_non_dominated(self, deficit_percentage=1.0):
         """Filters non-dominated results by deficit percentage"""
@@ -231,31 +611,265 @@ class Sizing(object):
             if not v.is_dominated() and v.deficit_percentage <= deficit_percentage: non_dominated[k] = v
         return non_dominated
 
-    def _run_exact(self, num_levels=None):
+    def _run_exact(self, num_levels=None, shard=None):
         """exact algorithm performs an exhaustive search (grows exponentially), 
-        but prunes branches when designs are dominated or when deficits are encountered"""
+        but prunes branches when designs are dominated or when deficits are encountered;
+        shard (index, count) restricts the search to combinations whose first level index is index modulo count,
+        pruned only by deficits within the shard, so it simulates every design the full search would in that part"""
         if num_levels is None: num_levels = self.num_levels
         self._generate_levels(num_levels)
         cutoff_set = set()
+        self._cutoff_set = cutoff_set
         combinations = sorted(product(range(num_levels), repeat=len(self.der_types)), reverse=True)
+        wavefronts = dict() # a combination's parents are all in the preceding wavefront
         for combination in combinations:
-            design = Design({self.der_types[i]:self.levels[self.der_types[i]][combination[i]] \
-                             for i in range(len(self.der_types))})
-            flag = True
-            for i in range(len(self.der_types)):
-                parent = list(combination)
-                parent[i] = parent[i] + 1
-                if tuple(parent) in cutoff_set:
-                    flag = False
-                    break
-            if not flag:
-                cutoff_set.add(combination)
-                continue
-            result = self._simulate(design, None)
-            self.results[result.get_name()] = result
-            if result.deficit_percentage > 0.0: cutoff_set.add(combination)
+            if shard is not None and combination[0] % shard[1] != shard[0]: continue
+            wavefronts.setdefault(sum(combination), []).append(combination)
+        results = dict()
+        for index_sum in sorted(wavefronts.keys(), reverse=True):
+            self._set_phase("exact search of level index sum {0}".format(index_sum))
+            batch = []
+            for combination in wavefronts[index_sum]:
+                flag = True
+                for i in range(len(self.der_types)):
+                    parent = list(combination)
+                    parent[i] = parent[i] + 1
+                    if tuple(parent) in cutoff_set:
+                        flag = False
+                        break
+                if not flag:
+                    cutoff_set.add(combination)
+                    continue
+                batch.append(combination)
+            designs = [Design({self.der_types[i]:self.levels[self.der_types[i]][combination[i]] \
+                               for i in range(len(self.der_types))}) for combination in batch]
+            for combination, result in zip(batch, self._simulate_batch(designs)):
+                results[combination] = result
+                if result.has_deficit(): cutoff_set.add(combination)
+        for combination in combinations:
+            if combination in results: self._add_result(results[combination])
+        for result in list(self.results.values()):
+            if not result.is_dominated(): result.set_dominated_by(self._index)
+
+    def _design(self, combination):
+        """Returns the design of the input tuple of level indices by DER type"""
+        return Design({self.der_types[i]:self.levels[self.der_types[i]][combination[i]] for i in range(len(self.der_types))})
+
+    def _prescreen(self, designs):
+        """Returns array of verdicts by design from bounds on deficits (see prescreen.feasibility_verdicts)"""
+        loads, durations = self.core_sim.der_sizing_load_profile()
+        battery = self.energy_resources["Battery"][0] if "Battery" in self.energy_resources else None
+        diesel = self.energy_resources["DieselGenerator"][0] if "DieselGenerator" in self.energy_resources else None
+        diesel_level = self.core_sim.grid.get_diesel_level()
+        verdicts = []
+        for i in range(0, len(designs), _MAX_BATCH_SIZE):
+            chunk = designs[i:i+_MAX_BATCH_SIZE]
+            battery_energy = numpy.array([design.get("Battery", 0.0) for design in chunk], dtype=float)
+            diesel_power = numpy.array([design.get("DieselGenerator", 0.0) for design in chunk], dtype=float)
+            # hours of fuel at full power (fuel per hour is the fuel for an hour's energy at the power rating)
+            diesel_fuel_rate = numpy.array([diesel.max_fuel_for_energy(power) if power > 0 else 0.0 for power in diesel_power])
+            with numpy.errstate(divide="ignore", over="ignore"):
+                diesel_hours = numpy.where(diesel_power > 0, diesel_level / numpy.where(diesel_power > 0, diesel_fuel_rate, 1.0), numpy.inf)
+            verdicts.append(prescreen.feasibility_verdicts(
+                load = loads,
+                durations = durations,
+                renewable_power = self.core_sim.der_sizing_renewable_power(self.energy_resources, chunk),
+                diesel_power = diesel_power,
+                battery_energy = battery_energy,
+                battery_power = battery_energy * battery._discharge_ratio if battery is not None else numpy.zeros_like(battery_energy),
+                battery_min_soc = battery._min_soc if battery is not None else 0.0,
+                diesel_hours = diesel_hours,
+            ))
+        return numpy.concatenate(verdicts) if len(verdicts) > 0 else numpy.array([], dtype=int)
+
+    def _prescreen_lines(self, searches, lines):
+        """Narrows the searches of the input lines to the levels whose deficit the prescreen cannot prove,
+        since bounds proven at a level hold at higher (no deficit) or lower (deficit) levels of the line"""
+        combinations = [line+(level,) for line in lines for level in range(searches[line][0], searches[line][1])]
+        for combination, verdict in zip(combinations, self._prescreen([self._design(c) for c in combinations])):
+            search = searches[combination[:-1]]
+            if verdict == prescreen.PROVEN_WITHOUT_DEFICIT: search[1] = min(search[1], combination[-1])
+            elif verdict == prescreen.PROVEN_WITH_DEFICIT: search[0] = max(search[0], combination[-1]+1)
+        # the lowest level proven without deficit is still simulated for its result
+        self.simulations_prescreened += sum(1 for c in combinations if not searches[c[:-1]][0] <= c[-1] <= searches[c[:-1]][1])
+
+    def _run_frontier(self):
+        """frontier algorithm traces the boundary between designs with and without deficit,
+        assuming deficits do not increase when any DER capacity increases:
+        along each line of the levels of the last DER type it searches for the lowest level without deficit,
+        starting from the lowest such level of the lines with one more level of another DER type,
+        since lower levels on this line have deficits too; designs whose deficit is implied are not simulated,
+        nor are levels whose deficit the prescreen proves, except lowest levels without deficit for their results"""
+        self._generate_levels(self.num_levels)
+        num_levels = self.num_levels
+        lines = sorted(product(range(num_levels), repeat=len(self.der_types)-1), reverse=True)
+        thresholds = dict() # lowest level index without deficit by line, num_levels if none
+        searches = dict() # [lowest index that may be without deficit, lowest index known without deficit, step] by line
+        wavefronts = dict() # a line's neighbors with one more level are all in the preceding wavefront
+        for line in lines:
+            wavefronts.setdefault(sum(line), []).append(line)
+        results = dict()
+        for index_sum in sorted(wavefronts.keys(), reverse=True):
+            self._set_phase("frontier search of level index sum {0}".format(index_sum))
+            for line in wavefronts[index_sum]:
+                lowest = 0
+                for i in range(len(line)):
+                    neighbor = list(line)
+                    neighbor[i] = neighbor[i] + 1
+                    if tuple(neighbor) in thresholds: lowest = max(lowest, thresholds[tuple(neighbor)])
+                searches[line] = [lowest, num_levels, 1]
+            self._prescreen_lines(searches, [line for line in wavefronts[index_sum] if searches[line][0] < num_levels])
+            active = [line for line in wavefronts[index_sum] if searches[line][0] < searches[line][1]]
+            while len(active) > 0:
+                probes = []
+                for line in active:
+                    lowest, highest, step = searches[line]
+                    if highest == num_levels: # search up from lowest in growing steps until a level has no deficit
+                        probes.append(line+(min(lowest+step-1, num_levels-1),))
+                        searches[line][2] = 2*step
+                    else: # bisect
+                        probes.append(line+((lowest+highest)//2,))
+                for combination, result in zip(probes, self._simulate_batch([self._design(c) for c in probes])):
+                    results[combination] = result
+                    if result.has_deficit(): searches[combination[:-1]][0] = combination[-1]+1
+                    else: searches[combination[:-1]][1] = combination[-1]
+                active = [line for line in active if searches[line][0] < searches[line][1]]
+            for line in wavefronts[index_sum]:
+                thresholds[line] = searches[line][1]
+        proven = [line+(threshold,) for line, threshold in thresholds.items()
+                  if threshold < num_levels and line+(threshold,) not in results]
+        for combination, result in zip(proven, self._simulate_batch([self._design(c) for c in proven])):
+            results[combination] = result
+        for combination in sorted(results.keys(), reverse=True):
+            self._add_result(results[combination])
+        for result in list(self.results.values()):
+            if not result.is_dominated(): result.set_dominated_by(self._index)
+        num_designs = len(set(self._design(combination).get_name() \
+                              for combination in product(range(num_levels), repeat=len(self.der_types))))
+        self.simulations_skipped = num_designs - len(self.results) - len(self.infeasible)
+        print("frontier search simulated {0} of {1} designs, skipped {2} ({3} proven by the prescreen)".format(
+            len(self.results) + len(self.infeasible), num_designs, self.simulations_skipped, self.simulations_prescreened), flush=True)
+
+    def _run_surrogate(self):
+        """surrogate algorithm fits a radial basis surrogate of deficit and excess percentages
+        to the designs simulated so far and simulates the designs it predicts near the frontier
+        between designs with and without deficit (least excess first), then fits it again;
+        like the frontier algorithm it assumes deficits do not increase when any DER capacity increases,
+        so designs above a simulated design without deficit or below one with deficit are not simulated.
+        It stops when no design is predicted near the frontier or after simulating _SURROGATE_MAX_FRACTION
+        of the designs; results are all simulated"""
+        self._generate_levels(self.num_levels)
+        num_levels = self.num_levels
+        combinations = numpy.array(sorted(product(range(num_levels), repeat=len(self.der_types)), reverse=True))
+        points = combinations / max(num_levels-1, 1)
+        simulated = numpy.zeros(len(combinations), dtype=bool)
+        excluded = numpy.zeros(len(combinations), dtype=bool) # simulated or deficit implied by a simulated design
+        values = numpy.zeros((len(combinations), 2)) # deficit and excess percentages of simulated designs
+        names = dict() # results by design name, as levels may round to the same ratings
+        rng = numpy.random.default_rng(0)
+        corners = numpy.all((combinations == 0) | (combinations == num_levels-1), axis=1)
+        batch = list(numpy.flatnonzero(corners)) + list(rng.choice(
+            len(combinations), min(len(combinations), _SURROGATE_INITIAL_DESIGNS*len(self.der_types)), replace=False))
+        budget = max(int(_SURROGATE_MAX_FRACTION*len(combinations)), len(batch))
+        rounds = 0
+        while len(batch) > 0:
+            rounds += 1
+            self._set_phase("surrogate search round {0}".format(rounds))
+            batch = numpy.array([i for i in dict.fromkeys(batch) if not simulated[i]])
+            designs = [self._design(tuple(combinations[i])) for i in batch]
+            to_simulate = [d for d in dict((d.get_name(), d) for d in designs).values() if d.get_name() not in names]
+            for result in self._simulate_batch(to_simulate): names[result.get_name()] = result
+            values[batch] = [[names[d.get_name()].deficit_percentage, names[d.get_name()].excess_percentage] for d in designs]
+            simulated[batch] = True
+            excluded[batch] = True
+            if len(names) >= budget: break
+            remaining = numpy.flatnonzero(~excluded)
+            without_deficit = combinations[batch[values[batch, 0] == 0.0]]
+            with_deficit = combinations[batch[values[batch, 0] > 0.0]]
+            excluded[remaining] = _covers(combinations[remaining], without_deficit) \
+                | _covers(-combinations[remaining], -with_deficit)
+            candidates = numpy.flatnonzero(~excluded)
+            if len(candidates) == 0: break
+            predictions = RadialBasisSurrogate(points[simulated], values[simulated]).predict(points[candidates])
+            near = predictions[:, 0] <= _SURROGATE_BAND
+            scores = numpy.abs(predictions[near, 0]) + _SURROGATE_EXCESS_WEIGHT*numpy.maximum(predictions[near, 1], 0.0)
+            batch = []
+            for i in candidates[near][numpy.argsort(scores, kind="stable")]:
+                if len(batch) == min(_SURROGATE_BATCH_SIZE, budget-len(names)): break
+                # a design above another of the batch would be dominated if that one has no deficit
+                if len(batch) > 0 and numpy.any(numpy.all(combinations[i] >= combinations[batch], axis=1)): continue
+                batch.append(i)
+        for combination in sorted(map(tuple, combinations[simulated]), reverse=True):
+            self._add_result(names[self._design(combination).get_name()])
+        for result in list(self.results.values()):
+            if not result.is_dominated(): result.set_dominated_by(self._index)
+        print("surrogate search simulated {0} of {1} designs in {2} rounds".format(
+            len(self.results), len(set(self._design(tuple(c)).get_name() for c in combinations)), rounds), flush=True)
+
+    def _run_multifidelity(self):
+        """multifidelity algorithm simulates every design on a timeline coarsened to coarse_step,
+        then simulates on the full timeline the designs next to a design with the other coarse verdict
+        (with or without deficit), i.e. near the coarse frontier; where the verdicts differ,
+        it follows the full timeline frontier to the next designs up (with deficit) or down (without deficit).
+        Results are all simulated on the full timeline; fidelity_report compares the verdicts"""
+        self._generate_levels(self.num_levels)
+        num_levels = self.num_levels
+        combinations = sorted(product(range(num_levels), repeat=len(self.der_types)), reverse=True)
+        coarse_sim = self.core_sim.coarsened(self.coarse_step, self.coarse_load)
+        designs = dict((self._design(c).get_name(), self._design(c)) for c in combinations)
+        coarse_deficits = dict() # whether the design has a deficit on the coarse timeline by design name
+        self._set_phase("coarse screen")
+        coarse_start = time.perf_counter()
+        to_simulate = list(designs.values())
+        for i in range(0, len(to_simulate), _MAX_BATCH_SIZE):
+            chunk = to_simulate[i:i+_MAX_BATCH_SIZE]
+            random.seed(0)
+            for design, metrics in zip(chunk, coarse_sim.der_sizing_run_batch(self.energy_resources, chunk, stop_at_deficit=True)):
+                coarse_deficits[design.get_name()] = isinstance(metrics, InfeasibleRun) # the screen only needs verdicts
+        coarse_time = time.perf_counter() - coarse_start
+        coarse_without_deficit = { c:not coarse_deficits[self._design(c).get_name()] for c in combinations }
+        def neighbors(combination, steps):
+            for i in range(len(combination)):
+                for step in steps:
+                    if 0 <= combination[i]+step < num_levels:
+                        yield combination[:i] + (combination[i]+step,) + combination[i+1:]
+        to_refine = set(c for c in combinations
+                        if any(coarse_without_deficit[n] != coarse_without_deficit[c] for n in neighbors(c, [-1, 1])))
+        results = dict()
+        self._set_phase("full timeline refinement")
+        fine_start = time.perf_counter()
+        while len(to_refine) > 0:
+            batch = sorted(to_refine, reverse=True)
+            to_refine = set()
+            for combination, result in zip(batch, self._simulate_batch([self._design(c) for c in batch])):
+                results[combination] = result
+                if (not result.has_deficit()) != coarse_without_deficit[combination]:
+                    to_refine.update(n for n in neighbors(combination, [1] if result.has_deficit() else [-1])
+                                     if n not in results)
+        fine_time = time.perf_counter() - fine_start
+        for combination in sorted(results.keys(), reverse=True):
+            self._add_result(results[combination])
         for result in list(self.results.values()):
-            if not result.is_dominated(): result.set_dominated_by(self.results)
+            if not result.is_dominated(): result.set_dominated_by(self._index)
+        verdicts = dict((result.get_name(), (coarse_without_deficit[c], not result.has_deficit()))
+                        for c, result in results.items()).values()
+        self.fidelity_report = {
+            "coarse_timesteps": len(coarse_sim.timesteps),
+            "full_timesteps": len(self.core_sim.timesteps),
+            "screened": len(coarse_deficits),
+            "refined": len(self.results) + len(self.infeasible),
+            "agreed": sum(1 for coarse, fine in verdicts if coarse == fine),
+            "without_deficit_only_coarse": sum(1 for coarse, fine in verdicts if coarse and not fine),
+            "with_deficit_only_coarse": sum(1 for coarse, fine in verdicts if fine and not coarse),
+            "coarse_seconds_per_design": coarse_time / max(len(coarse_deficits), 1),
+            "full_seconds_per_design": fine_time / max(len(self.results) + len(self.infeasible), 1),
+        }
+        print(("multifidelity search screened {screened} designs on {coarse_timesteps} of {full_timesteps} timesteps"
+               " ({coarse_seconds_per_design:.2e}s per design) and simulated {refined} of them on the full timeline"
+               " ({full_seconds_per_design:.2e}s per design)").format(**self.fidelity_report), flush=True)
+        print(("coarse and full timeline verdicts agreed for {agreed} of {refined} designs; {without_deficit_only_coarse}"
+               " were without deficit and {with_deficit_only_coarse} with deficit only on the coarse timeline")
+              .format(**self.fidelity_report), flush=True)
 
     def _map_to_finer_grid(self):
         """map results to closest values in levels"""
@@ -264,51 +878,64 @@ class Sizing(object):
                     for result in self.results.values() ]
         self._run_designs(designs)
 
-    def _run_heuristic(self):
+    def _run_heuristic(self, shard=None):
         """heuristic algorithm first performs an exact search on a small instance size,
         then maps the solutions identified to a finer grid specified by the input number of levels,
-        performs a binary search for designs followed by a linear search to refine those designs"""
+        performs a binary search for designs followed by a linear search to refine those designs;
+        shard (index, count) starts the binary search only from every count-th mapped design from index"""
         if self.num_levels <= 6: raise ValueError("num_levels must be at least 6 to run heuristic")
         print("starting exact search",datetime.datetime.now().time().strftime("%H:%M:%S"), flush=True)
         self._run_exact(num_levels=6)
         self._generate_levels(self.num_levels)
+        self._set_phase("mapping to finer grid")
         self._map_to_finer_grid()
         print("starting binary search",datetime.datetime.now().time().strftime("%H:%M:%S"), flush=True)
-        for result in list(self.results.values()):
+        self._set_phase("binary search")
+        starting_results = list(self.results.values())
+        if shard is not None: starting_results = starting_results[shard[0]::shard[1]]
+        for result in starting_results:
             for i in range(0,len(self.der_types)):
                 down_flag = result.deficit_percentage == 0.0
                 current_result = result
                 for der_type in randomize_order(self.der_types, i):
                     step_size = int(2 ** math.floor(math.log2(len(self.levels[der_type]))))
                     while (step_size >= 1):
+                        if current_result.generate_alternative_design(down_flag, der_type, int(step_size)) is not None:
+                            self._prefetch_line(current_result.design, down_flag, der_type, int(step_size))
                         new_result = current_result
                         while (new_result is not None):
                             current_result = new_result
                             design = current_result.generate_alternative_design(down_flag, der_type, int(step_size))
                             new_result = self._analyze_design(design, current_result, None)
                             if new_result is not None: 
-                                self.results[new_result.get_name()] = new_result
+                                self._add_result(new_result)
                                 if new_result.deficit_percentage > current_result.deficit_percentage: break
                             else:
                                 if (not down_flag) and (current_result.deficit_percentage == 0.0) : down_flag = True
                         step_size = step_size / 2
         for result in list(self.results.values()):
-            if not result.is_dominated(): result.set_dominated_by(self.results)
+            if not result.is_dominated(): result.set_dominated_by(self._index)
+        self._prefetched = dict()
         print("finished binary search",datetime.datetime.now().time().strftime("%H:%M:%S"), flush=True)
+        self._set_phase("linear search")
         non_dominated = self._filter_non_dominated(deficit_percentage=0.0)
+        non_dominated_index = DominanceIndex(self.der_types, non_dominated.values())
         for result in list(non_dominated.values()):
             current_result = result
             for i in range(len(self.der_types)):
                 for der_type in self.der_types:
+                    if current_result.generate_alternative_design(True, der_type, 1) is not None:
+                        self._prefetch_line(current_result.design, True, der_type, 1, non_dominated_index)
                     while(True):
                         design = current_result.generate_alternative_design(True, der_type, 1)
-                        new_result = self._analyze_design(design, current_result, non_dominated)
+                        new_result = self._analyze_design(design, current_result, non_dominated_index)
                         if new_result is None: break
-                        self.results[new_result.get_name()] = new_result
+                        self._add_result(new_result)
                         if new_result.deficit_percentage > 0.0: break
                         current_result = new_result
+        self._prefetched = dict()
         for result in list(self.results.values()):
-            if not result.is_dominated(): result.set_dominated_by(self.results)
+            if not result.is_dominated(): result.set_dominated_by(self._index)
         print("finished linear search",datetime.datetime.now().time().strftime("%H:%M:%S"), flush=True)
 
     def results_to_csv(self, results_dir=None, debug=False):
@@ -326,24 +953,131 @@ class Sizing(object):
         return results_csv
     
     def results_to_database(self, id):
-        """Writes the results to the database"""
-        database_sizing.grid_designs_remove(id)
-        for result in self.results.values():
-            result.to_database(id)
+        """Writes the results to the database in one transaction, replacing those of previous runs"""
+        start = time.perf_counter()
+        database_sizing.grid_designs_add(id, [result.database_record() for result in self.results.values()], replace=True)
+        print("wrote {0} results to the database in {1:.2f}s".format(len(self.results), time.perf_counter()-start), flush=True)
+
+    def results_to_shard(self, shard_dir, algorithm, shard_index, num_shards):
+        """Writes the results with their simulation metrics to the file of the input shard in shard_dir"""
+        os.makedirs(shard_dir, exist_ok=True)
+        shard = {
+            "algorithm": algorithm,
+            "num_levels": self.num_levels,
+            "der_types": self.der_types,
+            "shard_index": shard_index,
+            "num_shards": num_shards,
+            "context_key": self._design_cache_key,
+            "results": [{"design":result.design, "fields":result.fields()} for result in self.results.values()],
+        }
+        path = os.path.join(shard_dir, _SHARD_FILENAME.format(shard_index))
+        with open(path+".tmp", "w") as f:
+            json.dump(shard, f)
+        os.replace(path+".tmp", path) # a merge never reads a partially written shard
+
+    def _load_shards(self, shard_dir, algorithm, num_shards):
+        """Reads the results of all shards of the input algorithm in shard_dir for run to use instead of simulating"""
+        for shard_index in range(num_shards):
+            path = os.path.join(shard_dir, _SHARD_FILENAME.format(shard_index))
+            if not os.path.isfile(path):
+                raise ValueError("Sizing shard {0} of {1} missing from {2}".format(shard_index, num_shards, shard_dir))
+            with open(path, "r") as f:
+                shard = json.load(f)
+            if shard["algorithm"] != algorithm or shard["num_levels"] != self.num_levels \
+                or shard["der_types"] != self.der_types or shard["num_shards"] != num_shards \
+                or shard.get("context_key") != self._design_cache_key:
+                raise ValueError("Sizing shard {0} in {1} was computed with different parameters".format(shard_index, shard_dir))
+            for entry in shard["results"]:
+                self._known[Design(entry["design"]).get_name()] = entry["fields"]
+
+    def _check_feasibility_only(self, algorithm):
+        """Raises ValueError if feasibility_only is set and the input algorithm needs deficits of designs with them"""
+        if self.feasibility_only and algorithm not in _FEASIBILITY_ONLY_ALGORITHMS:
+            raise ValueError("Sizing algorithm cannot run with feasibility_only: "+str(algorithm))
 
-    def run(self, algorithm, results_dir=None, database_id=None, debug=False):
-        """Runs the input algorithm and writes the results to a file or database"""
+    def run_shard(self, algorithm, shard_index, num_shards, shard_dir):
+        """Runs the part of the input algorithm assigned to shard shard_index of num_shards
+        and writes the results it simulated to shard_dir;
+        run with the same shard_dir then merges the shards into the results of the full algorithm"""
+        if algorithm not in _SHARDED_ALGORITHMS:
+            raise ValueError("Sizing algorithm cannot be sharded: "+str(algorithm))
+        if int(num_shards) != num_shards or num_shards < 1 or shard_index not in range(num_shards):
+            raise ValueError("Sizing shard index must be in [0, num_shards)")
+        self._check_feasibility_only(algorithm)
+        print("running "+algorithm+" shard "+str(shard_index)+" of "+str(num_shards), flush=True)
+        completed = False
+        try:
+            getattr(self, "_run_"+algorithm)(shard=(shard_index, num_shards))
+            completed = True
+        finally:
+            self._close_pool(terminate=not completed)
+            self._flush_design_cache()
+        self.results_to_shard(shard_dir, algorithm, shard_index, num_shards)
+
+    def run(self, algorithm, results_dir=None, database_id=None, debug=False, shard_dir=None, num_shards=1, resume=False):
+        """Runs the input algorithm and writes the results to a file or database;
+        with shard_dir, designs simulated by the num_shards shards of run_shard are not simulated again,
+        and the algorithm replays over them so the results match an unsharded run;
+        with resume, so are designs in the checkpoint_file of an interrupted run, which continues where it stopped;
+        with database_id, the partial front is published as the algorithm runs (see publish);
+        once time_budget has passed, the results are the non-dominated designs simulated so far"""
+        self._check_feasibility_only(algorithm)
         print("running "+algorithm, flush=True)
+        if shard_dir is not None: self._load_shards(shard_dir, algorithm, num_shards)
+        if resume and self.checkpoint_file is not None:
+            state = self._load_checkpoint(algorithm)
+            if state is not None:
+                print("resuming from {0} design evaluations checkpointed in phase {1}".format(
+                    len(state["evaluations"]), state["phase"]), flush=True)
+        self._algorithm = algorithm
+        self._phase = algorithm
+        self._database_id = database_id
+        self._run_start = time.monotonic()
+        if database_id is not None or self.time_budget is not None: self._front = dict()
+        self.publish()
         algorithm = str("_run_"+str(algorithm))
         if hasattr(self, algorithm) and callable(getattr(self, algorithm)):
             function_to_call = getattr(self, algorithm)  
-            function_to_call()
+            completed = False
+            try:
+                function_to_call()
+                completed = True
+            except _TimeBudgetExceeded:
+                self._stop_at_time_budget()
+                completed = True
+            finally:
+                # checkpoint first: a job terminated at its time limit is killed soon after
+                if self.checkpoint_file is not None: self.checkpoint()
+                self._close_pool(terminate=not completed)
+                self._flush_design_cache()
         else:
             print(algorithm+" not found or not callable", flush=True)
             exit()
+        if self.feasibility_only:
+            print("{0} designs with deficits are left out of the results".format(len(self.infeasible)), flush=True)
         if results_dir is not None: self.results_to_csv(results_dir, debug)
         if database_id is not None:
             self.results_to_database(database_id)
+            self.publish("stopped" if self._stopped else "finished")
+
+class _TimeBudgetExceeded(Exception):
+    """Raised when the time budget of a sizing run has passed"""
+
+def _simulate_in_worker(designs):
+    """Simulates the input designs in a worker process with its copy of the Sizing object
+    and returns their Result constructor arguments"""
+    random.seed(0)
+    return [_WORKER_SIZING._metrics_fields(metrics) for metrics in _WORKER_SIZING._simulate_metrics(designs)]
+
+def _covers(points, minima):
+    """Returns array of flags by input point, set if every coordinate of the point is at least
+    the coordinate of one of the input minima"""
+    covered = numpy.zeros(len(points), dtype=bool)
+    if len(minima) == 0: return covered
+    for i in range(0, len(points), _MAX_BATCH_SIZE):
+        covered[i:i+_MAX_BATCH_SIZE] = numpy.any(numpy.all(
+            points[i:i+_MAX_BATCH_SIZE, numpy.newaxis, :] >= minima[numpy.newaxis, :, :], axis=2), axis=1)
+    return covered
 
 def update_results(results, result):
     """Updates the results with the input result"""
@@ -0,0 +1,49 @@
+import numpy
+
+"""
+Bounds classifying sizing designs as with or without deficit without simulating them
+
+A design is without deficit if its renewables and diesel generator cover the load at every timestep
+and the diesel generator has fuel to run at its power rating over the whole horizon (or renewables alone cover it):
+every energy management system then meets the load with them (or with the battery when it can).
+A design has a deficit if, at some timestep, the load exceeds renewables, diesel and battery power combined,
+or if, over some window of timesteps, the load not covered by renewables and diesel at full power
+exceeds the battery's usable energy plus everything renewables and diesel could have charged it with.
+Both bounds are monotone in every rating, as the frontier algorithm assumes of deficits.
+"""
+
+PROVEN_WITH_DEFICIT = -1
+UNKNOWN = 0
+PROVEN_WITHOUT_DEFICIT = 1
+_RELATIVE_TOLERANCE = 10**-6 # margin relative to peak load so rounding never decides a verdict
+
+def feasibility_verdicts(load, durations, renewable_power, diesel_power, battery_energy, battery_power, battery_min_soc=0.0,
+                         diesel_hours=None):
+    """Returns array of verdicts by design (PROVEN_WITH_DEFICIT, UNKNOWN or PROVEN_WITHOUT_DEFICIT)
+
+    Keyword arguments:
+    load                    array of power load by timestep
+    durations               array of timestep durations (hours)
+    renewable_power         array of renewable power by design and timestep
+    diesel_power            array of diesel generator power rating by design
+    battery_energy          array of battery energy rating by design
+    battery_power           array of battery discharge power rating by design
+    battery_min_soc         min state of charge of the battery
+    diesel_hours            array by design of hours the diesel generator can run at its power rating
+                            on the fuel available, None if fuel is unlimited
+    """
+    tolerance = _RELATIVE_TOLERANCE * (1.0 + numpy.max(numpy.abs(load)))
+    shortfall = load[numpy.newaxis, :] - renewable_power - diesel_power[:, numpy.newaxis]
+    firm_diesel_power = diesel_power if diesel_hours is None else numpy.where(diesel_hours >= numpy.sum(durations), diesel_power, 0.0)
+    without_deficit = numpy.all(load[numpy.newaxis, :] - renewable_power - firm_diesel_power[:, numpy.newaxis] <= -tolerance, axis=1)
+    with_deficit = numpy.any(shortfall - battery_power[:, numpy.newaxis] > tolerance, axis=1)
+    cumulative = numpy.concatenate([
+        numpy.zeros((shortfall.shape[0], 1)),
+        numpy.cumsum(shortfall * durations[numpy.newaxis, :], axis=1),
+    ], axis=1)
+    window_shortfall = numpy.max(cumulative - numpy.minimum.accumulate(cumulative, axis=1), axis=1)
+    with_deficit |= window_shortfall > battery_energy * (1.0 - battery_min_soc) + tolerance * numpy.sum(durations)
+    verdicts = numpy.full(shortfall.shape[0], UNKNOWN)
+    verdicts[with_deficit] = PROVEN_WITH_DEFICIT
+    verdicts[without_deficit] = PROVEN_WITHOUT_DEFICIT
+    return verdicts
@@ -0,0 +1,62 @@
+import numpy
+
+"""
+Radial basis function surrogate of simulation metrics over sizing designs
+
+Interpolates values at simulated designs with a cubic kernel plus a linear polynomial tail,
+so predictions between simulated designs cost a distance computation instead of a simulation.
+Coordinates are expected scaled to comparable ranges (e.g. level index / (num_levels - 1)).
+"""
+
+_PREDICT_CHUNK_SIZE = 4096 # points predicted together, bounding the size of distance matrices
+
+def _kernel(distances):
+    return distances**3
+
+def _distances(points, centers):
+    """Returns matrix of euclidean distances between the input points and centers"""
+    squared = numpy.sum(points**2, axis=1)[:, numpy.newaxis] + numpy.sum(centers**2, axis=1)[numpy.newaxis, :] \
+        - 2.0 * (points @ centers.T)
+    return numpy.sqrt(numpy.maximum(squared, 0.0))
+
+def _tail(points):
+    return numpy.hstack([numpy.ones((points.shape[0], 1)), points])
+
+class RadialBasisSurrogate(object):
+
+    def __init__(self, points, values):
+        """RadialBasisSurrogate constructor __init__, fits the interpolant
+
+        Keyword arguments:
+        points                  array of coordinates by simulated design
+        values                  array of values by simulated design, one column per metric
+        """
+        self._centers = numpy.asarray(points, dtype=float)
+        values = numpy.asarray(values, dtype=float)
+        num_centers, num_dims = self._centers.shape
+        tail = _tail(self._centers)
+        system = numpy.zeros((num_centers+num_dims+1, num_centers+num_dims+1))
+        system[:num_centers, :num_centers] = _kernel(_distances(self._centers, self._centers))
+        system[:num_centers, num_centers:] = tail
+        system[num_centers:, :num_centers] = tail.T
+        right_hand_side = numpy.zeros((num_centers+num_dims+1, values.shape[1]))
+        right_hand_side[:num_centers] = values
+        # centers too few or aligned to determine the polynomial tail make the system singular,
+        # which solve does not always detect in floating point
+        try:
+            if numpy.linalg.matrix_rank(tail) < num_dims+1: raise numpy.linalg.LinAlgError("Singular matrix")
+            coefficients = numpy.linalg.solve(system, right_hand_side)
+        except numpy.linalg.LinAlgError:
+            coefficients = numpy.linalg.lstsq(system, right_hand_side, rcond=None)[0]
+        self._weights = coefficients[:num_centers]
+        self._tail_coefficients = coefficients[num_centers:]
+
+    def predict(self, points):
+        """Returns array of predicted values by input point, one column per metric"""
+        points = numpy.asarray(points, dtype=float)
+        predictions = numpy.zeros((points.shape[0], self._weights.shape[1]))
+        for i in range(0, points.shape[0], _PREDICT_CHUNK_SIZE):
+            chunk = points[i:i+_PREDICT_CHUNK_SIZE]
+            predictions[i:i+_PREDICT_CHUNK_SIZE] = _kernel(_distances(chunk, self._centers)) @ self._weights \
+                + _tail(chunk) @ self._tail_coefficients
+        return predictions
@@ -1,29 +1,51 @@
 import src.data.mysql.weather as database_weather
 import src.data.mysql.locations as database_locations
+import numpy
 import pandas
-from datetime import timedelta
 
 _YEAR_PLACEHOLDER = 1904 # must be a leap year or February 29th records will trigger errors
+_YEAR_START = numpy.datetime64(str(_YEAR_PLACEHOLDER)+"-01-01", "m")
+_YEAR_END = numpy.datetime64(str(_YEAR_PLACEHOLDER+1)+"-01-01", "m")
+_FEBRUARY_29 = numpy.datetime64(str(_YEAR_PLACEHOLDER)+"-02-29", "m")
+_MARCH_1 = numpy.datetime64(str(_YEAR_PLACEHOLDER)+"-03-01", "m")
+
+"""WeatherSample attribute names by weather table column name"""
+_SAMPLE_ATTRIBUTES = {
+    "temperature":"temperature",
+    "ghi":"global_horizontal_irradiance",
+    "dhi":"diffuse_horizontal_irradiance",
+    "dni":"direct_normal_irradiance",
+    "solarZenithAngle":"solar_zenith_angle",
+    "surfaceAlbedo":"surface_albedo",
+    "pressure":"pressure",
+    "windSpeed":"wind_speed",
+}
+
+def _column_view(column):
+    """Property reading a column of the sample's conditions at the sample's index"""
+    return property(lambda self: self._conditions[column][self._index])
 
 class WeatherSample(object):
 
-    def __init__(self, parent, dataframe_row):
+    def __init__(self, parent, conditions, index):
         """Weather sample constructor __init__
-        Do not store parent because it would cause memory issues"""
+        View of one entry of conditions resolved by Weather
+        Do not store parent because it would cause memory issues
+
+        Keyword arguments:
+        parent                  Weather object with location metadata
+        conditions              dictionary of arrays by weather table column name
+        index                   index of the sample in the arrays
+        """
         self.latitude = parent.latitude
         self.longitude = parent.longitude
         self.elevation = parent.elevation
         self.timezone = parent.timezone
-        if dataframe_row.shape[0] != 1:
-            raise Exception("WeatherSample error: dataframe does not have exactly 1 row")
-        self.temperature = dataframe_row["temperature"].values[0]
-        self.global_horizontal_irradiance = dataframe_row["ghi"].values[0]
-        self.diffuse_horizontal_irradiance = dataframe_row["dhi"].values[0]
-        self.direct_normal_irradiance = dataframe_row["dni"].values[0]
-        self.solar_zenith_angle = dataframe_row["solarZenithAngle"].values[0]
-        self.surface_albedo = dataframe_row["surfaceAlbedo"].values[0]
-        self.pressure = dataframe_row["pressure"].values[0]                    
-        self.wind_speed = dataframe_row["windSpeed"].values[0]
+        self._conditions = conditions
+        self._index = index
+
+for _column, _attribute in _SAMPLE_ATTRIBUTES.items():
+    setattr(WeatherSample, _attribute, _column_view(_column))
 
 
 class Weather(object):
@@ -38,8 +60,9 @@ class Weather(object):
         self._location_id = location_id
         self._get_metadata()
         self._sample_method = sample_method
-        self._dataframe = self._initialize()
-        self._current_conditions = dict()
+        self._times = dict() # sorted minutes in _YEAR_PLACEHOLDER by yearOrStat
+        self._values = dict() # arrays by column sorted like self._times by yearOrStat
+        self._loaded_window = None # (start, end) datetimes in _YEAR_PLACEHOLDER of records read; read on first use
         self._cached_samples = dict()
         self.current_sample = None
 
@@ -48,6 +71,12 @@ class Weather(object):
            f'location_id={self._location_id!r},'
            f'deterministic_flag={self._deterministic_flag!r},')
 
+    def location_id(self):
+        return self._location_id
+
+    def sample_method(self):
+        return self._sample_method
+
     def _get_metadata(self):
         """Retrieve metadata or location"""
         metadata = database_locations.get_info(self._location_id)
@@ -56,60 +85,137 @@ class Weather(object):
         self.elevation = metadata["elevation"]
         self.timezone = metadata["timezone"]
 
-    def _initialize(self):
-        """Retrieve data for location and add datetime column for search efficiency"""
-        dataframe = database_weather.read(self._location_id)
+    def _stats(self):
+        """Return list of yearOrStat values needed by the sample method"""
+        if self._sample_method == "mean": return ["mean"]
+        raise ValueError("sample method for Weather undefined: "+self._sample_method)
+
+    def _initialize(self, start=None, end=None):
+        """Retrieve data for location between input datetimes in _YEAR_PLACEHOLDER (whole year if None)
+        and index it by yearOrStat and datetime for search efficiency"""
+        dataframe = database_weather.read(
+            self._location_id,
+            stats = self._stats(),
+            columns = list(_SAMPLE_ATTRIBUTES.keys()),
+            start = None if start is None else (start.month, start.day),
+            end = None if end is None else (end.month, end.day),
+        )
         if dataframe.shape[0] == 0:
             raise Exception("Weather error: no data found for location "+str(self._location_id))
         dataframe["year"] = _YEAR_PLACEHOLDER
-        dataframe["datetime"] = pandas.to_datetime(dataframe[["year", "month", "day", "hour", "minute"]])
-        return dataframe.drop("year", axis=1)
-
-    def _get_current_conditions(self, timeperiod):
-        """Return dataframe rows corresponding to input time period"""
-        if timeperiod in self._current_conditions: return self._current_conditions[timeperiod]
-        start = timeperiod.start().replace(year=_YEAR_PLACEHOLDER, second=0, microsecond=0)
-        end = timeperiod.end().replace(year=_YEAR_PLACEHOLDER, second=0, microsecond=0)
-        while (start.month == 2 and start.day == 29) or (end.month == 2 and end.month == 29):
-            start = start + timedelta(days=1)
-            end = end + timedelta(days=1)
-        if start.minute < 15: start = start.replace(minute=0)
-        if start.minute >= 45: start = (start.replace(minute=0) + timedelta(hours=1)).replace(year=_YEAR_PLACEHOLDER)
-        if start.minute != 0: start = start.replace(minute=30)
-        if end.minute < 15: end = end.replace(minute=0)
-        if end.minute >= 45: end = (end.replace(minute=0) + timedelta(hours=1)).replace(year=_YEAR_PLACEHOLDER)
-        if end.minute != 0: end = end.replace(minute=30)
-        if start <= end: # check required because all years are the same _YEAR_PLACEHOLDER value
-            dataframe = self._dataframe.loc[
-                (self._dataframe["datetime"] >= start) &
-                (self._dataframe["datetime"] <= end)
-            ]
+        times = pandas.to_datetime(dataframe[["year", "month", "day", "hour", "minute"]]).values.astype("datetime64[m]")
+        year_or_stat = dataframe["yearOrStat"].astype(str).values
+        self._times = dict()
+        self._values = dict()
+        for stat in numpy.unique(year_or_stat):
+            rows = numpy.flatnonzero(year_or_stat == stat)
+            rows = rows[numpy.argsort(times[rows], kind="stable")]
+            self._times[stat] = times[rows]
+            self._values[stat] = {
+                column:dataframe[column].values[rows].astype(float) for column in _SAMPLE_ATTRIBUTES.keys()
+            }
+        self._loaded_window = (
+            _YEAR_START if start is None else numpy.datetime64(start, "D").astype("datetime64[m]"),
+            _YEAR_END if end is None else numpy.datetime64(end, "D").astype("datetime64[m]") + numpy.timedelta64(1, "D"),
+        )
+
+    def _load(self, start, end):
+        """Read records covering input arrays of start and end datetimes in _YEAR_PLACEHOLDER:
+        only the days spanned on first use, the whole year if a later request falls outside them"""
+        if self._loaded_window is not None:
+            if start.min() >= self._loaded_window[0] and end.max() < self._loaded_window[1]: return
+            if self._loaded_window == (_YEAR_START, _YEAR_END): return
+            self._initialize()
+        elif numpy.any(start > end):
+            self._initialize()
         else:
-            dataframe = pandas.concat([
-                self._dataframe.loc[
-                    (self._dataframe["datetime"] >= start) &
-                    (self._dataframe["datetime"] < str(_YEAR_PLACEHOLDER+1)+"-01-01")
-                ],
-                self._dataframe.loc[
-                    (self._dataframe["datetime"] >= str(_YEAR_PLACEHOLDER)+"-01-01") &
-                    (self._dataframe["datetime"] <= end)
-                ]
-            ], axis=0)
-        current_conditions = dataframe.groupby(["yearOrStat"])[
-            database_weather.METRIC_COLS_SQL
-        ].agg("mean").reset_index() # if multiple datetimes exist (spacing > 30 mins), combine
-        self._current_conditions[timeperiod] = current_conditions
-        return current_conditions
+            self._initialize(start.min().astype("datetime64[D]").item(), end.max().astype("datetime64[D]").item())
+
+    @staticmethod
+    def _bounds(time_periods):
+        """Return arrays of start and end datetimes in _YEAR_PLACEHOLDER of input time periods
+        rounded to the nearest half hour of the weather records, skipping February 29th"""
+        bounds = []
+        for datetimes in [[tp.start() for tp in time_periods], [tp.end() for tp in time_periods]]:
+            datetimes = numpy.array(datetimes, dtype="datetime64[m]")
+            months = datetimes.astype("datetime64[M]")
+            month_of_year = (months - datetimes.astype("datetime64[Y]")).astype(int)
+            bounds.append(_YEAR_START.astype("datetime64[M]") + month_of_year + (datetimes - months))
+        start, end = bounds
+        february_29 = (start >= _FEBRUARY_29) & (start < _MARCH_1)
+        start = start + february_29 * numpy.timedelta64(1, "D")
+        end = end + february_29 * numpy.timedelta64(1, "D")
+        rounded = []
+        for datetimes in [start, end]:
+            hours = datetimes.astype("datetime64[h]")
+            minutes = (datetimes - hours).astype(int)
+            datetimes = hours + numpy.where(minutes < 15, 0, numpy.where(minutes >= 45, 60, 30)).astype("timedelta64[m]")
+            rounded.append(numpy.where(datetimes >= _YEAR_END, datetimes - (_YEAR_END - _YEAR_START), datetimes))
+        return rounded[0], rounded[1]
+
+    def _conditions(self, stat, time_periods):
+        """Return dictionary of arrays by column of the input stat averaged over the records in each time period,
+        wrapping around the end of the year"""
+        start, end = self._bounds(time_periods)
+        self._load(start, end)
+        if stat not in self._times:
+            raise Exception("Weather error: no "+str(stat)+" records for location "+str(self._location_id))
+        times = self._times[stat]
+        wrap = start > end # all years are the same _YEAR_PLACEHOLDER value
+        first_lo = numpy.searchsorted(times, start, side="left")
+        first_hi = numpy.where(wrap, numpy.searchsorted(times, _YEAR_END, side="left"),
+                               numpy.searchsorted(times, end, side="right"))
+        second_lo = numpy.where(wrap, numpy.searchsorted(times, _YEAR_START, side="left"), 0)
+        second_hi = numpy.where(wrap, numpy.searchsorted(times, end, side="right"), 0)
+        first_count = numpy.maximum(first_hi - first_lo, 0)
+        count = first_count + numpy.maximum(second_hi - second_lo, 0)
+        if numpy.any(count == 0):
+            raise Exception("WeatherSample error: no weather records for time period "
+                            +str(time_periods[numpy.flatnonzero(count == 0)[0]]))
+        conditions = dict()
+        for column, values in self._values[stat].items():
+            # compensated summation in record order, as pandas groupby mean
+            total = numpy.zeros(len(time_periods))
+            compensation = numpy.zeros(len(time_periods))
+            for k in range(count.max()):
+                active = k < count
+                rows = numpy.where(k < first_count, first_lo + k, second_lo + k - first_count)
+                y = numpy.where(active, values[numpy.where(active, rows, 0)], 0.0) - compensation
+                t = total + y
+                c = (t - total) - y
+                compensation = numpy.where(active & ~numpy.isnan(c), c, numpy.where(active, 0.0, compensation))
+                total = numpy.where(active, t, total)
+            conditions[column] = total / count
+        return conditions
+
+    def resolve(self, time_periods):
+        """Generate WeatherSamples of all input time periods in one pass"""
+        stat = self._stats()[0]
+        time_periods = [tp for tp in dict.fromkeys(time_periods) if tp not in self._cached_samples]
+        if len(time_periods) == 0: return
+        conditions = self._conditions(stat, time_periods)
+        for i, timeperiod in enumerate(time_periods):
+            self._cached_samples[timeperiod] = WeatherSample(self, conditions, i)
+
+    def profile(self, time_periods):
+        """Return dictionary of arrays by WeatherSample attribute of the samples of input time periods"""
+        self.resolve(time_periods)
+        samples = [self._cached_samples[timeperiod] for timeperiod in time_periods]
+        return {
+            attribute:numpy.array([sample._conditions[column][sample._index] for sample in samples], dtype=float)
+            for column, attribute in _SAMPLE_ATTRIBUTES.items()
+        }
+
+    def clear_samples(self):
+        """Drop the WeatherSamples resolved so far, e.g. between the chunks of a streaming simulation"""
+        self._cached_samples = dict()
+        self.current_sample = None
 
     def _method_mean(self, timeperiod):
         """Apply 'mean' method for generating weather sample"""
-        if timeperiod in self._cached_samples:
-            return self._cached_samples[timeperiod]
-        current_conditions = self._get_current_conditions(timeperiod)
-        mean_row = current_conditions.loc[current_conditions["yearOrStat"] == "mean"]
-        current_sample = WeatherSample(self, mean_row)
-        self._cached_samples[timeperiod] = current_sample
-        return current_sample
+        if timeperiod not in self._cached_samples:
+            self.resolve([timeperiod])
+        return self._cached_samples[timeperiod]
     
     def update(self, timeperiod):
         """Generate WeatherSample for input time period"""
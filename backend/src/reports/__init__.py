@@ -1 +1 @@
-from .metrics import Metrics
+from .metrics import Metrics, MetricsSummary, MetricsAccumulator, InfeasibleRun, MetricsCsvWriter
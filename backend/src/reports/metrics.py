@@ -1,7 +1,5 @@
 import os
-import csv
-import io
-from src.utils import helpers
+import numpy
 from src.components import defaults
 import src.data.mysql.mysql_microgrid as mysql_microgrid
 
@@ -9,136 +7,301 @@ class Metrics(object):
 
     _EPSILON = 10**-10
 
-    def __init__(self, timesteps):
+    def __init__(self, timesteps, trace):
         """Metrics constructor __init__
+        Arrays by timestep read from the columns of a SimulationTrace; dictionaries are keyed by type
 
         Keyword arguments:
-        timesteps          list of TimeStep objects
+        timesteps          list of TimeStep objects in chronological order
+        trace              SimulationTrace of the grid states of the timesteps
         """
-        self.power, self.deficit = _power(timesteps)
-        self.state_of_charge = _state_of_charge(timesteps)
-        self.power_availability_ratio = _power_availability_ratio(timesteps)
-        self.load_satisfaction_ratio = _load_satisfaction_ratio(timesteps)
-        self._available_power_by_type(timesteps)
-        self._diesel_consumption = _diesel_consumption(timesteps)
-        self._diesel_is_wet_stacking = _diesel_is_wet_stacking(timesteps)
-
-    def _available_power_by_type(self, timesteps):
-        """Available power dictionary"""
-        self.available_power = {}
-        self.excess_power = {}
-        types = _generator_types(timesteps[0])
-        for s in timesteps:
-            self.available_power[s] = {}
-            self.excess_power[s] = {}
-            for t in types:
-                self.available_power[s][t] = s.grid_state().available_power_by_type(t)
-                self.excess_power[s][t] = self.available_power[s][t] - self.power[s][t]
+        self.times = [timestep.time_period().start() for timestep in timesteps]
+        self._time_periods = [timestep.time_period() for timestep in timesteps]
+        self._duration = numpy.array([timestep.time_period().duration() for timestep in timesteps], dtype=float)
+        self._weight = numpy.array([timestep.weight() for timestep in timesteps], dtype=float)
+        load = numpy.array([timestep.power_load() for timestep in timesteps], dtype=float)
+        self.types = trace.types()
+        self.power, self.deficit = _power(load, trace)
+        self.state_of_charge = trace.state_of_charge.copy()
+        self.power_availability_ratio = _power_availability_ratio(trace)
+        self.load_satisfaction_ratio = _load_satisfaction_ratio(load, trace)
+        self.available_power = trace.available_power_by_type()
+        self.excess_power = { t:self.available_power[t] - self.power[t] for t in self.types }
+        self._diesel_consumption = trace.diesel_consumption.copy()
+        self._diesel_is_wet_stacking = trace.diesel_is_wet_stacking.copy()
 
     def summary_stats(self):
         """Percent of powerload by type, including unmet powerload demand; total fuel consumption;
         Total time wet stacking"""
-        timesteps = sorted(list(self.power.keys()), key=lambda s: s.time_period().start())
-        types = list(self.power[timesteps[0]].keys())
-        percent_powerload_energy = "Contribution as a % of Total Energy"
-        total_diesel_gallons = "Diesel (gallons)"
-        total_diesel_wet_stacking_hours = "Diesel Generator Wet Stacking (hours)"
-        total_unmet_power_hours = "Unmet Power (hours)"
-        total_co2_pounds = "CO2 (pounds)"
-        unmet_energy = "Unmet Energy"
-        summary_stats = { 
-            percent_powerload_energy: { t:0.0 for t in types },
-            total_diesel_gallons: 0.0,
-            total_diesel_wet_stacking_hours: 0.0,
-            total_unmet_power_hours: self.deficit_time()
-        }
-        for timestep in timesteps:
-            for t in types:
-                summary_stats[percent_powerload_energy][t] += self.power[timestep][t] * timestep.time_period().duration()
-            summary_stats[total_diesel_gallons] += self._diesel_consumption[timestep]
-            summary_stats[total_diesel_wet_stacking_hours] += self._diesel_is_wet_stacking[timestep] * timestep.time_period().duration()
-        for t in types:
-            if t == defaults.LOAD: continue
-            summary_stats[percent_powerload_energy][t] /= -1 * summary_stats[percent_powerload_energy][defaults.LOAD]
-        summary_stats[percent_powerload_energy][defaults.LOAD] = 0
-        summary_stats[percent_powerload_energy][unmet_energy] = 1 - sum(summary_stats[percent_powerload_energy][t] for t in types)
-        del summary_stats[percent_powerload_energy][defaults.LOAD]
-        summary_stats[total_co2_pounds] = 22.45 * summary_stats[total_diesel_gallons]
-        return summary_stats
+        energy = { t:_total(self.power[t] * self._duration * self._weight) for t in self.power }
+        diesel_gallons = _total(self._diesel_consumption * self._weight)
+        diesel_wet_stacking_hours = _total(self._diesel_is_wet_stacking * self._duration * self._weight)
+        return _summary_stats(energy, diesel_gallons, diesel_wet_stacking_hours, self.deficit_time())
 
     def results_to_csv(self, filename=None, round_output=False):
-        """Write csv file with data formatted to match Microgrid Excel tool"""
-        timesteps = sorted(list(self.power.keys()), key=lambda s: s.time_period().start())
-        types = list(self.power[timesteps[0]].keys())
-        csv = "startDate,midDate,endDate"
-        for type in types:
-            csv += "," + type
-        csv += ",excess,stateOfCharge"
-        if timesteps[0].grid_state(): csv += ",case"
-        csv += "\n"
-        for timestep in timesteps:
-            csv += timestep.time_period().start().strftime(mysql_microgrid.DATETIMEFORMAT) + ","
-            csv += timestep.time_period().mid().strftime(mysql_microgrid.DATETIMEFORMAT) + ","
-            csv += timestep.time_period().end().strftime(mysql_microgrid.DATETIMEFORMAT)
-            excess = 0.0
-            for type in types:
-                csv += "," + str(
-                    round(self.power[timestep][type],3) if round_output else self.power[timestep][type]
-                )
-                excess += self.power[timestep][type]
-            csv += ","+str(
-                round(excess,3) if round_output else excess
-            )+"," + str(self.state_of_charge[timestep])
-            if timestep.grid_state(): csv += ","+str(timestep.grid_state().case())
-            csv += "\n"
+        """Write csv file with data formatted to match Microgrid Excel tool, line by line"""
         if not filename:
-            return csv
+            return "".join(self._csv_lines(round_output))
         if not os.path.exists(os.path.dirname(filename)):
             os.makedirs(os.path.dirname(filename))
         with open(filename, 'w') as f:
-            f.write(csv)
+            f.writelines(self._csv_lines(round_output))
+
+    def _csv_lines(self, round_output=False, header=True):
+        """Generate the lines of results_to_csv, header first if header"""
+        timestamps = self._timestamps()
+        columns = self._columns(round_output)
+        if header: yield ",".join(list(timestamps.keys()) + list(columns.keys())) + "\n"
+        for i in range(len(self._time_periods)):
+            yield ",".join([values[i] for values in timestamps.values()]
+                           + [str(values[i]) for values in columns.values()]) + "\n"
+
+    def _timestamps(self):
+        """Dictionary of lists of formatted start, mid and end datetimes by timestep"""
+        return {
+            "startDate": [time_period.start().strftime(mysql_microgrid.DATETIMEFORMAT) for time_period in self._time_periods],
+            "midDate": [time_period.mid().strftime(mysql_microgrid.DATETIMEFORMAT) for time_period in self._time_periods],
+            "endDate": [time_period.end().strftime(mysql_microgrid.DATETIMEFORMAT) for time_period in self._time_periods],
+        }
+
+    def _columns(self, round_output=False):
+        """Dictionary of lists of values by timestep of power by type (powerload first),
+        excess and state of charge; power and excess are rounded to 3 decimals if round_output"""
+        columns = { type:self.power[type] for type in self.power }
+        excess = 0.0
+        for type in self.power: excess = excess + self.power[type]
+        columns["excess"] = excess
+        if round_output: columns = { name:[round(value, 3) for value in values.tolist()] for name, values in columns.items() }
+        else: columns = { name:values.tolist() for name, values in columns.items() }
+        columns["stateOfCharge"] = self.state_of_charge.tolist()
+        return columns
+
+    def _num_timesteps(self):
+        """Number of time periods the timesteps stand for (see TimeStep.weight)"""
+        return _total(self._weight)
+
+    def _is_deficit(self):
+        return self.deficit < -self._EPSILON
 
     def deficit_time(self):
-        time = 0.0
-        for timestep in self.power:
-            if self.deficit[timestep] < -self._EPSILON:
-                time += timestep.time_period().duration()
-        return time
+        return _total(numpy.where(self._is_deficit(), self._duration * self._weight, 0.0))
 
     def deficit_percentage(self):
-        count = 0
-        for timestep in self.power:
-            if self.deficit[timestep] < -self._EPSILON:
-                count += 1
-        return count / len(self.power)
-    
+        return _total(numpy.where(self._is_deficit(), self._weight, 0.0)) / self._num_timesteps()
+
     def excess_percentage(self):
-        count = 0
-        for timestep in self.power:
-            excess = 0.0
-            for der_type in self.available_power[timestep].keys():
-                excess += self.available_power[timestep][der_type] - self.power[timestep][der_type]
-            if excess > 100 * self._EPSILON:
-                count += 1
-        return count / len(self.power)
-    
+        excess = 0.0
+        for der_type in self.types:
+            excess = excess + (self.available_power[der_type] - self.power[der_type])
+        return _total(numpy.where(excess > 100 * self._EPSILON, self._weight, 0.0)) / self._num_timesteps()
+
     def unused_percentage(self, type):
-        count = 0
-        ratio = 0
-        for timestep in self.available_power:
-            if self.available_power[timestep][type] > 100*self._EPSILON:
-                if self.power[timestep][type] > 100*self._EPSILON: # differentiate battery charging vs. discharging
-                    ratio += (self.available_power[timestep][type] - self.power[timestep][type])/self.available_power[timestep][type]
-                    count += 1
-        time_used_ratio = count / len(self.available_power.keys()) if len(self.available_power.keys()) > 0 else 0
+        available = self.available_power[type]
+        in_use = (available > 100*self._EPSILON) & (self.power[type] > 100*self._EPSILON) # differentiate battery charging vs. discharging
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            ratio = _total(numpy.where(in_use, (available - self.power[type]) / available * self._weight, 0.0))
+        count = _total(numpy.where(in_use, self._weight, 0.0))
+        time_used_ratio = count / self._num_timesteps() if len(self.times) > 0 else 0
         return ratio / count if count > 0 else -1, time_used_ratio
 
+    def output_columns(self):
+        """Columnar output of the csv data rounded as results_to_csv(round_output=True):
+        lists of formatted datetimes by timestep shared by all columns ("startDate", "midDate", "endDate")
+        and a dictionary of lists of values by timestep by column name ("columns")"""
+        output = self._timestamps()
+        output["columns"] = self._columns(round_output=True)
+        return output
+
     def output_to_dict(self):
         """write output to dictionary for frontend display"""
-        csv_data = self.results_to_csv(round_output=True)
-        list_of_dicts = [helpers.float_values(i) for i in list(csv.DictReader(io.StringIO(csv_data)))]
-        return {"output":list_of_dicts, "summary_stats":self.summary_stats()}
+        return {"output":self.output_columns(), "summary_stats":self.summary_stats()}
+
 
+class MetricsCsvWriter(object):
+
+    def __init__(self, filename, round_output=False):
+        """MetricsCsvWriter constructor __init__
+        Csv file of Metrics.results_to_csv written chunk by chunk, e.g. by a streaming simulation,
+        so the rows of a long horizon are never all in memory; creates or empties the file
+
+        Keyword arguments:
+        filename            path of the csv file
+        round_output        round power columns as Metrics.results_to_csv
+        """
+        self._filename = filename
+        self._round_output = round_output
+        self._header = True
+        if not os.path.exists(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+        open(filename, 'w').close()
+
+    def write(self, metrics):
+        """Appends the rows of the input Metrics, which follow those written before in time"""
+        with open(self._filename, 'a') as f:
+            f.writelines(metrics._csv_lines(self._round_output, self._header))
+        self._header = False
+
+
+class MetricsSummary(object):
+
+    def __init__(self, num_timesteps, types, deficit_count, deficit_time, excess_count,
+                 unused_ratio, unused_count, energy, diesel_gallons, diesel_wet_stacking_hours):
+        """MetricsSummary constructor __init__
+        Totals over a simulation horizon that reproduce the statistics of Metrics
+        without storing per-timestep values
+
+        Keyword arguments:
+        num_timesteps               number of timesteps simulated (weighted, see TimeStep.weight)
+        types                       sorted list of generator types
+        deficit_count               number of timesteps with a power deficit (weighted, as are the totals below)
+        deficit_time                duration (hours) of timesteps with a power deficit
+        excess_count                number of timesteps with excess available power
+        unused_ratio                dictionary by type of summed unused power ratios while in use
+        unused_count                dictionary by type of number of timesteps in use
+        energy                      dictionary of energy by type, keyed by powerload followed by types
+        diesel_gallons              total diesel fuel consumed
+        diesel_wet_stacking_hours   total duration of diesel wet stacking
+        """
+        self._num_timesteps = num_timesteps
+        self._types = types
+        self._deficit_count = deficit_count
+        self._deficit_time = deficit_time
+        self._excess_count = excess_count
+        self._unused_ratio = unused_ratio
+        self._unused_count = unused_count
+        self._energy = energy
+        self._diesel_gallons = diesel_gallons
+        self._diesel_wet_stacking_hours = diesel_wet_stacking_hours
+
+    def summary_stats(self):
+        """Same as Metrics.summary_stats"""
+        return _summary_stats({ t:v for t,v in self._energy.items() }, self._diesel_gallons,
+                              self._diesel_wet_stacking_hours, self._deficit_time)
+
+    def deficit_time(self):
+        return self._deficit_time
+
+    def deficit_percentage(self):
+        return self._deficit_count / self._num_timesteps
+
+    def excess_percentage(self):
+        return self._excess_count / self._num_timesteps
+
+    def unused_percentage(self, type):
+        count = self._unused_count[type]
+        time_used_ratio = count / self._num_timesteps if self._num_timesteps > 0 else 0
+        return self._unused_ratio[type] / count if count > 0 else -1, time_used_ratio
+
+
+class MetricsAccumulator(object):
+
+    _EPSILON = Metrics._EPSILON
+
+    def __init__(self):
+        """MetricsAccumulator constructor __init__
+        Totals of the statistics of Metrics updated as each timestep of a simulation completes,
+        in constant memory and with the same arithmetic in the same order as Metrics"""
+        self._types = None
+        self._num_timesteps = 0.0
+        self._deficit_count = 0.0
+        self._deficit_time = 0.0
+        self._excess_count = 0.0
+        self._unused_ratio = None
+        self._unused_count = None
+        self._energy = None
+        self._diesel_gallons = 0.0
+        self._diesel_wet_stacking_hours = 0.0
+
+    def add(self, timestep, grid_state):
+        """Adds the input TimeStep object operated to the input GridState"""
+        if self._types is None:
+            self._types = _generator_types(timestep)
+            self._unused_ratio = { t:0.0 for t in self._types }
+            self._unused_count = { t:0.0 for t in self._types }
+            self._energy = { t:0.0 for t in [defaults.LOAD] + self._types }
+        weight = timestep.weight()
+        duration = timestep.time_period().duration()
+        power_by_type = grid_state.power_supply_by_types()
+        available_by_type = grid_state.available_power_by_types()
+        load = -1 * timestep.power_load()
+        self._num_timesteps += weight
+        self._energy[defaults.LOAD] += load * duration * weight
+        deficit = load
+        excess = 0.0
+        for t in self._types:
+            power = power_by_type.get(t, 0.0)
+            available = available_by_type.get(t, 0.0)
+            deficit += power
+            excess += available - power
+            if available > 100*self._EPSILON and power > 100*self._EPSILON:
+                self._unused_ratio[t] += (available - power) / available * weight
+                self._unused_count[t] += weight
+            self._energy[t] += power * duration * weight
+        if deficit < -self._EPSILON:
+            self._deficit_count += weight
+            self._deficit_time += duration * weight
+        if excess > 100 * self._EPSILON: self._excess_count += weight
+        self._diesel_gallons += grid_state.diesel_consumption() * weight
+        self._diesel_wet_stacking_hours += grid_state.diesel_is_wet_stacking() * duration * weight
+
+    def has_deficit(self):
+        """Checks if any timestep added has a deficit"""
+        return self._deficit_count > 0
+
+    def summary(self):
+        """Returns the MetricsSummary of the timesteps added"""
+        return MetricsSummary(
+            num_timesteps = self._num_timesteps,
+            types = self._types,
+            deficit_count = self._deficit_count,
+            deficit_time = self._deficit_time,
+            excess_count = self._excess_count,
+            unused_ratio = self._unused_ratio,
+            unused_count = self._unused_count,
+            energy = self._energy,
+            diesel_gallons = self._diesel_gallons,
+            diesel_wet_stacking_hours = self._diesel_wet_stacking_hours,
+        )
+
+
+class InfeasibleRun(object):
+
+    def __init__(self, first_deficit_step):
+        """InfeasibleRun constructor __init__
+        Outcome of a simulation stopped at its first deficit timestep, in place of its metrics
+
+        Keyword arguments:
+        first_deficit_step      index of the first timestep with a deficit
+        """
+        self._first_deficit_step = first_deficit_step
+
+    def first_deficit_step(self):
+        return self._first_deficit_step
+
+
+def _summary_stats(energy, diesel_gallons, diesel_wet_stacking_hours, unmet_power_hours):
+    """Summary statistics from energy by type (powerload first), fuel, wet stacking and deficit totals"""
+    types = list(energy.keys())
+    percent_powerload_energy = "Contribution as a % of Total Energy"
+    total_diesel_gallons = "Diesel (gallons)"
+    total_diesel_wet_stacking_hours = "Diesel Generator Wet Stacking (hours)"
+    total_unmet_power_hours = "Unmet Power (hours)"
+    total_co2_pounds = "CO2 (pounds)"
+    unmet_energy = "Unmet Energy"
+    summary_stats = { 
+        percent_powerload_energy: energy,
+        total_diesel_gallons: diesel_gallons,
+        total_diesel_wet_stacking_hours: diesel_wet_stacking_hours,
+        total_unmet_power_hours: unmet_power_hours
+    }
+    for t in types:
+        if t == defaults.LOAD: continue
+        summary_stats[percent_powerload_energy][t] /= -1 * summary_stats[percent_powerload_energy][defaults.LOAD]
+    summary_stats[percent_powerload_energy][defaults.LOAD] = 0
+    summary_stats[percent_powerload_energy][unmet_energy] = 1 - sum(summary_stats[percent_powerload_energy][t] for t in types)
+    del summary_stats[percent_powerload_energy][defaults.LOAD]
+    summary_stats[total_co2_pounds] = 22.45 * summary_stats[total_diesel_gallons]
+    return summary_stats
 
 def _generator_types(timestep):
     """Return list of generator types included in input TimeStep object"""
@@ -147,55 +310,26 @@ def _generator_types(timestep):
         types.add(generator.__class__.__name__)
     return sorted(list(types))
 
-def _power(timesteps):
-    """Power dictionary"""
-    power = {}
-    deficit = {}
-    types = _generator_types(timesteps[0])
-    for timestep in timesteps:
-        power[timestep] = {}
-        power[timestep][defaults.LOAD] = -1 * timestep.power_load()
-        deficit[timestep] = -1 * timestep.power_load()
-        for type in types:
-            power[timestep][type] = timestep.grid_state().power_supply_type(type)
-            deficit[timestep] += power[timestep][type]
-    return power, deficit
+def _total(values):
+    """Sum of an array by timestep added in chronological order, as totals accumulated timestep by timestep"""
+    return numpy.cumsum(values)[-1].item() if len(values) > 0 else 0.0
 
-def _state_of_charge(timesteps):
-    """State of charge dictionary"""
-    state_of_charge = {}
-    for timestep in timesteps:
-        state_of_charge[timestep] = timestep.grid_state().state_of_charge()
-    return state_of_charge
+def _power(load, trace):
+    """Power dictionary of arrays by type, powerload first, and deficit array"""
+    power = { defaults.LOAD:-1 * load }
+    deficit = -1 * load
+    for type, supply in trace.power_supply_by_type().items():
+        power[type] = supply
+        deficit = deficit + supply
+    return power, deficit
 
-def _power_availability_ratio(timesteps):
+def _power_availability_ratio(trace):
     """% of power available relative to non-degraded power"""
-    ratio = {}
-    for timestep in timesteps:
-        if timestep.grid_state().non_degraded_power() > defaults.EPSILON:
-            ratio[timestep] = timestep.grid_state().available_power() \
-                            / timestep.grid_state().non_degraded_power()
-        else:
-            ratio[timestep] = 1.0
-    return ratio
-
-def _load_satisfaction_ratio(timesteps):
-    """% of load met at each time step"""
-    load_satisfaction_ratio = {}
-    for timestep in timesteps:
-        load_satisfaction_ratio[timestep] = timestep.power_supply_ratio()
-    return load_satisfaction_ratio
-
-def _diesel_consumption(timesteps):
-    """Diesel consumption dictionary"""
-    diesel_consumption = {}
-    for timestep in timesteps:
-        diesel_consumption[timestep] = timestep.grid_state().diesel_consumption()
-    return diesel_consumption
-
-def _diesel_is_wet_stacking(timesteps):
-    """Diesel wet stacking status dictionary"""
-    diesel_is_wet_stacking = {}
-    for timestep in timesteps:
-        diesel_is_wet_stacking[timestep] = timestep.grid_state().diesel_is_wet_stacking()
-    return diesel_is_wet_stacking
+    non_degraded_power = trace.total_non_degraded_power()
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        return numpy.where(non_degraded_power > defaults.EPSILON, trace.total_available_power() / non_degraded_power, 1.0)
+
+def _load_satisfaction_ratio(load, trace):
+    """% of load met at each time step (see TimeStep.power_supply_ratio)"""
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        return numpy.where(load > 0.0, numpy.minimum(1.0, trace.total_power_supply() / load), 1.0)
@@ -1,18 +1,21 @@
 class TimeStep(object):
 
-    def __init__(self, time_period, power_load, sun_weight):
+    def __init__(self, time_period, power_load, sun_weight, weight=1.0):
         """TimeStep constructor __init__
 
         Keyword arguments:
         time_period        time period object
         power_load         constant / average power load during time period
         sun_weight         sun weight as a percent of max sun during time period
+        weight             number of time periods of a horizon the time step stands for in metrics
         """
         self._time_period = time_period
         self._power_load = power_load
         self._sun_weight = sun_weight
+        self._weight = weight
         self._online_ratio = None
-        self._grid_state = None
+        self._trace = None # SimulationTrace holding the grid state of the time step
+        self._trace_index = None
 
     def time_period(self):
         return self._time_period
@@ -29,29 +32,37 @@ class TimeStep(object):
     def update_sun_weight(self, sun_weight):
         self._sun_weight = sun_weight
 
+    def weight(self):
+        return self._weight
+
     def set_online_ratio(self, online_ratio):
         self._online_ratio = online_ratio
 
     def online_ratio(self):
         return self._online_ratio
 
-    def set_grid_state(self, grid_state):
-        self._grid_state = grid_state
+    def set_trace(self, trace, index=None):
+        """Sets the SimulationTrace and timestep index of the grid state of the time step (None clears it)"""
+        self._trace = trace
+        self._trace_index = index
 
     def grid_state(self):
-        return self._grid_state
+        """GridState of the time step read from its SimulationTrace, or None"""
+        if self._trace is None: return None
+        return self._trace.grid_state(self._trace_index)
 
     def __repr__(self):
         return (f'{self.__class__.__name__}('
            f'time_period={self._time_period!r},'
            f'power_load={self._power_load!r},'
            f'sun_weight={self._sun_weight!r},'
+           f'weight={self._weight!r},'
            f'online_ratio={self._online_ratio!r},'
-           f'grid_state={self._grid_state!r})')
+           f'grid_state={self.grid_state()!r})')
 
     def power_supply_ratio(self):
         """Percent of load supplied by power generation (capped at 1.0)"""
         ratio = 1.0
         if self._power_load > 0.0:
-            ratio = min(1.0, self._grid_state.power_supply() / self._power_load)
+            ratio = min(1.0, self.grid_state().power_supply() / self._power_load)
         return ratio
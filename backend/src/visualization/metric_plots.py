@@ -16,8 +16,9 @@ class MetricPlots(object):
 
     def power(self, preview=False):
         """Plot power vs. time"""
-        plot = TwoDimensionalPlot.init_by_dict_of_dicts(
-            timestep_key_dict=self._metrics.power
+        plot = TwoDimensionalPlot.init_by_columns(
+            times=self._metrics.times,
+            columns=self._metrics.power,
         )
         plot.construct(
             xlabel="Time",
@@ -28,8 +29,9 @@ class MetricPlots(object):
     
     def available_power(self, preview=False):
         """Plot available power vs. time"""
-        plot = TwoDimensionalPlot.init_by_dict_of_dicts(
-            timestep_key_dict=self._metrics.available_power
+        plot = TwoDimensionalPlot.init_by_columns(
+            times=self._metrics.times,
+            columns=self._metrics.available_power,
         )
         plot.construct(
             xlabel="Time",
@@ -40,8 +42,9 @@ class MetricPlots(object):
 
     def excess_power(self, preview=False):
         """Plot excess power vs. time"""
-        plot = TwoDimensionalPlot.init_by_dict_of_dicts(
-            timestep_key_dict=self._metrics.excess_power
+        plot = TwoDimensionalPlot.init_by_columns(
+            times=self._metrics.times,
+            columns=self._metrics.excess_power,
         )
         plot.construct(
             xlabel="Time",
@@ -52,8 +55,9 @@ class MetricPlots(object):
 
     def state_of_charge(self, preview=False):
         """Plot state of charge vs. time"""
-        plot = TwoDimensionalPlot.init_by_dict(
-            timestep_key_dict=self._metrics.state_of_charge
+        plot = TwoDimensionalPlot.init_by_array(
+            times=self._metrics.times,
+            values=self._metrics.state_of_charge,
         )
         plot.construct(
             xlabel="Time",
@@ -64,8 +68,9 @@ class MetricPlots(object):
 
     def deficit(self, preview=False):
         """Plot deficit vs. time"""
-        plot = TwoDimensionalPlot.init_by_dict(
-            timestep_key_dict=self._metrics.deficit
+        plot = TwoDimensionalPlot.init_by_array(
+            times=self._metrics.times,
+            values=self._metrics.deficit,
         )
         plot.construct(
             xlabel="Time",
@@ -76,8 +81,9 @@ class MetricPlots(object):
 
     def microgrid_performance(self, preview=False):
         """Plot microgrid performance vs. time"""
-        plot = TwoDimensionalPlot.init_by_dict(
-            timestep_key_dict=self._metrics.power_availability_ratio
+        plot = TwoDimensionalPlot.init_by_array(
+            times=self._metrics.times,
+            values=self._metrics.power_availability_ratio,
         )
         plot.construct(
             xlabel="Time",
@@ -88,8 +94,9 @@ class MetricPlots(object):
 
     def load_satisfied(self, preview=False):
         """Plot % of load satisfied vs. time"""
-        plot = TwoDimensionalPlot.init_by_dict(
-            timestep_key_dict=self._metrics.load_satisfaction_ratio
+        plot = TwoDimensionalPlot.init_by_array(
+            times=self._metrics.times,
+            values=self._metrics.load_satisfaction_ratio,
         )
         plot.construct(
             xlabel="Time",
@@ -12,40 +12,26 @@ class TwoDimensionalPlot(object):
         self._y = y
 
     @classmethod
-    def init_by_dict_of_dicts(cls, timestep_key_dict):
-        """TwoDimensionalPlot class method reads dict with timestep key and calls constructor"""
-        df = pd.DataFrame.from_dict(
-            { i.time_period().start():
-                {j:timestep_key_dict[i][j] for j in timestep_key_dict[i].keys()}
-                for i in timestep_key_dict.keys()
-            },
-            orient='index')
+    def init_by_columns(cls, times, columns):
+        """TwoDimensionalPlot class method reads dict of arrays by time and calls constructor"""
+        df = pd.DataFrame(columns, index=times)
         return cls(
             x=df.index,
             y=df,
         )
 
     @classmethod
-    def init_by_dict(cls, timestep_key_dict):
-        """TwoDimensionalPlot class method reads dict with timestep key and calls constructor"""
-        df = pd.DataFrame.from_dict(
-            { i.time_period().start():timestep_key_dict[i]
-                for i in timestep_key_dict.keys()
-            },
-            orient='index')
+    def init_by_array(cls, times, values):
+        """TwoDimensionalPlot class method reads array by time and calls constructor"""
         return cls(
-            x=df.index.values,
-            y=df.iloc[:,0].values,
+            x=pd.Index(times).values,
+            y=pd.Series(values).values,
         )
 
     @classmethod
-    def init_by_dict_for_time(cls, timestep_key_dict, t_start, t_end): #need to add:  t_start, t_end so it will filter on start and stop time within the dataframe
-        """TwoDimensionalPlot class method reads dict with timestep key and calls constructor for a specifc time period"""
-        df = pd.DataFrame.from_dict(
-            { i.time_period().start():timestep_key_dict[i]
-                for i in timestep_key_dict.keys()
-            }, 
-            orient='index')
+    def init_by_array_for_time(cls, times, values, t_start, t_end): #need to add:  t_start, t_end so it will filter on start and stop time within the dataframe
+        """TwoDimensionalPlot class method reads array by time and calls constructor for a specifc time period"""
+        df = pd.DataFrame({"values":values}, index=times)
         if t_start!=-1 and t_end!=-1:
             df=df.loc[t_start:t_end]
         return cls(
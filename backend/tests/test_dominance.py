@@ -0,0 +1,32 @@
+import pytest
+import random
+from src.models.sizing.model import Design, Result
+from src.models.sizing.dominance import DominanceIndex
+
+def _random_result(rng, der_types):
+    """Result with few distinct ratings and deficits, so that ties and duplicate designs are common"""
+    design = Design({ der_type:rng.choice([0, 10, 20, 30]) for der_type in der_types })
+    deficit_percentage = rng.choice([0.0, 0.0, 0.05, 0.1])
+    return Result(None, design, deficit_percentage, 0.0, None, None, None, None)
+
+def test_dominance_index():
+
+    der_types = ["SolarPhotovoltaicPanel", "WindTurbine", "Battery"]
+    rng = random.Random(0)
+    for _ in range(50):
+        results = [ _random_result(rng, der_types) for _ in range(rng.randint(0, 80)) ]
+        index = DominanceIndex(der_types)
+        for result in results: index.add(result)
+
+        # ordered scan over the first result of each design, as results are added to Sizing.results
+        added = dict()
+        for result in results: added.setdefault(result.get_name(), result)
+        scan = list(added.values())
+        assert len(index) == len(scan)
+
+        # test passes if the index returns the result an ordered scan finds first
+        for result in results + [ _random_result(rng, der_types) for _ in range(20) ]:
+            expected = next((other for other in scan if result.is_dominated_by(other)), None)
+            assert index.first_dominator(result) is expected, result.get_name()
+            expected = any(other.dominates_design(result.design) for other in scan)
+            assert index.dominates(result.design) == expected, result.get_name()
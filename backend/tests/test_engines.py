@@ -0,0 +1,34 @@
+import pytest
+from datetime import datetime
+import src.data.mysql.energy_management_systems as database_energy_management_systems
+import run.helpers as run_helpers
+
+def test_engines():
+
+    # parameters for test
+    grid_id = 4 # guest account grid with all component types
+    powerload_id = 1 # guest account power load
+    location_id = 145612 # Monterey, California
+    startdatetime = datetime.strptime("2023-09-01_08:00:00", '%Y-%m-%d_%H:%M:%S')
+    enddatetime = datetime.strptime("2023-09-02_08:00:00", '%Y-%m-%d_%H:%M:%S')
+
+    for energy_management_system in database_energy_management_systems.get():
+        params = {
+            run_helpers.LOAD_ID:powerload_id,
+            run_helpers.GRID_ID:grid_id,
+            run_helpers.LOCATION_ID: location_id,
+            run_helpers.ENERGY_MANAGEMENT_SYSTEM_ID:energy_management_system["id"],
+            run_helpers.STARTDATETIME:startdatetime,
+            run_helpers.ENDDATETIME:enddatetime,
+            run_helpers.WEATHER_SAMPLE_METHOD : "mean",
+        }
+
+        # run each engine on its own simulation object
+        results = dict()
+        for engine in ["object", "array"]:
+            params[run_helpers.ENGINE] = engine
+            sim = run_helpers.initialize_simulation_object(params)
+            results[engine] = sim.run(trace=True).results_to_csv()
+
+        # test passes if both engines write the same per-timestep results
+        assert results["object"] == results["array"], energy_management_system["parameterName"]
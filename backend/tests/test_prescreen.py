@@ -0,0 +1,93 @@
+import pytest
+import sys
+import numpy
+from datetime import datetime
+from itertools import product
+from src.grid import Grid
+from src.models import CoreSimulation, Weather, Sizing
+from src.models.sizing import prescreen
+from src.models.sizing.model import Design
+import src.data.mysql.grids as database_grids
+import src.data.mysql.energy_management_systems as database_energy_management_systems
+
+def _verdict(load, durations, renewable_power, diesel_power, battery_energy, battery_power, battery_min_soc, diesel_hours):
+    """Verdict of one design from the bounds in prescreen, timestep by timestep and window by window"""
+    tolerance = prescreen._RELATIVE_TOLERANCE * (1.0 + max(abs(value) for value in load))
+    firm_diesel_power = diesel_power if diesel_hours >= sum(durations) else 0.0
+    if all(load[t] - renewable_power[t] - firm_diesel_power <= -tolerance for t in range(len(load))):
+        return prescreen.PROVEN_WITHOUT_DEFICIT
+    shortfall = [load[t] - renewable_power[t] - diesel_power for t in range(len(load))]
+    if any(shortfall[t] - battery_power > tolerance for t in range(len(load))):
+        return prescreen.PROVEN_WITH_DEFICIT
+    for first in range(len(load)):
+        for last in range(first, len(load)):
+            energy = sum(shortfall[t] * durations[t] for t in range(first, last+1))
+            if energy > battery_energy * (1.0 - battery_min_soc) + tolerance * sum(durations):
+                return prescreen.PROVEN_WITH_DEFICIT
+    return prescreen.UNKNOWN
+
+def test_feasibility_verdicts():
+
+    rng = numpy.random.default_rng(0)
+    for _ in range(30):
+        # small integer powers and energies, so bounds are often met exactly
+        num_timesteps = int(rng.integers(1, 25))
+        num_designs = int(rng.integers(1, 40))
+        load = rng.integers(0, 10, num_timesteps).astype(float)
+        durations = rng.choice([0.5, 1.0], num_timesteps)
+        renewable_power = rng.integers(0, 8, (num_designs, num_timesteps)).astype(float)
+        diesel_power = rng.integers(0, 6, num_designs).astype(float)
+        battery_energy = rng.integers(0, 20, num_designs).astype(float)
+        battery_power = rng.integers(0, 6, num_designs).astype(float)
+        battery_min_soc = rng.choice([0.0, 0.2])
+        diesel_hours = rng.choice([0.0, numpy.sum(durations), numpy.inf], num_designs)
+
+        verdicts = prescreen.feasibility_verdicts(
+            load = load,
+            durations = durations,
+            renewable_power = renewable_power,
+            diesel_power = diesel_power,
+            battery_energy = battery_energy,
+            battery_power = battery_power,
+            battery_min_soc = battery_min_soc,
+            diesel_hours = diesel_hours,
+        )
+
+        # test passes if every verdict matches the bounds evaluated design by design
+        for i in range(num_designs):
+            assert verdicts[i] == _verdict(load, durations, renewable_power[i], diesel_power[i],
+                                           battery_energy[i], battery_power[i], battery_min_soc, diesel_hours[i]), i
+
+def _simulation(energy_management_system_id, battery):
+    """Simulation of the guest grid with all component types, with or without its battery, over one day"""
+    grid = Grid(diesel_level=sys.float_info.max)
+    components = database_grids.get_components(4, objectFlag=True) # guest account grid with all component types
+    if not battery: components = [component for component in components if component.__class__.__name__ != "Battery"]
+    grid.initialize_components(components)
+    return CoreSimulation(
+        grid = grid,
+        energy_management_system_id = energy_management_system_id,
+        powerload_id = 1, # guest account power load
+        weather = Weather(145612, "mean"), # Monterey, California
+        start_datetime = datetime.strptime("2023-09-01_08:00:00", '%Y-%m-%d_%H:%M:%S'),
+        end_datetime = datetime.strptime("2023-09-02_08:00:00", '%Y-%m-%d_%H:%M:%S'),
+    )
+
+def test_prescreen_simulated():
+
+    for energy_management_system in database_energy_management_systems.get():
+        for battery in [False, True]: # without a battery first, as no sizing has set up battery ratios
+            sim = _simulation(energy_management_system["id"], battery)
+            sizing = Sizing(sim, 5)
+            sizing._generate_levels(5)
+            designs = [ Design(zip(sizing.der_types, ratings))
+                        for ratings in product(*[sizing.levels[der_type] for der_type in sizing.der_types]) ]
+            verdicts = sizing._prescreen(designs)
+            metrics_list = sim.der_sizing_run_batch(sizing.energy_resources, designs)
+
+            # test passes if no proven verdict contradicts the simulated deficit of its design
+            for design, verdict, metrics in zip(designs, verdicts, metrics_list):
+                if verdict == prescreen.PROVEN_WITH_DEFICIT:
+                    assert metrics.deficit_percentage() > 0.0, (energy_management_system["parameterName"], design)
+                elif verdict == prescreen.PROVEN_WITHOUT_DEFICIT:
+                    assert metrics.deficit_percentage() == 0.0, (energy_management_system["parameterName"], design)
@@ -0,0 +1,98 @@
+import pytest
+import sys
+import math
+import numpy
+from datetime import datetime
+from src.grid import Grid
+from src.models import CoreSimulation, Weather, representative_periods
+import src.data.mysql.grids as database_grids
+
+def _argmin(values):
+    """Index of the first lowest value"""
+    return min(range(len(values)), key=lambda i: (values[i], i))
+
+def _k_medoids(features, num_clusters):
+    """k_medoids scanning periods in order, with distances and sums computed one by one"""
+    num_points = len(features)
+    distances = [[math.sqrt(sum((int(a)-int(b))**2 for a, b in zip(features[i], features[j])))
+                  for j in range(num_points)] for i in range(num_points)]
+    medoids = [_argmin([sum(distances[i][j] for i in range(num_points)) for j in range(num_points)])]
+    closest = [distances[i][medoids[0]] for i in range(num_points)]
+    while len(medoids) < num_clusters:
+        costs = [math.inf if j in medoids else sum(min(closest[i], distances[i][j]) for i in range(num_points))
+                 for j in range(num_points)]
+        medoids.append(_argmin(costs))
+        closest = [min(closest[i], distances[i][medoids[-1]]) for i in range(num_points)]
+    medoids = sorted(medoids)
+
+    def assign(medoids):
+        labels = [_argmin([distances[i][medoid] for medoid in medoids]) for i in range(num_points)]
+        for cluster, medoid in enumerate(medoids): labels[medoid] = cluster
+        return labels
+
+    for _ in range(representative_periods._MAX_ITERATIONS):
+        labels = assign(medoids)
+        updated = []
+        for cluster in range(len(medoids)):
+            members = [i for i in range(num_points) if labels[i] == cluster]
+            updated.append(members[_argmin([sum(distances[a][b] for a in members) for b in members])])
+        updated = sorted(updated)
+        if updated == medoids: break
+        medoids = updated
+    return medoids, assign(medoids)
+
+def test_k_medoids():
+
+    rng = numpy.random.default_rng(0)
+    for _ in range(40):
+        # small integer features, so distances are exact square roots and ties and duplicate periods are common
+        num_points = int(rng.integers(1, 30))
+        features = rng.integers(0, 4, (num_points, int(rng.integers(1, 4)))).astype(float)
+        num_clusters = int(rng.integers(1, num_points+1))
+        medoids, labels = representative_periods.k_medoids(features, num_clusters)
+
+        # test passes if medoids and clusters match the scan
+        expected_medoids, expected_labels = _k_medoids(features, num_clusters)
+        assert list(medoids) == expected_medoids
+        assert list(labels) == expected_labels
+
+def test_k_medoids_num_clusters():
+
+    features = numpy.zeros((3, 2))
+    for num_clusters in [0, 4]:
+        with pytest.raises(ValueError):
+            representative_periods.k_medoids(features, num_clusters)
+
+def test_representative():
+
+    # four whole days of the guest grid with all component types
+    num_days = 4
+    grid = Grid(diesel_level=sys.float_info.max)
+    grid.initialize_components(database_grids.get_components(4, objectFlag=True))
+    sim = CoreSimulation(
+        grid = grid,
+        energy_management_system_id = 1, # default energy management system
+        powerload_id = 1, # guest account power load
+        weather = Weather(145612, "mean"), # Monterey, California
+        start_datetime = datetime.strptime("2023-09-01_08:00:00", '%Y-%m-%d_%H:%M:%S'),
+        end_datetime = datetime.strptime("2023-09-05_08:00:00", '%Y-%m-%d_%H:%M:%S'),
+    )
+    sim.run() # the first run leaves diesel generators the refill margin (defaults.EPSILON) later runs start from
+    expected = sim.run()
+    timesteps_per_day = len(sim.timesteps) // num_days
+
+    for num_periods in range(1, num_days+1):
+        representative = sim.representative(num_periods)
+
+        # test passes if the representative periods stand for every day of the timeline
+        weights = [ timestep.weight() for timestep in representative.timesteps[::timesteps_per_day] ]
+        assert len(representative.timesteps) == num_periods * timesteps_per_day
+        assert len(weights) == num_periods
+        assert sum(weights) == num_days
+        assert sum(timestep.weight() for timestep in representative.timesteps) == len(sim.timesteps)
+
+    # and if, with a period for each day, the metrics match the full timeline
+    metrics = sim.representative(num_days).run()
+    assert metrics.deficit_percentage() == expected.deficit_percentage()
+    assert metrics.excess_percentage() == expected.excess_percentage()
+    assert metrics.summary_stats() == expected.summary_stats()
@@ -0,0 +1,42 @@
+import pytest
+from datetime import datetime
+from itertools import product
+import run.helpers as run_helpers
+
+def test_sizing_batch():
+
+    # parameters for test
+    grid_id = 4 # guest account grid with all component types
+    energy_management_system_id = 1 # default energy management system
+    powerload_id = 1 # guest account power load
+    location_id = 145612 # Monterey, California
+    startdatetime = datetime.strptime("2023-09-01_08:00:00", '%Y-%m-%d_%H:%M:%S')
+    enddatetime = datetime.strptime("2023-09-02_08:00:00", '%Y-%m-%d_%H:%M:%S')
+
+    params = {
+        run_helpers.LOAD_ID:powerload_id,
+        run_helpers.GRID_ID:grid_id,
+        run_helpers.LOCATION_ID: location_id,
+        run_helpers.ENERGY_MANAGEMENT_SYSTEM_ID:energy_management_system_id,
+        run_helpers.STARTDATETIME:startdatetime,
+        run_helpers.ENDDATETIME:enddatetime,
+        run_helpers.WEATHER_SAMPLE_METHOD : "mean",
+    }
+    sim = run_helpers.initialize_simulation_object(params)
+
+    # lattice of designs with no, half and one and a half times peak load of each DER type
+    peak_load, energy_resources = sim.der_sizing_initialize()
+    der_types = sorted(energy_resources.keys())
+    ratings = [0, round(0.5*peak_load), round(1.5*peak_load)]
+    designs = [ dict(zip(der_types, design)) for design in product(ratings, repeat=len(der_types)) ]
+
+    # simulate the designs together, then one at a time
+    batch_metrics = sim.der_sizing_run_batch(energy_resources, designs)
+    for design, metrics in zip(designs, batch_metrics):
+        sim.der_sizing_load_design(energy_resources, design)
+        expected = sim.run()
+
+        # test passes if the batch reproduces the metrics of each design
+        assert metrics.deficit_percentage() == expected.deficit_percentage(), design
+        assert metrics.excess_percentage() == expected.excess_percentage(), design
+        assert metrics.summary_stats() == expected.summary_stats(), design
@@ -0,0 +1,37 @@
+import pytest
+import sys
+from datetime import datetime
+from src.grid import Grid
+from src.models import CoreSimulation, Weather, Sizing
+import src.data.mysql.grids as database_grids
+
+def _simulation(battery):
+    """Simulation of the guest grid with all component types, with or without its battery, over one day"""
+    grid = Grid(diesel_level=sys.float_info.max)
+    components = database_grids.get_components(4, objectFlag=True) # guest account grid with all component types
+    if not battery: components = [component for component in components if component.__class__.__name__ != "Battery"]
+    grid.initialize_components(components)
+    return CoreSimulation(
+        grid = grid,
+        energy_management_system_id = 1, # default energy management system
+        powerload_id = 1, # guest account power load
+        weather = Weather(145612, "mean"), # Monterey, California
+        start_datetime = datetime.strptime("2023-09-01_08:00:00", '%Y-%m-%d_%H:%M:%S'),
+        end_datetime = datetime.strptime("2023-09-02_08:00:00", '%Y-%m-%d_%H:%M:%S'),
+    )
+
+def test_sizing_frontier():
+
+    for battery in [False, True]:
+        fronts = dict()
+        for algorithm in ["exact", "frontier"]:
+            sizing = Sizing(_simulation(battery), 5)
+            sizing.run(algorithm)
+            fronts[algorithm] = sizing._filter_non_dominated(0.0)
+        assert len(fronts["exact"]) > 0, battery
+
+        # test passes if every design without deficit on the exhaustive front is matched or bettered on the traced front;
+        # where more capacity can add a deficit, exact prunes designs that frontier may still find
+        for name, result in fronts["exact"].items():
+            assert name in fronts["frontier"] or any(other.dominates_design(result.design) for other in fronts["frontier"].values()), (battery, name)
+        if not battery: assert sorted(fronts["frontier"].keys()) == sorted(fronts["exact"].keys())
@@ -0,0 +1,65 @@
+import pytest
+import numpy
+from src.models.sizing import surrogate
+from src.models.sizing.surrogate import RadialBasisSurrogate
+
+def _fit(points, values):
+    """Weights and polynomial tail coefficients of the cubic interpolant, system built entry by entry"""
+    num_centers, num_dims = points.shape
+    size = num_centers + num_dims + 1
+    system = numpy.zeros((size, size))
+    for i in range(num_centers):
+        for j in range(num_centers):
+            system[i, j] = numpy.linalg.norm(points[i] - points[j])**3
+        row = [1.0] + list(points[i])
+        for k in range(num_dims+1):
+            system[i, num_centers+k] = row[k]
+            system[num_centers+k, i] = row[k]
+    right_hand_side = numpy.zeros((size, values.shape[1]))
+    right_hand_side[:num_centers] = values
+    coefficients = numpy.linalg.solve(system, right_hand_side)
+    return coefficients[:num_centers], coefficients[num_centers:]
+
+def _predict(points, weights, tail_coefficients, point):
+    """Interpolant at one point, summed center by center"""
+    prediction = tail_coefficients[0] + point @ tail_coefficients[1:]
+    for center, weight in zip(points, weights):
+        prediction = prediction + weight * numpy.linalg.norm(point - center)**3
+    return prediction
+
+def test_surrogate(monkeypatch):
+
+    monkeypatch.setattr(surrogate, "_PREDICT_CHUNK_SIZE", 7) # predictions span several chunks
+    rng = numpy.random.default_rng(0)
+    for _ in range(20):
+        # distinct designs of a level lattice, scaled as Sizing scales them
+        num_dims = int(rng.integers(1, 5))
+        num_levels = 5
+        lattice = numpy.array(numpy.meshgrid(*[numpy.arange(num_levels)]*num_dims)).reshape(num_dims, -1).T
+        num_points = int(rng.integers(num_dims+2, min(len(lattice), 30)+1))
+        points = lattice[rng.choice(len(lattice), num_points, replace=False)] / (num_levels-1)
+        values = rng.normal(size=(num_points, 2))
+        model = RadialBasisSurrogate(points, values)
+
+        # test passes if predictions match the interpolant evaluated point by point
+        weights, tail_coefficients = _fit(points, values)
+        queries = numpy.vstack([points, rng.uniform(0.0, 1.0, (25, num_dims))])
+        predictions = model.predict(queries)
+        for query, prediction in zip(queries, predictions):
+            assert prediction == pytest.approx(_predict(points, weights, tail_coefficients, query), abs=1e-8)
+
+        # and the interpolant passes through the simulated designs and reproduces linear metrics
+        assert predictions[:num_points] == pytest.approx(values, abs=1e-8)
+        slope = rng.normal(size=num_dims)
+        linear = RadialBasisSurrogate(points, (1.0 + points @ slope)[:, numpy.newaxis])
+        assert linear.predict(queries)[:, 0] == pytest.approx(1.0 + queries @ slope, abs=1e-8)
+
+def test_surrogate_aligned():
+
+    # centers on a line cannot determine a 2-d polynomial tail: the fit falls back to least squares
+    points = numpy.array([[0.0, 0.0], [0.25, 0.25], [0.5, 0.5], [1.0, 1.0]])
+    values = numpy.array([[0.0], [1.0], [0.0], [2.0]])
+    model = RadialBasisSurrogate(points, values)
+
+    # test passes if the fit still interpolates the simulated designs
+    assert model.predict(points) == pytest.approx(values, abs=1e-8)
@@ -129,17 +129,18 @@ const buildGraphPowerloadApex = (options) => {
 };
 
 
-// Takes data (directly from response of POST /simulate) and builds 3 charts (component, load, charge) using Apex charts
+// Takes data (columnar output from response of POST /simulate metrics: a "columns" array per series
+// and shared "midDate" timestamps) and builds 3 charts (component, load, charge) using Apex charts
 const buildAllApexCharts = (data, componentTypes, filename) => {
   let keys = ["stateOfCharge", "excess", "Powerload"];
   let series = {};
-  let categories = [];
+  let categories = data.midDate;
   let componentTypeDisplayNames = {};
   // Add powerload color first, since powerload is not in componentTypes
   let componentColors = [powerloadGraphLineColor]
 
   // Map component type display name to parameter name
-  Object.keys(data[0]).forEach((key) => {
+  Object.keys(data.columns).forEach((key) => {
     const componentType = Object.values(componentTypes).find(ct => ct.parameterName === key);
     if (componentType) {
       // Add component type parameter names to keys for chart series
@@ -149,23 +150,19 @@ const buildAllApexCharts = (data, componentTypes, filename) => {
     }
   });
 
-  data.forEach((d, i) => {
-    // Push component types
-    keys.forEach(k => {
-      if (!series[k]) {
-        const displayName = componentTypeDisplayNames[k] ? componentTypeDisplayNames[k] : k;
-        series[k] = {data: [], max: d[k], min: d[k], displayName}
-      }
-      series[k].data.push(d[k]);
-      // Track max/min values
-      if (d[k] > series[k].max) {
-        series[k].max = d[k];
+  keys.forEach(k => {
+    const displayName = componentTypeDisplayNames[k] ? componentTypeDisplayNames[k] : k;
+    const values = data.columns[k];
+    series[k] = {data: values, max: values[0], min: values[0], displayName};
+    // Track max/min values
+    values.forEach(value => {
+      if (value > series[k].max) {
+        series[k].max = value;
       }
-      if (d[k] < series[k].min) {
-        series[k].min = d[k]
+      if (value < series[k].min) {
+        series[k].min = value;
       }
     });
-    categories.push(d.midDate);
   });
 
   let componentSeries = [];